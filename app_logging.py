@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+日志模块 - 基于标准库logging的结构化日志
+- 级别：由config.LOG_LEVEL（环境变量COINANK_LOG_LEVEL）控制
+- 惰性格式化：消息使用%s占位符，级别未启用时不格式化、不写stdout
+- 结构化字段：关键字参数作为key=value（或JSON）附加在消息后
+- 采样：高频日志可传sample=0.01只输出约1%，调试日志默认按LOG_DEBUG_SAMPLE_RATE采样
+"""
+
+import json
+import logging
+import random
+import sys
+
+from config import LOG_LEVEL, LOG_FORMAT, LOG_DEBUG_SAMPLE_RATE
+
+
+ROOT_LOGGER_NAME = 'coinank'
+
+_configured = False
+
+
+class StructuredFormatter(logging.Formatter):
+    """在消息后追加结构化字段，json格式时整条记录输出为一行JSON"""
+
+    def __init__(self, fmt_type='text'):
+        super().__init__('%(asctime)s %(levelname)s [%(name)s] %(message)s')
+        self.fmt_type = fmt_type
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None)
+        if self.fmt_type == 'json':
+            payload = {
+                'time': self.formatTime(record),
+                'level': record.levelname,
+                'logger': record.name,
+                'message': record.getMessage()
+            }
+            if fields:
+                payload.update(fields)
+            if record.exc_info:
+                payload['exc_info'] = self.formatException(record.exc_info)
+            return json.dumps(payload, ensure_ascii=False, default=str)
+
+        text = super().format(record)
+        if fields:
+            text += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+
+def configure(level=None, fmt_type=None, stream=None):
+    """配置coinank根日志器（重复调用只更新级别）"""
+    global _configured
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel((level or LOG_LEVEL).upper())
+
+    if not _configured:
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler.setFormatter(StructuredFormatter(fmt_type or LOG_FORMAT))
+        root.addHandler(handler)
+        root.propagate = False
+        _configured = True
+    return root
+
+
+class StructuredLogger:
+    """标准库Logger的轻量封装 - 支持结构化字段与采样"""
+
+    __slots__ = ('_logger',)
+
+    def __init__(self, logger):
+        self._logger = logger
+
+    @property
+    def debug_enabled(self):
+        """调试级别是否启用 - 构造开销较大的调试信息前先判断"""
+        return self._logger.isEnabledFor(logging.DEBUG)
+
+    def _log(self, level, msg, args, exc_info=False, sample=1.0, fields=None):
+        if not self._logger.isEnabledFor(level):
+            return
+        if sample < 1.0 and random.random() >= sample:
+            return
+        extra = {'fields': fields} if fields else None
+        self._logger.log(level, msg, *args, exc_info=exc_info, extra=extra, stacklevel=3)
+
+    def debug(self, msg, *args, sample=None, **fields):
+        self._log(logging.DEBUG, msg, args,
+                  sample=LOG_DEBUG_SAMPLE_RATE if sample is None else sample, fields=fields)
+
+    def info(self, msg, *args, sample=1.0, **fields):
+        self._log(logging.INFO, msg, args, sample=sample, fields=fields)
+
+    def warning(self, msg, *args, sample=1.0, **fields):
+        self._log(logging.WARNING, msg, args, sample=sample, fields=fields)
+
+    def error(self, msg, *args, exc_info=False, **fields):
+        # 错误日志不采样
+        self._log(logging.ERROR, msg, args, exc_info=exc_info, fields=fields)
+
+    def exception(self, msg, *args, **fields):
+        """记录错误并附带当前异常堆栈"""
+        self._log(logging.ERROR, msg, args, exc_info=True, fields=fields)
+
+
+def get_logger(name):
+    """获取模块日志器，如 log = get_logger(__name__)"""
+    configure()
+    if not name.startswith(ROOT_LOGGER_NAME):
+        name = f"{ROOT_LOGGER_NAME}.{name}"
+    return StructuredLogger(logging.getLogger(name))
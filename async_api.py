@@ -0,0 +1,715 @@
+#!/usr/bin/env python3
+"""
+Coinank 异步API模块 - 基于asyncio的单事件循环客户端
+与CoinankAPI提供相同的fetch_*接口，并发请求由信号量限制，不再为每次扇出创建线程池
+"""
+
+import asyncio
+import concurrent.futures
+import io
+import json
+import ssl
+import threading
+import time
+import urllib.parse
+import http.client
+from collections import deque
+from datetime import datetime
+
+from config import (HTTP_POOL_MAXSIZE, HTTP_POOL_IDLE_TIMEOUT, ASYNC_MAX_CONCURRENCY,
+                    UPSTREAM_READ_CHUNK_SIZE, BATCH_TIMEOUT, DISK_STORE_ENABLED)
+from coin_api import CoinankAPI, MAIN_PAGE_HEADERS
+from proxy_config import get_best_proxy
+from app_logging import get_logger
+import json_codec
+from content_decoding import StreamDecoder
+from series_store import SeriesStore
+from disk_store import DiskSeriesStore
+from retry_policy import (RetryPolicyEngine, classify_status, classify_exception, API_ERROR, BAD_RESPONSE,
+                          backoff_enabled, no_backoff)
+
+logger = get_logger(__name__)
+
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+
+class AsyncHostPool:
+    """单个主机的asyncio连接池 - 复用keep-alive的(reader, writer)"""
+
+    def __init__(self, scheme, host, port, proxy=None, maxsize=HTTP_POOL_MAXSIZE,
+                 idle_timeout=HTTP_POOL_IDLE_TIMEOUT, ssl_context=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.proxy = proxy  # (host, port) 或 None
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._idle = deque()  # [(reader, writer, last_used), ...]
+
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    async def _open(self):
+        """新建连接 - 代理模式下HTTPS先发CONNECT再升级TLS"""
+        use_tls = self.scheme == 'https'
+        if not self.proxy:
+            return await asyncio.open_connection(
+                self.host, self.port,
+                ssl=self.ssl_context if use_tls else None,
+                server_hostname=self.host if use_tls else None)
+
+        proxy_host, proxy_port = self.proxy
+        reader, writer = await asyncio.open_connection(proxy_host, proxy_port)
+        if use_tls:
+            writer.write(f"CONNECT {self.host}:{self.port} HTTP/1.1\r\n"
+                         f"Host: {self.host}:{self.port}\r\n\r\n".encode('latin-1'))
+            await writer.drain()
+            status_line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = status_line.split(None, 2)
+            if len(parts) < 2 or parts[1] != b'200':
+                writer.close()
+                raise ConnectionError(f"代理隧道建立失败: {status_line!r}")
+            await writer.start_tls(self.ssl_context, server_hostname=self.host)
+        return reader, writer
+
+    async def acquire(self):
+        """获取连接，返回 (reader, writer, 是否复用)"""
+        now = time.time()
+        while self._idle:
+            reader, writer, last_used = self._idle.pop()
+            if (now - last_used > self.idle_timeout or reader.at_eof()
+                    or writer.is_closing()):
+                self.discarded += 1
+                writer.close()
+                continue
+            self.reused += 1
+            return reader, writer, True
+
+        self.created += 1
+        reader, writer = await self._open()
+        return reader, writer, False
+
+    def release(self, reader, writer):
+        """归还连接"""
+        if len(self._idle) >= self.maxsize or writer.is_closing():
+            self.discarded += 1
+            writer.close()
+            return
+        self._idle.append((reader, writer, time.time()))
+
+    def close(self):
+        """关闭所有空闲连接"""
+        while self._idle:
+            _, writer, _ = self._idle.pop()
+            writer.close()
+
+    def get_stats(self):
+        """获取连接池统计"""
+        total = self.created + self.reused
+        return {
+            'host': f"{self.host}:{self.port}",
+            'proxy': f"{self.proxy[0]}:{self.proxy[1]}" if self.proxy else None,
+            'idle': len(self._idle),
+            'created': self.created,
+            'reused': self.reused,
+            'reuse_rate': round(self.reused / total, 4) if total else 0,
+            'discarded': self.discarded
+        }
+
+
+async def _read_body(reader, headers):
+    """读取响应体并按Content-Encoding流式解压，返回 (解码后的body, 连接是否可复用)"""
+    decoder = StreamDecoder(headers.get('Content-Encoding'))
+    if 'chunked' in headers.get('Transfer-Encoding', '').lower():
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # 跳过trailer
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+            decoder.feed(await reader.readexactly(size))
+            await reader.readexactly(2)
+        return decoder.finish(), True
+
+    length = headers.get('Content-Length')
+    if length is not None:
+        remaining = int(length)
+        while remaining > 0:
+            chunk = await reader.readexactly(min(remaining, UPSTREAM_READ_CHUNK_SIZE))
+            remaining -= len(chunk)
+            decoder.feed(chunk)
+        return decoder.finish(), True
+
+    # 既无长度也非分块，读到连接关闭为止
+    while True:
+        chunk = await reader.read(UPSTREAM_READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        decoder.feed(chunk)
+    return decoder.finish(), False
+
+
+class AsyncHTTPClient:
+    """最小化的asyncio HTTP/1.1客户端 - 仅支持本项目需要的GET请求"""
+
+    def __init__(self, proxies=None):
+        self.proxies = proxies or {}
+        self.ssl_context = ssl.create_default_context()
+        self._pools = {}
+
+    def _get_pool(self, scheme, host, port):
+        proxy = None
+        proxy_url = self.proxies.get(scheme)
+        if proxy_url:
+            parsed = urllib.parse.urlsplit(proxy_url)
+            proxy = (parsed.hostname, parsed.port or 80)
+
+        key = (scheme, host, port, proxy)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = AsyncHostPool(scheme, host, port, proxy=proxy, ssl_context=self.ssl_context)
+            self._pools[key] = pool
+        return pool
+
+    async def _send_once(self, url, headers):
+        parsed = urllib.parse.urlsplit(url)
+        scheme = parsed.scheme
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        pool = self._get_pool(scheme, parsed.hostname, port)
+
+        if pool.proxy and scheme == 'http':
+            target = url
+        else:
+            target = parsed.path or '/'
+            if parsed.query:
+                target += '?' + parsed.query
+
+        lines = [f"GET {target} HTTP/1.1", f"Host: {parsed.netloc}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items()
+                     if name.lower() != 'host')
+        request_bytes = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        while True:
+            reader, writer, reused = await pool.acquire()
+            try:
+                writer.write(request_bytes)
+                await writer.drain()
+                status_line = await reader.readline()
+                if not status_line:
+                    raise ConnectionResetError("连接已被服务器关闭")
+
+                header_bytes = bytearray()
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    header_bytes += line
+                response_headers = http.client.parse_headers(io.BytesIO(bytes(header_bytes) + b'\r\n'))
+
+                version, status = status_line.split(None, 2)[:2]
+                body, reusable = await _read_body(reader, response_headers)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                pool.discarded += 1
+                if not reused:
+                    raise
+                continue
+            except BaseException:
+                writer.close()
+                raise
+
+            if (reusable and version == b'HTTP/1.1'
+                    and response_headers.get('Connection', '').lower() != 'close'):
+                pool.release(reader, writer)
+            else:
+                writer.close()
+            return int(status), response_headers, body
+
+    async def get(self, url, headers, timeout=10):
+        """发送GET请求 - 跟随重定向，返回 (状态码, 响应头, 响应体)"""
+        async def _do():
+            current_url = url
+            for _ in range(MAX_REDIRECTS + 1):
+                status, response_headers, body = await self._send_once(current_url, headers)
+                location = response_headers.get('Location')
+                if status in REDIRECT_CODES and location:
+                    current_url = urllib.parse.urljoin(current_url, location)
+                    continue
+                return status, response_headers, body
+            raise ConnectionError(f"重定向次数过多: {url}")
+
+        return await asyncio.wait_for(_do(), timeout)
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.close()
+
+    def get_stats(self):
+        pool_stats = [pool.get_stats() for pool in self._pools.values()]
+        created = sum(s['created'] for s in pool_stats)
+        reused = sum(s['reused'] for s in pool_stats)
+        total = created + reused
+        return {
+            'connections_created': created,
+            'connections_reused': reused,
+            'reuse_rate': round(reused / total, 4) if total else 0,
+            'pools': pool_stats
+        }
+
+
+class AsyncCoinankAPI:
+    """Coinank 异步API类 - 与CoinankAPI接口一致，所有fetch_*方法为协程"""
+
+    # 请求头生成逻辑与同步客户端完全一致
+    get_api_headers = CoinankAPI.get_api_headers
+
+    def __init__(self, use_proxy=False, max_concurrency=ASYNC_MAX_CONCURRENCY):
+        """
+        初始化异步API客户端 - 默认使用直连模式
+        """
+        self.base_url = "https://api.coinank.com"
+        self.main_url = "https://coinank.com"
+
+        self.use_proxy = use_proxy
+        self.proxy_failed = False
+        self.proxy_config = get_best_proxy() if use_proxy else None
+
+        self.session_established = False
+        self.last_session_time = 0
+        self.session_timeout = 300  # 5分钟会话超时
+
+        # 并发上限 - 所有上游请求共享同一个信号量
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+        self.client = AsyncHTTPClient(self.proxy_config)
+
+        # 重试策略 - 与同步客户端相同的错误分类、退避与进程级重试预算
+        self.retry_policy = RetryPolicyEngine()
+
+        # 时序增量合并 - 刷新时只请求最后几根K线
+        self.series_store = SeriesStore()
+        # 本地时序存储 - 持久化各时序，重启后预热
+        self.disk_store = DiskSeriesStore() if DISK_STORE_ENABLED else None
+        logger.info("🔧 异步客户端使用%s模式 (并发上限: %s)", '代理' if self.use_proxy else '直连', max_concurrency)
+
+    async def _get(self, url, headers, timeout=10):
+        """受信号量限制的GET请求"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                return await self.client.get(url, headers, timeout=timeout)
+            finally:
+                self.in_flight -= 1
+
+    def get_connection_status(self):
+        """获取连接状态信息"""
+        return {
+            'use_proxy': self.use_proxy,
+            'proxy_failed': self.proxy_failed,
+            'proxy_config': self.proxy_config if self.use_proxy else None,
+            'connection_type': '代理' if self.use_proxy else '直连',
+            'status': '正常',
+            'client_type': 'asyncio',
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'connection_pool': self.client.get_stats()
+        }
+
+    async def test_connection(self):
+        """测试网络连接"""
+        connection_type = "代理" if self.use_proxy else "直连"
+        logger.debug("🧪 测试网络连接 (%s, asyncio)...", connection_type)
+        try:
+            status, _, _ = await self._get(self.main_url, {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            })
+            if status == 200:
+                logger.info("✅ 网络连接正常 (%s)", connection_type)
+                return True
+            logger.error("❌ 连接失败，状态码: %s", status)
+            return False
+        except Exception as e:
+            logger.error("❌ 网络连接错误 (%s): %s", connection_type, e)
+            return False
+
+    async def establish_session(self):
+        """建立会话 - 带缓存优化"""
+        current_time = time.time()
+        if (self.session_established and
+                current_time - self.last_session_time < self.session_timeout):
+            return True
+
+        logger.info("🔗 建立新的coinank会话 (asyncio)...")
+        try:
+            status, _, _ = await self._get(self.main_url, MAIN_PAGE_HEADERS)
+            if status == 200:
+                self.session_established = True
+                self.last_session_time = current_time
+                return True
+            logger.error("❌ 主站访问失败: %s", status)
+        except Exception as e:
+            logger.error("❌ 建立会话失败: %s", e)
+        self.session_established = False
+        return False
+
+    async def fetch_data_with_retry(self, url, params, data_type, max_retries=None, allow_empty_response=False):
+        """带重试的数据获取 - 按错误类型决定是否重试，重试前去相关抖动退避并消耗进程级重试预算"""
+        policy = self.retry_policy.policy_for(url, max_retries)
+        self.retry_policy.begin()
+
+        query_string = urllib.parse.urlencode(params)
+        full_url = f"{url}?{query_string}"
+
+        delay = 0
+        attempt = 0
+        while True:
+            attempt += 1
+            error_class = BAD_RESPONSE
+            try:
+                logger.debug("🔍 %s请求: %s", data_type, full_url)
+                status, headers, body = await self._get(full_url, self.get_api_headers())
+                logger.debug("📊 响应状态: %s", status)
+
+                if status != 200:
+                    logger.error("❌ %s数据HTTP错误: %s", data_type, status)
+                    error_class = classify_status(status)
+                elif 'application/json' not in headers.get('content-type', '').lower():
+                    logger.warning("⚠️ %s响应不是JSON格式: %s", data_type, headers.get('content-type', ''))
+                else:
+                    try:
+                        # 响应体已在读取时按Content-Encoding解压
+                        data = json_codec.loads(body)
+
+                        if data.get('success'):
+                            data_count = len(data.get('data', []) if isinstance(data.get('data'), list)
+                                             else data.get('data', {}).get('tss', []))
+                            logger.debug("✅ %s数据获取成功 (%s 项)", data_type, data_count)
+                            return data
+
+                        error_msg = data.get('msg', '未知错误')
+                        logger.error("❌ %s数据API错误: %s", data_type, error_msg)
+                        error_class = API_ERROR
+                        if allow_empty_response and ('invalid params' in error_msg.lower() or 'not found' in error_msg.lower()):
+                            logger.warning("⚠️ %s数据不可用，返回空响应", data_type)
+                            return {
+                                'success': True,
+                                'data': {},
+                                'msg': f'{data_type}数据暂不可用'
+                            }
+                    except (ValueError, json.JSONDecodeError) as json_error:
+                        logger.error("❌ %sJSON解析错误: %s", data_type, json_error)
+
+            except Exception as e:
+                error_class = classify_exception(e)
+                logger.error("❌ %s数据请求异常 (尝试%s): %r", data_type, attempt, e)
+
+            if not self.retry_policy.should_retry(policy, attempt, error_class):
+                break
+
+            delay = policy.next_delay(delay)
+            logger.info("🔄 %s数据%s，%.2f 秒后重试 (第 %s 次尝试)...", data_type, error_class, delay, attempt + 1)
+            await asyncio.sleep(delay)
+
+        logger.error("❌ %s数据获取失败 (%s)，已尝试 %s 次", data_type, error_class, attempt)
+
+        if allow_empty_response:
+            logger.warning("⚠️ 返回 %s 空响应作为降级处理", data_type)
+            return {
+                'success': True,
+                'data': {},
+                'msg': f'{data_type}数据暂不可用'
+            }
+
+        return None
+
+    async def _save_series(self, key, response):
+        """写入本地时序存储（文件I/O放到线程池，不阻塞事件循环）"""
+        if self.disk_store is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.disk_store.save, key, response)
+
+    async def _fetch_series(self, key, url, params, data_type, interval, window=None, **kwargs):
+        """时序接口 - 已有基准窗口时只请求尾部并按时间戳合并，否则全量请求并保存为基准
+
+        获取到的数据（全量或增量部分）同时写入本地时序存储；重启后先用本地数据作为基准窗口
+        """
+        if self.disk_store is not None and self.series_store.needs_seed(key):
+            stored = await asyncio.get_running_loop().run_in_executor(None, self.disk_store.load, key, window)
+            self.series_store.seed(key, stored, window)
+
+        tail = self.series_store.plan_tail(key, interval)
+        if tail is not None:
+            response = await self.fetch_data_with_retry(url, dict(params, **tail), f"{data_type}增量", **kwargs)
+            merged = self.series_store.merge(key, response)
+            if merged is not None:
+                await self._save_series(key, response)
+                return merged
+            logger.debug("🔁 %s增量合并失败，改为全量请求", data_type)
+
+        response = self.series_store.store(key, await self.fetch_data_with_retry(url, params, data_type, **kwargs), window)
+        await self._save_series(key, response)
+        return response
+
+    async def fetch_chart_data(self, base_coin="PEPE", interval="1d", data_type="USD"):
+        """获取图表数据"""
+        url = f"{self.base_url}/api/openInterest/chart"
+        params = {
+            'baseCoin': base_coin,
+            'interval': interval,
+            'type': data_type
+        }
+        return await self._fetch_series(('openinterest', base_coin, interval, data_type),
+                                        url, params, "图表", interval)
+
+    async def fetch_ticker_data(self, base_coin="PEPE"):
+        """获取期货数据 - 单次请求，失败返回None"""
+        url = f"{self.base_url}/api/tickers"
+        return await self.fetch_data_with_retry(url, {'baseCoin': base_coin}, "期货", max_retries=1)
+
+    async def fetch_spot_data(self, base_coin="PEPE"):
+        """获取现货数据 - 单次请求，失败返回None"""
+        url = f"{self.base_url}/api/tickers/getSpotTickers"
+        return await self.fetch_data_with_retry(url, {'baseCoin': base_coin}, "现货", max_retries=1)
+
+    async def fetch_volume_chart(self, base_coin="PEPE", exchange_name="ALL", interval="1d"):
+        """获取24H成交额图表数据"""
+        url = f"{self.base_url}/api/volume24h/chart"
+        params = {
+            "baseCoin": base_coin,
+            "exchangeName": exchange_name,
+            "interval": interval
+        }
+        return await self._fetch_series(('volume', base_coin, exchange_name, interval),
+                                        url, params, "24H成交额", interval)
+
+    async def fetch_open_interest_chart(self, base_coin="PEPE", interval="1d", data_type="USD"):
+        """获取合约持仓量图表数据"""
+        url = f"{self.base_url}/api/openInterest/chart"
+        params = {
+            "baseCoin": base_coin,
+            "interval": interval,
+            "type": data_type
+        }
+        return await self._fetch_series(('openinterest', base_coin, interval, data_type),
+                                        url, params, "合约持仓量", interval)
+
+    async def fetch_long_short_flow(self, base_coin="PEPE", exchange_name="", interval="5m", limit=500):
+        """获取净流入数据"""
+        url = f"{self.base_url}/api/longshort/buySell"
+        params = {
+            "exchangeName": exchange_name,
+            "interval": interval,
+            "baseCoin": base_coin,
+            "limit": limit
+        }
+        return await self._fetch_series(('longshort', base_coin, exchange_name, interval),
+                                        url, params, "净流入", interval, window=int(limit))
+
+    async def fetch_funding_rate_chart(self, base_coin="PEPE", exchange_type="USDT", funding_type=1, interval="5m"):
+        """获取资金费率图表数据 - 支持降级处理"""
+        url = f"{self.base_url}/api/fundingRate/chartsV2"
+        params = {
+            'baseCoin': base_coin,
+            'exchangeType': exchange_type,
+            'fundingType': funding_type,
+            'interval': interval
+        }
+        return await self._fetch_series(('fundingrate', base_coin, exchange_type, funding_type, interval),
+                                        url, params, "资金费率图表", interval,
+                                        allow_empty_response=True)
+
+    async def fetch_funding_rate_history(self, base_coin="PEPE", exchange_type="USDT"):
+        """获取资金费率历史数据 - 支持降级处理"""
+        url = f"{self.base_url}/api/fundingRate/hist"
+        params = {
+            'baseCoin': base_coin,
+            'exchangeType': exchange_type
+        }
+        return await self.fetch_data_with_retry(url, params, "资金费率历史", allow_empty_response=True)
+
+    async def fetch_coin_detail(self, base_coin="PEPE"):
+        """获取代币详细信息"""
+        url = f"{self.base_url}/api/instruments/coinDetail"
+        return await self.fetch_data_with_retry(url, {'baseCoin': base_coin}, "代币详情")
+
+    async def _gather_tasks(self, tasks, timeout):
+        """并发执行命名任务，单个任务失败或超时记为None"""
+        names = [name for name, _ in tasks]
+        results = await asyncio.gather(
+            *(asyncio.wait_for(coro, timeout) for _, coro in tasks),
+            return_exceptions=True
+        )
+
+        collected = {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                logger.error("❌ %s 获取异常: %r", name, result)
+                result = None
+            collected[name] = result
+        return collected
+
+    async def get_complete_token_data(self, token="PEPE"):
+        """获取完整的代币数据 - 在事件循环上并发请求"""
+        logger.debug("📊 正在获取 %s 完整数据 (asyncio)...", token)
+
+        if not await self.establish_session():
+            logger.error("❌ 建立会话失败")
+            return None
+
+        results = await self._gather_tasks([
+            ('chart_data', self.fetch_chart_data(token)),
+            ('ticker_data', self.fetch_ticker_data(token)),
+            ('spot_data', self.fetch_spot_data(token)),
+            ('oi_chart_data', self.fetch_open_interest_chart(token)),
+            ('volume_chart_data', self.fetch_volume_chart(token)),
+            ('net_flow_data', self.fetch_long_short_flow(token)),
+            ('funding_rate_chart', self.fetch_funding_rate_chart(token)),
+            ('funding_rate_history', self.fetch_funding_rate_history(token))
+        ], timeout=15)
+
+        success_count = sum(1 for result in results.values() if result)
+        logger.debug("📈 数据获取结果: %s/8 成功", success_count)
+
+        if success_count == 0:
+            logger.error("❌ 未能获取到任何数据")
+            return None
+
+        results['token'] = token
+        results['fetch_time'] = datetime.now().isoformat()
+        return results
+
+    async def get_basic_token_data(self, token="PEPE"):
+        """获取基础代币数据 - 快速版本"""
+        logger.debug("⚡ 快速获取 %s 基础数据 (asyncio)...", token)
+
+        if not await self.establish_session():
+            logger.error("❌ 建立会话失败")
+            return None
+
+        results = await self._gather_tasks([
+            ('chart_data', self.fetch_chart_data(token)),
+            ('ticker_data', self.fetch_ticker_data(token)),
+            ('spot_data', self.fetch_spot_data(token))
+        ], timeout=8)
+
+        if not any(results.values()):
+            return None
+
+        return {
+            'chart_data': results.get('chart_data'),
+            'ticker_data': results.get('ticker_data'),
+            'spot_data': results.get('spot_data'),
+            'oi_chart_data': results.get('chart_data'),  # 复用价格图表数据
+            'volume_chart_data': None,
+            'net_flow_data': None,
+            'funding_rate_chart': None,
+            'funding_rate_history': None,
+            'token': token,
+            'fetch_time': datetime.now().isoformat(),
+            'is_basic': True
+        }
+
+    async def aclose(self):
+        """关闭所有连接"""
+        self.client.close()
+
+
+class SyncCoinankAPI:
+    """AsyncCoinankAPI的同步门面 - 供Flask等同步代码使用
+
+    后台线程运行唯一的事件循环，所有调用线程提交协程并阻塞等待结果，
+    接口与CoinankAPI保持一致，可直接替换api_client。
+    """
+
+    def __init__(self, use_proxy=False, max_concurrency=ASYNC_MAX_CONCURRENCY, call_timeout=30):
+        self.call_timeout = call_timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name='coinank-asyncio', daemon=True)
+        self._thread.start()
+        self.async_api = self._call(self._create(use_proxy, max_concurrency))
+
+    @staticmethod
+    async def _create(use_proxy, max_concurrency):
+        # 在事件循环线程内创建，保证信号量等对象绑定到该循环
+        return AsyncCoinankAPI(use_proxy=use_proxy, max_concurrency=max_concurrency)
+
+    def _call(self, coro):
+        """在后台事件循环上执行协程并等待结果"""
+        if not backoff_enabled():
+            # 协程在事件循环线程的上下文中运行，调用方的no_backoff()需显式带过去
+            coro = self._without_backoff(coro)
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(self.call_timeout)
+        except concurrent.futures.TimeoutError:
+            # 调用方已放弃等待，取消协程以释放其占用的并发名额与上游连接
+            future.cancel()
+            raise
+
+    @staticmethod
+    async def _without_backoff(coro):
+        with no_backoff():
+            return await coro
+
+    def __getattr__(self, name):
+        # 协程方法包装为同步调用，其余属性直接透传
+        if name == 'async_api':
+            raise AttributeError(name)
+        attr = getattr(self.async_api, name)
+        if asyncio.iscoroutinefunction(attr):
+            def sync_method(*args, **kwargs):
+                return self._call(attr(*args, **kwargs))
+            sync_method.__name__ = name
+            sync_method.__doc__ = attr.__doc__
+            return sync_method
+        return attr
+
+    def iter_complete_token_data(self, tokens, timeout=BATCH_TIMEOUT, include_funding=True):
+        """批量获取多个代币的完整数据，按代币完成顺序逐个产出 (token, 数据或None)
+
+        每个代币一个协程提交到同一事件循环，上游并发由客户端信号量统一限制；
+        资金费率总是随完整数据一起获取，include_funding仅为与同步客户端接口一致
+        """
+        future_to_token = {
+            asyncio.run_coroutine_threadsafe(self.async_api.get_complete_token_data(token), self._loop): token
+            for token in tokens
+        }
+        try:
+            try:
+                for future in concurrent.futures.as_completed(future_to_token, timeout=timeout):
+                    token = future_to_token[future]
+                    try:
+                        yield token, future.result()
+                    except Exception as e:
+                        logger.error("❌ %s 获取异常: %s", token, e)
+                        yield token, None
+            except concurrent.futures.TimeoutError:
+                pending = [token for future, token in future_to_token.items() if not future.done()]
+                logger.warning("⏳ 批量获取超时，未完成代币: %s", pending)
+                for token in pending:
+                    yield token, None
+        finally:
+            for future in future_to_token:
+                future.cancel()
+
+    def close(self):
+        """关闭连接并停止事件循环"""
+        self._call(self.async_api.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+/api/token 响应格式微基准
+对比默认逐点字典格式、?format=columnar 并列数组格式及时间戳差分编码，
+统计JSON序列化耗时与响应字节数（与Flask jsonify相同的紧凑输出）
+
+用法: python benchmarks/bench_columnar_format.py [--exchanges 8] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from series import (price_series, total_series, net_flow_series, positive_series,
+                    to_columns, records_from_columns, delta_encode)
+from bench_process_data import make_payload
+
+
+def build_columns(data):
+    """按process_data_for_web的方式生成四条时序的并列数组"""
+    times, values = price_series(data['tss'], data['prices'])
+    price = to_columns(time=times, price=values)
+    times, totals = total_series(data['tss'], data['dataValues'])
+    oi = to_columns(time=times, value=totals)
+    times, longs, shorts, nets = net_flow_series(data['tss'], data['longRatios'], data['shortRatios'])
+    net_flow = to_columns(time=times, value=nets, buy_volume=longs, sell_volume=shorts)
+    times, volumes = positive_series(data['tss'], data['single'])
+    volume = to_columns(time=times, value=volumes)
+    return {'price_data': price, 'oi_time_series': oi,
+            'net_flow_time_series': net_flow, 'volume_time_series': volume}
+
+
+def rows_body(columns):
+    return {name: records_from_columns(series) for name, series in columns.items()}
+
+
+def columnar_body(columns, delta=False):
+    if not delta:
+        return columns
+    return {name: dict(series, time=delta_encode(series['time']), time_encoding='delta')
+            for name, series in columns.items()}
+
+
+def dumps(body):
+    return json.dumps({'success': True, 'data': body}, separators=(',', ':'), sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='/api/token 响应格式微基准')
+    parser.add_argument('--exchanges', type=int, default=8, help='交易所数量')
+    parser.add_argument('--repeat', type=int, default=20, help='每组重复次数')
+    args = parser.parse_args()
+
+    print(f"{'points':>8} {'format':>10} {'bytes':>10} {'ratio':>7} {'dumps ms':>10}")
+    for points in (500, 1000, 2000, 5000):
+        columns = build_columns(make_payload(points, args.exchanges))
+        variants = [
+            ('rows', lambda: rows_body(columns)),
+            ('columnar', lambda: columnar_body(columns)),
+            ('delta', lambda: columnar_body(columns, delta=True))
+        ]
+
+        baseline = None
+        for name, build in variants:
+            size = len(dumps(build()).encode('utf-8'))
+            baseline = baseline or size
+            # 计时包含构造响应体（逐点字典/差分编码）与序列化
+            elapsed = min(timeit.repeat(lambda: dumps(build()), number=1, repeat=args.repeat))
+            print(f"{points:>8} {name:>10} {size:>10} {size / baseline:>7.2f} {elapsed * 1000:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
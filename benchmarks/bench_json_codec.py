@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+JSON编解码微基准
+- 解析：原路径 bytes.decode('utf-8') + json.loads 对比 json_codec.loads(bytes)
+- 序列化：Flask默认jsonify方式（sort_keys + str再编码）对比 json_codec.dumps
+默认使用与coinank接口结构一致的合成数据；抓取到真实响应后可用 --capture 指定文件
+
+用法: python benchmarks/bench_json_codec.py [--capture resp1.json resp2.json ...] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_codec
+from bench_process_data import make_payload
+
+
+def synthetic_payloads():
+    """生成与coinank接口响应同结构的数据（含中文msg，与真实响应相同的外层结构）"""
+    payloads = []
+    for points in (500, 2000, 5000):
+        data = make_payload(points, 8)
+        payloads.append((f"openInterest/chart {points}pt", {
+            'success': True, 'code': '1', 'msg': '成功',
+            'data': {'tss': data['tss'], 'prices': data['prices'], 'dataValues': data['dataValues']}
+        }))
+        payloads.append((f"longshort/realtime {points}pt", {
+            'success': True, 'code': '1', 'msg': '成功',
+            'data': {'tss': data['tss'], 'longRatios': data['longRatios'],
+                     'shortRatios': data['shortRatios']}
+        }))
+    return payloads
+
+
+def legacy_loads(raw):
+    return json.loads(raw.decode('utf-8'))
+
+
+def legacy_dumps(value):
+    # Flask默认JSON提供者：ensure_ascii + sort_keys，得到str后再编码为bytes
+    return json.dumps(value, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON编解码微基准')
+    parser.add_argument('--capture', nargs='*', help='真实coinank响应文件（原始JSON）')
+    parser.add_argument('--repeat', type=int, default=20, help='每组重复次数')
+    args = parser.parse_args()
+
+    if args.capture:
+        payloads = []
+        for path in args.capture:
+            with open(path, 'rb') as f:
+                payloads.append((os.path.basename(path), json.loads(f.read())))
+    else:
+        payloads = synthetic_payloads()
+
+    print(f"backend: {json_codec.BACKEND}")
+    print(f"{'payload':<28} {'bytes':>9} {'loads old':>10} {'loads new':>10} {'x':>6} "
+          f"{'dumps old':>10} {'dumps new':>10} {'x':>6}")
+    for name, value in payloads:
+        raw = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        assert json_codec.loads(raw) == legacy_loads(raw)
+
+        timing = lambda fn: min(timeit.repeat(fn, number=1, repeat=args.repeat)) * 1000
+        loads_old = timing(lambda: legacy_loads(raw))
+        loads_new = timing(lambda: json_codec.loads(raw))
+        dumps_old = timing(lambda: legacy_dumps(value))
+        dumps_new = timing(lambda: json_codec.dumps(value))
+        print(f"{name:<28} {len(raw):>9} {loads_old:>10.3f} {loads_new:>10.3f} {loads_old / loads_new:>5.1f}x "
+              f"{dumps_old:>10.3f} {dumps_new:>10.3f} {dumps_old / dumps_new:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+process_data_for_web 时序转换微基准
+对比原Python逐点循环实现与series.py中NumPy列式实现，
+使用与coinank接口同结构的合成数据（多交易所、含None值）
+
+用法: python benchmarks/bench_process_data.py [--exchanges 8] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from series import price_series, total_series, net_flow_series, positive_series, to_records
+
+
+EXCHANGES = ['Binance', 'Okex', 'Bybit', 'Bitget', 'Gate', 'Huobi', 'Bitmex', 'Deribit',
+             'Kraken', 'Coinbase', 'dYdX', 'Hyperliquid']
+
+
+def make_payload(points, exchanges, none_ratio=0.03, seed=42):
+    """生成与coinank接口结构一致的合成数据"""
+    rnd = random.Random(seed)
+    tss = [1700000000000 + i * 300000 for i in range(points)]
+
+    def maybe_none(value):
+        return None if rnd.random() < none_ratio else value
+
+    return {
+        'tss': tss,
+        'prices': [maybe_none(1 + rnd.random()) for _ in range(points)],
+        'dataValues': {
+            name: [maybe_none(rnd.random() * 1e7) for _ in range(points)]
+            for name in EXCHANGES[:exchanges]
+        },
+        'longRatios': [maybe_none(rnd.random() * 1e5) for _ in range(points)],
+        'shortRatios': [maybe_none(rnd.random() * 1e5) for _ in range(points)],
+        'single': [maybe_none(rnd.random() * 1e8) for _ in range(points)]
+    }
+
+
+def legacy_transform(data):
+    """原process_data_for_web中的逐点循环（净流入按新规则跳过None以便对比）"""
+    timestamps, prices = data['tss'], data['prices']
+    price_data = []
+    for i in range(min(len(timestamps), len(prices))):
+        if prices[i] and timestamps[i]:
+            price_data.append({'time': timestamps[i], 'price': prices[i]})
+
+    oi_time_series = []
+    for i, timestamp in enumerate(timestamps):
+        total_oi = 0
+        for exchange, values in data['dataValues'].items():
+            if i < len(values) and values[i] is not None:
+                total_oi += values[i]
+        if total_oi > 0:
+            oi_time_series.append({'time': timestamp, 'value': total_oi})
+    for exchange, values in data['dataValues'].items():
+        sum(v for v in values if v is not None and v > 0)
+
+    net_flow_time_series = []
+    longs, shorts = data['longRatios'], data['shortRatios']
+    for i in range(min(len(longs), len(shorts), len(timestamps))):
+        if longs[i] is None or shorts[i] is None:
+            continue
+        net_flow_time_series.append({'time': timestamps[i], 'value': longs[i] - shorts[i],
+                                     'buy_volume': longs[i], 'sell_volume': shorts[i]})
+
+    volume_time_series = []
+    single = data['single']
+    for i in range(min(len(timestamps), len(single))):
+        if single[i] is not None and single[i] > 0:
+            volume_time_series.append({'time': timestamps[i], 'value': single[i]})
+
+    return price_data, oi_time_series, net_flow_time_series, volume_time_series
+
+
+def vectorized_transform(data):
+    """series.py列式实现"""
+    times, values = price_series(data['tss'], data['prices'])
+    price_data = to_records(time=times, price=values)
+
+    times, totals = total_series(data['tss'], data['dataValues'])
+    oi_time_series = to_records(time=times, value=totals)
+
+    times, longs, shorts, nets = net_flow_series(data['tss'], data['longRatios'], data['shortRatios'])
+    net_flow_time_series = to_records(time=times, value=nets, buy_volume=longs, sell_volume=shorts)
+
+    times, volumes = positive_series(data['tss'], data['single'])
+    volume_time_series = to_records(time=times, value=volumes)
+
+    return price_data, oi_time_series, net_flow_time_series, volume_time_series
+
+
+def vectorized_core(data):
+    """仅列式计算，不生成逐点字典 - 用于区分计算耗时与输出构造耗时"""
+    return (price_series(data['tss'], data['prices']),
+            total_series(data['tss'], data['dataValues']),
+            net_flow_series(data['tss'], data['longRatios'], data['shortRatios']),
+            positive_series(data['tss'], data['single']))
+
+
+def check_equivalent(legacy, vectorized):
+    """逐点比对两种实现的结果（允许浮点求和顺序带来的微小误差）"""
+    for old_series, new_series in zip(legacy, vectorized):
+        assert len(old_series) == len(new_series), (len(old_series), len(new_series))
+        for old, new in zip(old_series, new_series):
+            assert old.keys() == new.keys()
+            for key in old:
+                assert abs(old[key] - new[key]) <= 1e-9 * max(1, abs(old[key])), (key, old[key], new[key])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='process_data_for_web 时序转换微基准')
+    parser.add_argument('--exchanges', type=int, default=8, help='交易所数量')
+    parser.add_argument('--repeat', type=int, default=20, help='每组重复次数')
+    args = parser.parse_args()
+
+    print(f"{'points':>8} {'exchanges':>10} {'legacy ms':>12} {'numpy ms':>12} {'speedup':>9} "
+          f"{'core ms':>10} {'core speedup':>13}")
+    for points in (500, 1000, 2000, 5000):
+        data = make_payload(points, args.exchanges)
+        check_equivalent(legacy_transform(data), vectorized_transform(data))
+
+        legacy = min(timeit.repeat(lambda: legacy_transform(data), number=1, repeat=args.repeat))
+        vectorized = min(timeit.repeat(lambda: vectorized_transform(data), number=1, repeat=args.repeat))
+        core = min(timeit.repeat(lambda: vectorized_core(data), number=1, repeat=args.repeat))
+        print(f"{points:>8} {args.exchanges:>10} {legacy * 1000:>12.3f} {vectorized * 1000:>12.3f} "
+              f"{legacy / vectorized:>8.1f}x {core * 1000:>10.3f} {legacy / core:>12.1f}x")
+
+
+if __name__ == '__main__':
+    main()
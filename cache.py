@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+缓存模块 - 有界、线程安全的TTL + LRU缓存
+替代coinank_web_app.py中无上限的data_cache/last_update_time全局字典
+支持stale-while-revalidate：过期条目在宽限期内立即返回，同时后台刷新
+可选共享后端（shared_cache.SharedCache）：多进程部署时加载前先采用其他进程写入的值，
+并用刷新锁保证同一key同一时间只有一个进程请求上游
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTLS,
+                    CACHE_STALE_GRACE_RATIO, CACHE_STALE_IF_ERROR, CACHE_REFRESH_WORKERS)
+from single_flight import SingleFlight
+from retry_policy import no_backoff
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+DEFAULT_TTL = 300  # 未配置命名空间的默认TTL（秒）
+
+
+SIZE_SAMPLE = 8  # 列表只抽样前几个元素，按长度外推
+SCALAR_SIZE = 5  # 布尔/None等其他标量的平均序列化长度
+
+
+def estimate_size(value):
+    """估算缓存值大小（字节）- 按结构与数组长度估算JSON长度，不做序列化
+
+    时序列表元素同构，只抽样前SIZE_SAMPLE个元素再乘以长度，开销与数据点数无关
+    """
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return 2 + sum(len(str(key)) + 4 + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return 2
+        sample = value[:SIZE_SAMPLE]
+        per_item = sum(estimate_size(item) for item in sample) / len(sample)
+        return 2 + int((per_item + 1) * len(value))
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return len(repr(value))
+    nbytes = getattr(value, 'nbytes', None)  # NumPy数组
+    if isinstance(nbytes, int):
+        return nbytes
+    return SCALAR_SIZE
+
+
+class CacheEntry:
+    """缓存条目"""
+
+    __slots__ = ('namespace', 'key', 'value', 'stored_at', 'ttl', 'grace', 'size', 'loader', 'variants')
+
+    def __init__(self, namespace, key, value, ttl, grace=0, size=0, loader=None, stored_at=None):
+        self.namespace = namespace
+        self.key = key
+        self.value = value
+        self.stored_at = time.time() if stored_at is None else stored_at
+        self.ttl = ttl
+        self.grace = grace
+        self.size = size
+        self.loader = loader  # 用于后台刷新的加载函数
+        self.variants = None  # 派生结果（序列化/压缩后的响应体），随条目替换自动失效
+
+    def age(self, now=None):
+        return (now or time.time()) - self.stored_at
+
+    def is_fresh(self, now=None):
+        return self.age(now) < self.ttl
+
+    def is_servable_stale(self, now=None):
+        """过期但仍在宽限期内，可直接返回并后台刷新"""
+        return self.age(now) < self.ttl + self.grace
+
+
+class TTLCache:
+    """按命名空间配置TTL的LRU缓存 - 条目数和字节数双重上限"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                 namespace_ttls=None, default_ttl=DEFAULT_TTL,
+                 stale_grace_ratio=CACHE_STALE_GRACE_RATIO,
+                 stale_if_error=CACHE_STALE_IF_ERROR,
+                 refresh_workers=CACHE_REFRESH_WORKERS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.namespace_ttls = dict(CACHE_TTLS if namespace_ttls is None else namespace_ttls)
+        self.default_ttl = default_ttl
+        self.stale_grace_ratio = stale_grace_ratio
+        self.stale_if_error = stale_if_error
+
+        self._entries = OrderedDict()  # (namespace, key) -> CacheEntry
+        self._lock = threading.RLock()
+        self.total_bytes = 0
+
+        # 后台刷新 - 长期存在的小线程池，每个key同时最多一个刷新任务
+        self._refresh_executor = ThreadPoolExecutor(max_workers=refresh_workers,
+                                                    thread_name_prefix='cache-refresh')
+        self._refreshing = set()
+        # 同一key的并发同步加载合并为一次
+        self._loads = SingleFlight()
+        # 访问监听 - 热点刷新调度器通过它统计key的访问频率
+        self.access_listener = None
+        # 跨进程共享后端，None时为纯进程内缓存
+        self.shared = None
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.stale_fallbacks = 0
+        self.background_refreshes = 0
+        self.refresh_failures = 0
+        self.expirations = 0
+        self.evictions = 0
+        self._namespace_stats = {}
+
+    def ttl_for(self, namespace):
+        """获取命名空间TTL"""
+        return self.namespace_ttls.get(namespace, self.default_ttl)
+
+    def grace_for(self, namespace):
+        """获取命名空间的stale宽限期"""
+        return self.ttl_for(namespace) * self.stale_grace_ratio
+
+    def _ns_stats(self, namespace):
+        stats = self._namespace_stats.get(namespace)
+        if stats is None:
+            stats = {'hits': 0, 'stale_hits': 0, 'misses': 0}
+            self._namespace_stats[namespace] = stats
+        return stats
+
+    def _remove(self, cache_key):
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+        return entry
+
+    def _evict_if_needed(self):
+        """超出条目数或字节数上限时淘汰最久未使用的条目"""
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 (self.max_bytes and self.total_bytes > self.max_bytes)):
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.size
+            self.evictions += 1
+
+    def _lookup(self, namespace, key, now):
+        """查找条目 - 超过最长可用期限(TTL+stale_if_error)的条目直接删除"""
+        cache_key = (namespace, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None and entry.age(now) >= entry.ttl + max(entry.grace, self.stale_if_error):
+            self._remove(cache_key)
+            self.expirations += 1
+            return None
+        if entry is not None:
+            self._entries.move_to_end(cache_key)
+        return entry
+
+    def get(self, namespace, key):
+        """获取未过期的缓存值，未命中返回None"""
+        now = time.time()
+        with self._lock:
+            stats = self._ns_stats(namespace)
+            entry = self._lookup(namespace, key, now)
+            if entry is None or not entry.is_fresh(now):
+                self.misses += 1
+                stats['misses'] += 1
+                return None
+
+            self.hits += 1
+            stats['hits'] += 1
+            return entry.value
+
+    def get_or_load(self, namespace, key, loader):
+        """stale-while-revalidate读取
+
+        - 未过期：直接返回
+        - 过期但在宽限期内：立即返回旧值，后台刷新一次
+        - 无可用条目：同步调用loader，失败(None或异常)时回退到任何尚存的旧值；
+          本进程还有可回退的旧值时上游失败不退避重试，尽快返回旧值
+        """
+        value = self.get_servable(namespace, key, loader)
+        if value is not None:
+            return value
+
+        if self.peek(namespace, key) is not None:
+            with no_backoff():
+                value = self._load(namespace, key, loader)
+        else:
+            value = self._load(namespace, key, loader)
+        if value is not None:
+            return value
+
+        # 上游失败，返回旧值作为降级
+        return self.get_fallback(namespace, key)
+
+    def get_servable(self, namespace, key, loader):
+        """只读取可直接返回的值（未过期，或宽限期内的旧值并触发后台刷新），否则返回None
+
+        供批量接口先返回缓存命中部分，未命中的再统一加载
+        """
+        if self.access_listener is not None:
+            self.access_listener(namespace, key)
+
+        now = time.time()
+        with self._lock:
+            stats = self._ns_stats(namespace)
+            entry = self._lookup(namespace, key, now)
+            if entry is not None:
+                entry.loader = loader
+                if entry.is_fresh(now):
+                    self.hits += 1
+                    stats['hits'] += 1
+                    return entry.value
+                if entry.is_servable_stale(now):
+                    self.stale_hits += 1
+                    stats['stale_hits'] += 1
+                    self._schedule_refresh(namespace, key, loader)
+                    return entry.value
+            self.misses += 1
+            stats['misses'] += 1
+        return None
+
+    def get_fallback(self, namespace, key):
+        """上游失败时的降级读取 - 返回尚在stale_if_error期限内的旧值（本进程没有时查共享缓存）"""
+        with self._lock:
+            entry = self._lookup(namespace, key, time.time())
+            if entry is not None:
+                self.stale_fallbacks += 1
+                logger.warning("⚠️ 上游获取失败，返回过期缓存: %s/%s (已缓存 %.0f 秒)", namespace, key, entry.age())
+                return entry.value
+        if self.shared is not None:
+            shared_entry = self.shared.get(namespace, key)
+            if shared_entry is not None:
+                with self._lock:
+                    self.stale_fallbacks += 1
+                logger.warning("⚠️ 上游获取失败，返回共享缓存旧值: %s/%s (已缓存 %.0f 秒)",
+                               namespace, key, shared_entry.age())
+                return shared_entry.value
+        return None
+
+    def refresh(self, namespace, key, loader=None):
+        """同步刷新条目（不回退旧值，也不采用共享缓存中的值），返回新值或None"""
+        if loader is None:
+            with self._lock:
+                entry = self._entries.get((namespace, key))
+                loader = entry.loader if entry is not None else None
+            if loader is None:
+                return None
+        return self._load(namespace, key, loader, adopt_shared=False)
+
+    def peek(self, namespace, key):
+        """查看条目（不计入命中统计，不改变LRU顺序）"""
+        with self._lock:
+            return self._entries.get((namespace, key))
+
+    def memoize(self, namespace, key, value, variant, build):
+        """记忆条目的派生结果，返回(结果, 是否复用, 构造耗时秒数)
+
+        仅当条目当前值仍是value时才记忆，避免把旧值的派生结果挂到新条目上；
+        bytes结果计入条目大小，参与字节上限淘汰
+        """
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry.value is value and entry.variants and variant in entry.variants:
+                result, cost = entry.variants[variant]
+                return result, True, cost
+
+        started = time.perf_counter()
+        result = build()
+        cost = time.perf_counter() - started
+
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry.value is value:
+                if entry.variants is None:
+                    entry.variants = {}
+                if variant not in entry.variants:
+                    entry.variants[variant] = (result, cost)
+                    if isinstance(result, (bytes, bytearray)):
+                        entry.size += len(result)
+                        self.total_bytes += len(result)
+                        self._evict_if_needed()
+        return result, False, cost
+
+    def schedule_refresh(self, namespace, key):
+        """使用条目保存的loader提交后台刷新，已在刷新中或无loader时返回False"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None or entry.loader is None or (namespace, key) in self._refreshing:
+                return False
+            self._schedule_refresh(namespace, key, entry.loader)
+            return True
+
+    def _load(self, namespace, key, loader, adopt_shared=True):
+        """调用loader并写入缓存，同一key的并发加载合并
+
+        有共享后端时：先采用其他进程写入的未过期值；否则获取刷新锁后加载并写回共享缓存，
+        锁被其他进程持有时等待其结果，等不到再自行加载
+        """
+        def call_loader():
+            try:
+                return loader()
+            except Exception as e:
+                logger.exception("❌ 缓存加载异常 %s/%s: %s", namespace, key, e)
+                return None
+
+        def do_load():
+            if self.shared is None:
+                value = call_loader()
+                if value is not None:
+                    self._publish(namespace, key, value, loader)
+                return value
+
+            started = time.time()
+            if adopt_shared:
+                value = self._adopt_shared(namespace, key, loader, self.shared.get(namespace, key))
+                if value is not None:
+                    return value
+
+            token = self.shared.acquire_lock(namespace, key)
+            if token is None:
+                value = self._adopt_shared(namespace, key, loader,
+                                           self.shared.wait_for(namespace, key, started))
+                if value is not None:
+                    return value
+            try:
+                value = call_loader()
+                if value is not None:
+                    self._publish(namespace, key, value, loader)
+                return value
+            finally:
+                self.shared.release_lock(namespace, key, token)
+
+        return self._loads.do((namespace, key), do_load)
+
+    def _publish(self, namespace, key, value, loader):
+        """写入本进程缓存，有共享后端时同时写回共享缓存"""
+        entry = self.set(namespace, key, value, loader=loader)
+        if self.shared is not None:
+            self.shared.set(namespace, key, value, entry.stored_at,
+                            entry.ttl + max(entry.grace, self.stale_if_error))
+        return entry
+
+    def claim_fill(self, namespace, key, loader):
+        """批量加载前的共享层协调，返回 (共享值, 刷新锁令牌)
+
+        其他进程已写入未过期值时直接采用并返回该值；否则尝试获取刷新锁：
+        令牌为None表示其他进程正在加载（改用get_or_load等待其结果），''表示无共享后端或其不可用（照常加载）。
+        取得令牌后须以complete_fill写入结果并释放锁
+        """
+        if self.shared is None:
+            return None, ''
+        value = self._adopt_shared(namespace, key, loader, self.shared.get(namespace, key))
+        if value is not None:
+            return value, None
+        return None, self.shared.acquire_lock(namespace, key)
+
+    def complete_fill(self, namespace, key, value, loader, token):
+        """写入批量加载的结果（本进程与共享缓存）并释放claim_fill取得的锁；value为None时只释放锁"""
+        try:
+            if value is not None:
+                self._publish(namespace, key, value, loader)
+        finally:
+            if self.shared is not None:
+                self.shared.release_lock(namespace, key, token)
+
+    def _adopt_shared(self, namespace, key, loader, shared_entry):
+        """采用共享缓存中未过期且比本进程条目新的值，返回值或None"""
+        if shared_entry is None or shared_entry.age() >= self.ttl_for(namespace):
+            return None
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry.stored_at >= shared_entry.stored_at:
+                return None
+        self.set(namespace, key, shared_entry.value, loader=loader, stored_at=shared_entry.stored_at)
+        return shared_entry.value
+
+    def _schedule_refresh(self, namespace, key, loader):
+        """提交后台刷新任务（调用方持有锁）"""
+        cache_key = (namespace, key)
+        if cache_key in self._refreshing:
+            return
+        self._refreshing.add(cache_key)
+        self.background_refreshes += 1
+
+        def run():
+            try:
+                if self._load(namespace, key, loader) is None:
+                    with self._lock:
+                        self.refresh_failures += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(cache_key)
+
+        try:
+            self._refresh_executor.submit(run)
+        except RuntimeError:
+            # 解释器退出时线程池已关闭
+            self._refreshing.discard(cache_key)
+
+    def set(self, namespace, key, value, ttl=None, loader=None, stored_at=None):
+        """写入缓存（stored_at为采用共享值时的原始写入时间）"""
+        size = estimate_size(value) if self.max_bytes else 0
+        entry = CacheEntry(namespace, key, value,
+                           self.ttl_for(namespace) if ttl is None else ttl,
+                           grace=self.grace_for(namespace), size=size, loader=loader,
+                           stored_at=stored_at)
+        cache_key = (namespace, key)
+        with self._lock:
+            old = self._remove(cache_key)
+            if entry.loader is None and old is not None:
+                entry.loader = old.loader
+            self._entries[cache_key] = entry
+            self.total_bytes += size
+            self._evict_if_needed()
+        return entry
+
+    def delete(self, namespace, key):
+        """删除缓存条目"""
+        with self._lock:
+            return self._remove((namespace, key)) is not None
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def shutdown(self):
+        """停止后台刷新线程，关闭共享后端连接"""
+        self._refresh_executor.shutdown(wait=False, cancel_futures=True)
+        if self.shared is not None:
+            self.shared.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """获取缓存统计"""
+        with self._lock:
+            entries_by_namespace = {}
+            for namespace, _ in self._entries:
+                entries_by_namespace[namespace] = entries_by_namespace.get(namespace, 0) + 1
+
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+                'stale_fallbacks': self.stale_fallbacks,
+                'background_refreshes': self.background_refreshes,
+                'refreshing': len(self._refreshing),
+                'refresh_failures': self.refresh_failures,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'shared': self.shared.get_stats() if self.shared is not None else None,
+                'namespaces': {
+                    namespace: dict(stats,
+                                    entries=entries_by_namespace.get(namespace, 0),
+                                    ttl=self.ttl_for(namespace))
+                    for namespace, stats in self._namespace_stats.items()
+                }
+            }
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+上游熔断模块 - 按端点路径的熔断器，熔断期间直接返回最近一次成功的响应
+- closed: 正常请求，连续CIRCUIT_FAILURE_THRESHOLD次上游故障（超时、连接错误、429/503、5xx）后打开
+- open: 不再请求上游，直接返回该请求最近一次成功的响应（没有则失败），CIRCUIT_OPEN_SECONDS后转为half-open
+- half-open: 只放行CIRCUIT_HALF_OPEN_PROBES个探测请求，成功则关闭，失败则重新打开
+- 只有成功与接口返回success:false（端点可达）算作健康；非JSON、4xx等结果不计为故障也不算健康，
+  half-open时只归还探测名额
+- allow返回放行凭证（状态代号），record只按同一代的结果计数与转换状态，
+  熔断前放行、熔断后才返回的请求不会占用或归还half-open的探测名额
+- 最近成功响应按请求（路径+参数）保存在有界LRU中
+"""
+
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+
+from config import (CIRCUIT_ENABLED, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_OPEN_SECONDS, CIRCUIT_HALF_OPEN_PROBES,
+                    CIRCUIT_FAILURE_CLASSES, CIRCUIT_ENDPOINT_OVERRIDES, CIRCUIT_FALLBACK_MAX_ENTRIES)
+from retry_policy import QUEUE_TIMEOUT, API_ERROR
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """单个端点路径的熔断器"""
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, open_seconds=CIRCUIT_OPEN_SECONDS,
+                 half_open_probes=CIRCUIT_HALF_OPEN_PROBES, failure_classes=CIRCUIT_FAILURE_CLASSES):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.failure_classes = frozenset(failure_classes)
+
+        self.state = CLOSED
+        self.generation = 1  # 每次状态转换加1，放行凭证即放行时的代号
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+        # 统计
+        self.times_opened = 0
+        self.rejected = 0
+        self.last_failure = None
+
+    def allow(self):
+        """放行一次请求时返回放行凭证，拒绝时返回None；half-open时占用一个探测名额，须以record归还"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return None
+                self._transition(HALF_OPEN)
+                logger.info("🔌 上游%s熔断到期，进入半开状态探测", self.name)
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self.rejected += 1
+                    return None
+                self._probes += 1
+            return self.generation
+
+    def is_open(self):
+        """熔断是否处于打开且未到期（不占用探测名额）"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self._opened_at < self.open_seconds
+
+    def record(self, error_class, ticket):
+        """记录一次请求结果，error_class为None表示成功，ticket为allow返回的放行凭证
+
+        凭证不属于当前状态（如熔断前放行的请求在熔断后才返回）时忽略
+        """
+        with self._lock:
+            if ticket != self.generation:
+                return
+            if self.state == HALF_OPEN:
+                self._probes -= 1
+            if error_class == QUEUE_TIMEOUT:
+                # 请求未发出，不代表上游状态
+                return
+            if error_class in self.failure_classes:
+                self.consecutive_failures += 1
+                self.last_failure = error_class
+                if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                    self._open()
+                return
+            if error_class is not None and error_class != API_ERROR:
+                # 非JSON、4xx等：既不是故障也不能证明端点健康
+                return
+            self.consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED)
+                logger.info("✅ 上游%s探测成功，熔断关闭", self.name)
+
+    def _transition(self, state):
+        """切换状态并开始新的一代（调用方持有锁）"""
+        self.state = state
+        self.generation += 1
+        self._probes = 0
+
+    def _open(self):
+        """打开熔断（调用方持有锁）"""
+        self.times_opened += 1
+        logger.warning("⛔ 上游%s连续%s次%s，熔断 %s 秒",
+                       self.name, self.consecutive_failures, self.last_failure, self.open_seconds)
+        self._transition(OPEN)
+        self._opened_at = time.monotonic()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'last_failure': self.last_failure,
+                'open_remaining': (round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+                                   if self.state == OPEN else 0)
+            }
+
+
+class CircuitBreakerRegistry:
+    """按端点路径管理熔断器，并保存各请求最近一次成功的响应"""
+
+    def __init__(self, enabled=CIRCUIT_ENABLED, overrides=None, max_fallbacks=CIRCUIT_FALLBACK_MAX_ENTRIES):
+        self.enabled = enabled
+        self.overrides = CIRCUIT_ENDPOINT_OVERRIDES if overrides is None else overrides
+        self.max_fallbacks = max_fallbacks
+        self._breakers = {}
+        self._last_good = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 统计
+        self.fallback_hits = 0
+        self.fallback_misses = 0
+
+    @staticmethod
+    def endpoint_path(url):
+        """熔断粒度为端点路径，如 https://api.coinank.com/api/longshort/buySell -> /api/longshort/buySell"""
+        return urllib.parse.urlsplit(url).path if '://' in url else url.split('?', 1)[0]
+
+    def breaker(self, url):
+        path = self.endpoint_path(url)
+        with self._lock:
+            breaker = self._breakers.get(path)
+            if breaker is None:
+                breaker = CircuitBreaker(path, **self.overrides.get(path, {}))
+                self._breakers[path] = breaker
+            return breaker
+
+    def allow(self, url):
+        """放行时返回放行凭证（真值），熔断时返回None；未启用熔断时总是放行"""
+        return self.breaker(url).allow() if self.enabled else True
+
+    def is_open(self, url):
+        return self.enabled and self.breaker(url).is_open()
+
+    def record(self, url, error_class, ticket):
+        """记录请求结果，ticket为allow返回的放行凭证"""
+        if self.enabled:
+            self.breaker(url).record(error_class, ticket)
+
+    def remember(self, key, response):
+        """保存请求key最近一次成功的响应"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._last_good[key] = response
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > self.max_fallbacks:
+                self._last_good.popitem(last=False)
+
+    def fallback(self, key):
+        """熔断期间的替代响应：该请求最近一次成功的响应，没有返回None"""
+        with self._lock:
+            response = self._last_good.get(key)
+            if response is None:
+                self.fallback_misses += 1
+            else:
+                self._last_good.move_to_end(key)
+                self.fallback_hits += 1
+            return response
+
+    def get_stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+            fallbacks = len(self._last_good)
+            hits, misses = self.fallback_hits, self.fallback_misses
+        stats = {path: breaker.get_stats() for path, breaker in sorted(breakers.items())}
+        return {
+            'enabled': self.enabled,
+            'open': [path for path, item in stats.items() if item['state'] != CLOSED],
+            'endpoints': stats,
+            'fallback_entries': fallbacks,
+            'fallback_hits': hits,
+            'fallback_misses': misses
+        }
@@ -11,15 +11,47 @@ import base64
 import urllib.request
 import urllib.error
 import urllib.parse
-import gzip
 import io
 import os
+import threading
+import concurrent.futures
 from datetime import datetime
 from proxy_config import get_proxy_config, get_best_proxy
+from http_pool import build_pooled_opener
+from worker_pool import PriorityWorkerPool, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from single_flight import SingleFlight
+from series_store import SeriesStore
+from disk_store import DiskSeriesStore
+from upstream_governor import UpstreamGovernor, SUCCESS, API_ERROR, NEUTRAL
+from circuit_breaker import CircuitBreakerRegistry
+from retry_policy import (RetryPolicyEngine, classify_status, classify_exception, TIMEOUT, CONNECTION,
+                          BAD_RESPONSE, QUEUE_TIMEOUT, API_ERROR as RETRY_API_ERROR)
+from app_logging import get_logger
+from config import BATCH_TIMEOUT, DISK_STORE_ENABLED, PROXY_CHECK_INTERVAL
+import json_codec
+from content_decoding import ACCEPT_ENCODING, read_decoded
+
+logger = get_logger(__name__)
+
+
+# 访问主站建立会话时使用的请求头
+MAIN_PAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:140.0) Gecko/20100101 Firefox/140.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Cache-Control': 'max-age=0'
+}
 
 
 class CoinankAPI:
-    """Coinank API核心类 - 使用urllib直连"""
+    """Coinank API核心类 - 使用共享keep-alive连接池"""
 
     def __init__(self, use_proxy=False):
         """
@@ -32,32 +64,45 @@ class CoinankAPI:
         self.max_proxy_retries = 3
         self.proxy_retry_count = 0
         self.proxy_failed = False
+        self.last_proxy_check = 0  # 重试时最多每PROXY_CHECK_INTERVAL秒检测一次代理
+        self._proxy_check_lock = threading.Lock()
 
         # 代理配置 - 默认禁用代理，使用直连
         self.use_proxy = use_proxy
         if use_proxy:
             # 获取代理配置
             self.proxy_config = get_best_proxy()
-            print(f"🎯 使用代理配置: {self.proxy_config}")
+            logger.info("🎯 使用代理配置: %s", self.proxy_config)
         else:
             self.proxy_config = None
-            print(f"🔗 使用直连模式，不使用代理")
+            logger.info("🔗 使用直连模式，不使用代理")
 
         # 会话缓存
         self.session_established = False
         self.last_session_time = 0
         self.session_timeout = 300  # 5分钟会话超时
 
-        # 请求限流控制 - 已禁用，恢复直接并发访问
-        # self.last_request_time = 0
-        # self.min_request_interval = 1.0  # 最小请求间隔(秒)
-        # self.request_count = 0
-        # self.max_requests_per_minute = 30  # 每分钟最大请求数
-        # self.request_times = []  # 记录请求时间
+        # 上游自适应并发 - 按端点族AIMD调节并发上限，取代固定的请求间隔限流
+        self.governor = UpstreamGovernor()
+        # 重试策略 - 按错误类型与端点族决定是否重试，重试预算为进程级共享
+        self.retry_policy = RetryPolicyEngine()
+        # 熔断 - 按端点路径，熔断期间直接返回最近一次成功的响应，不占用线程等待超时
+        self.circuit_breakers = CircuitBreakerRegistry()
+
+        # 进程级共享工作线程池 - 所有并行获取任务共用，限制全局并发
+        self.worker_pool = PriorityWorkerPool()
+
+        # 请求合并 - 相同(端点, 参数)的并发请求只发一次上游调用
+        self.single_flight = SingleFlight()
+
+        # 时序增量合并 - 刷新时只请求最后几根K线
+        self.series_store = SeriesStore()
+        # 本地时序存储 - 持久化各时序，重启后预热
+        self.disk_store = DiskSeriesStore() if DISK_STORE_ENABLED else None
 
         # 配置连接方式
         self.setup_connection_with_retry()
-        print(f"🔧 使用{'代理' if self.use_proxy else '直连'}模式")
+        logger.info("🔧 使用%s模式", '代理' if self.use_proxy else '直连')
     
     def setup_connection_with_retry(self):
         """配置连接方式 - 优先使用直连模式"""
@@ -65,9 +110,9 @@ class CoinankAPI:
             # 尝试代理连接，最多重试3次
             for attempt in range(self.max_proxy_retries):
                 try:
-                    print(f"🔄 尝试代理连接 (第 {attempt + 1}/{self.max_proxy_retries} 次)...")
+                    logger.info("🔄 尝试代理连接 (第 %s/%s 次)...", attempt + 1, self.max_proxy_retries)
                     if self.setup_proxy_connection():
-                        print("✅ 代理连接配置成功")
+                        logger.info("✅ 代理连接配置成功")
                         self.proxy_retry_count = 0  # 重置重试计数
                         return
                     else:
@@ -77,32 +122,32 @@ class CoinankAPI:
                             # wait_time = (attempt + 1) * 2  # 递增等待时间
                             # print(f"⏳ 代理连接失败，等待 {wait_time} 秒后重试...")
                             # time.sleep(wait_time)
-                            print(f"🔄 代理连接失败，立即重试 (已禁用延迟)...")
+                            logger.info("🔄 代理连接失败，立即重试 (已禁用延迟)...")
 
                 except Exception as e:
                     self.proxy_retry_count += 1
-                    print(f"❌ 代理连接异常 (第 {attempt + 1} 次): {e}")
+                    logger.error("❌ 代理连接异常 (第 %s 次): %s", attempt + 1, e)
                     if attempt < self.max_proxy_retries - 1:
                         # 注释：已禁用代理异常重试延迟
                         # wait_time = (attempt + 1) * 2
                         # print(f"⏳ 等待 {wait_time} 秒后重试...")
                         # time.sleep(wait_time)
-                        print(f"🔄 代理异常，立即重试 (已禁用延迟)...")
+                        logger.info("🔄 代理异常，立即重试 (已禁用延迟)...")
 
             # 代理重试失败，标记为失败并切换到直连
-            print(f"❌ 代理连接重试 {self.max_proxy_retries} 次均失败，切换到直连模式")
+            logger.error("❌ 代理连接重试 %s 次均失败，切换到直连模式", self.max_proxy_retries)
             self.proxy_failed = True
             self.use_proxy = False
 
         # 使用直连（默认模式）
         try:
-            print("🔗 配置直连模式...")
+            logger.info("🔗 配置直连模式...")
             self.setup_direct_connection()
-            print("✅ 直连配置完成")
+            logger.info("✅ 直连配置完成")
         except Exception as e:
-            print(f"❌ 直连配置失败: {e}")
-            # 使用默认opener作为最后的回退
-            self.opener = urllib.request.build_opener()
+            logger.error("❌ 直连配置失败: %s", e)
+            # 使用默认连接池opener作为最后的回退
+            self.opener = build_pooled_opener()
 
     def setup_connection(self):
         """配置连接方式 - 兼容旧方法"""
@@ -111,22 +156,21 @@ class CoinankAPI:
     def setup_proxy_connection(self):
         """配置代理连接"""
         try:
-            print(f"🔄 尝试配置代理: {self.proxy_config}")
+            logger.info("🔄 尝试配置代理: %s", self.proxy_config)
 
             # 测试代理连接
             if not self.test_proxy():
                 return False
 
-            # 创建代理handler
-            proxy_handler = urllib.request.ProxyHandler(self.proxy_config)
-            self.opener = urllib.request.build_opener(proxy_handler)
+            # 创建使用代理的连接池opener
+            self.opener = build_pooled_opener(self.proxy_config)
 
             # 设置User-Agent等头部
             self.opener.addheaders = [
                 ('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'),
                 ('Accept', 'application/json, text/plain, */*'),
                 ('Accept-Language', 'zh-CN,zh;q=0.9,en;q=0.8'),
-                ('Accept-Encoding', 'gzip, deflate, br'),
+                ('Accept-Encoding', ACCEPT_ENCODING),
                 ('Connection', 'keep-alive'),
                 ('Cache-Control', 'no-cache'),
                 ('Pragma', 'no-cache')
@@ -135,35 +179,34 @@ class CoinankAPI:
             return True
 
         except Exception as e:
-            print(f"❌ 代理配置失败: {e}")
+            logger.error("❌ 代理配置失败: %s", e)
             return False
 
     def setup_direct_connection(self):
         """配置直连"""
         try:
-            # 创建无代理的opener
-            proxy_handler = urllib.request.ProxyHandler({})
-            self.opener = urllib.request.build_opener(proxy_handler)
+            # 创建无代理的连接池opener（keep-alive连接复用）
+            self.opener = build_pooled_opener()
 
             # 设置User-Agent等头部
             self.opener.addheaders = [
                 ('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'),
                 ('Accept', 'application/json, text/plain, */*'),
                 ('Accept-Language', 'zh-CN,zh;q=0.9,en;q=0.8'),
-                ('Accept-Encoding', 'gzip, deflate, br'),
+                ('Accept-Encoding', ACCEPT_ENCODING),
                 ('Connection', 'keep-alive'),
                 ('Cache-Control', 'no-cache'),
                 ('Pragma', 'no-cache')
             ]
 
         except Exception as e:
-            print(f"❌ 直连配置失败: {e}")
+            logger.error("❌ 直连配置失败: %s", e)
             raise
 
     def test_proxy(self, timeout=10):
         """测试代理连接 - 增强版本"""
         try:
-            print("🧪 测试代理连接...")
+            logger.debug("🧪 测试代理连接...")
 
             # 创建临时的代理opener进行测试
             proxy_handler = urllib.request.ProxyHandler(self.proxy_config)
@@ -192,48 +235,23 @@ class CoinankAPI:
                             try:
                                 result = json.loads(content)
                                 ip = result.get('origin') or result.get('ip') or result.get('query', 'unknown')
-                                print(f"✅ 代理测试成功，IP: {ip}")
+                                logger.info("✅ 代理测试成功，IP: %s", ip)
                                 return True
                             except json.JSONDecodeError:
                                 # 如果不是JSON，但状态码是200，也认为成功
-                                print(f"✅ 代理测试成功 (非JSON响应)")
+                                logger.info("✅ 代理测试成功 (非JSON响应)")
                                 return True
                 except Exception as url_error:
-                    print(f"⚠️ 测试URL {test_url} 失败: {url_error}")
+                    logger.warning("⚠️ 测试URL %s 失败: %s", test_url, url_error)
                     continue
 
-            print("❌ 所有测试URL均失败")
+            logger.error("❌ 所有测试URL均失败")
             return False
 
         except Exception as e:
-            print(f"❌ 代理测试失败: {e}")
+            logger.error("❌ 代理测试失败: %s", e)
             return False
 
-    def rate_limit_check(self):
-        """检查请求限流 - 已禁用，直接返回"""
-        # 注释：已禁用所有限流机制，恢复直接并发访问
-        pass
-        # current_time = time.time()
-
-        # # 清理1分钟前的请求记录
-        # self.request_times = [t for t in self.request_times if current_time - t < 60]
-
-        # # 检查每分钟请求数限制
-        # if len(self.request_times) >= self.max_requests_per_minute:
-        #     wait_time = 60 - (current_time - self.request_times[0])
-        #     if wait_time > 0:
-        #         print(f"⏳ 请求限流，等待 {wait_time:.1f} 秒...")
-        #         time.sleep(wait_time)
-
-        # # 检查最小请求间隔
-        # if current_time - self.last_request_time < self.min_request_interval:
-        #     wait_time = self.min_request_interval - (current_time - self.last_request_time)
-        #     time.sleep(wait_time)
-
-        # # 记录请求时间
-        # self.request_times.append(time.time())
-        # self.last_request_time = time.time()
-
     def get_connection_status(self):
         """获取连接状态信息"""
         return {
@@ -243,18 +261,16 @@ class CoinankAPI:
             'max_proxy_retries': self.max_proxy_retries,
             'proxy_config': self.proxy_config if self.use_proxy else None,
             'connection_type': '代理' if self.use_proxy else '直连',
-            'status': '正常' if not self.proxy_failed else '代理失败-已切换直连'
+            'status': '正常' if not self.proxy_failed else '代理失败-已切换直连',
+            'connection_pool': self.opener.get_stats()
         }
 
     def test_connection(self):
         """测试网络连接 - 支持代理"""
         connection_type = "代理" if self.use_proxy else "直连"
-        print(f"🧪 测试网络连接 ({connection_type})...")
+        logger.debug("🧪 测试网络连接 (%s)...", connection_type)
 
         try:
-            # 应用请求限流 - 已禁用
-            # self.rate_limit_check()
-
             req = urllib.request.Request(
                 self.main_url,
                 headers={
@@ -264,18 +280,18 @@ class CoinankAPI:
 
             with self.opener.open(req, timeout=10) as response:
                 if response.getcode() == 200:
-                    print(f"✅ 网络连接正常 ({connection_type})")
+                    logger.info("✅ 网络连接正常 (%s)", connection_type)
                     return True
                 else:
-                    print(f"❌ 连接失败，状态码: {response.getcode()}")
+                    logger.error("❌ 连接失败，状态码: %s", response.getcode())
                     return False
 
         except Exception as e:
-            print(f"❌ 网络连接错误 ({connection_type}): {e}")
+            logger.error("❌ 网络连接错误 (%s): %s", connection_type, e)
 
             # 如果代理失败，尝试切换到直连
             if self.use_proxy:
-                print("🔄 代理连接失败，尝试切换到直连...")
+                logger.info("🔄 代理连接失败，尝试切换到直连...")
                 self.use_proxy = False
                 self.setup_direct_connection()
                 return self.test_connection()
@@ -289,32 +305,18 @@ class CoinankAPI:
         # 检查会话是否仍然有效
         if (self.session_established and
             current_time - self.last_session_time < self.session_timeout):
-            print("� 使用缓存的会话")
+            logger.debug("� 使用缓存的会话")
             return True
 
-        print("�🔗 建立新的coinank会话...")
-
-        main_headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:140.0) Gecko/20100101 Firefox/140.0',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0'
-        }
+        logger.info("�🔗 建立新的coinank会话...")
 
         try:
-            req = urllib.request.Request(self.main_url, headers=main_headers)
+            req = urllib.request.Request(self.main_url, headers=MAIN_PAGE_HEADERS)
 
             with self.opener.open(req, timeout=10) as response:
                 if response.getcode() == 200:
-                    print(f"✅ 主站响应: {response.getcode()}")
-                    print("✅ urllib直连成功")
+                    logger.info("✅ 主站响应: %s", response.getcode())
+                    logger.info("✅ urllib直连成功")
 
                     # 更新会话状态
                     self.session_established = True
@@ -322,12 +324,12 @@ class CoinankAPI:
 
                     return True
                 else:
-                    print(f"❌ 主站访问失败: {response.getcode()}")
+                    logger.error("❌ 主站访问失败: %s", response.getcode())
                     self.session_established = False
                     return False
 
         except Exception as e:
-            print(f"❌ 建立会话失败: {e}")
+            logger.error("❌ 建立会话失败: %s", e)
             self.session_established = False
             return False
     
@@ -343,7 +345,7 @@ class CoinankAPI:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:140.0) Gecko/20100101 Firefox/140.0',
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
+            'Accept-Encoding': ACCEPT_ENCODING,
             'client': 'web',
             'web-version': '101',
             'coinank-apikey': api_key,
@@ -356,98 +358,197 @@ class CoinankAPI:
             'TE': 'trailers'
         }
     
-    def fetch_data_with_retry(self, url, params, data_type, max_retries=2, allow_empty_response=False):
-        """带重试的数据获取 - 支持代理和限流"""
-        for attempt in range(max_retries):
-            try:
-                # 应用请求限流 - 已禁用
-                # self.rate_limit_check()
+    def _flight_key(self, url, params):
+        """请求合并key - 端点路径 + 排序后的参数"""
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        return f"{path}?{urllib.parse.urlencode(sorted(params.items()))}"
 
-                # 如果是代理失败导致的重试，尝试重新配置连接
-                if attempt > 0 and self.use_proxy and self.proxy_retry_count > 0:
-                    print(f"🔄 第 {attempt + 1} 次重试，检查代理连接...")
-                    if not self.test_proxy(timeout=5):
-                        print("⚠️ 代理连接异常，尝试重新配置...")
-                        self.setup_connection_with_retry()
+    def fetch_data_with_retry(self, url, params, data_type, max_retries=None, allow_empty_response=False,
+                              fallback=True):
+        """带重试的数据获取 - 相同请求并发时合并为一次上游调用
 
-                headers = self.get_api_headers()
-
-                # 构建完整URL
-                query_string = urllib.parse.urlencode(params)
-                full_url = f"{url}?{query_string}"
-
-                print(f"🔍 {data_type}请求: {full_url}")
+        max_retries为最多尝试次数（含首次），None时按端点族的重试策略；
+        fallback为熔断期间是否返回该请求最近一次成功的响应（时序增量请求由调用方自行降级）
+        """
+        return self.single_flight.do(
+            self._flight_key(url, params),
+            lambda: self._fetch_data_with_retry(url, params, data_type, max_retries, allow_empty_response, fallback)
+        )
+
+    def _circuit_fallback(self, key, data_type, allow_empty_response=False, fallback=True):
+        """熔断期间的快速失败 - 返回该请求最近一次成功的响应"""
+        response = self.circuit_breakers.fallback(key) if fallback else None
+        if response is not None:
+            logger.debug("⛔ %s端点熔断中，返回最近一次成功的数据", data_type)
+            return response
+        logger.warning("⛔ %s端点熔断中，且没有可用的最近数据", data_type, sample=0.1)
+        if allow_empty_response:
+            return {
+                'success': True,
+                'data': {},
+                'msg': f'{data_type}数据暂不可用'
+            }
+        return None
 
-                req = urllib.request.Request(full_url, headers=headers)
+    def _recheck_proxy(self):
+        """重试前检测代理 - 最多每PROXY_CHECK_INTERVAL秒一次，其他线程正在检测时直接跳过"""
+        if time.time() - self.last_proxy_check < PROXY_CHECK_INTERVAL:
+            return
+        if not self._proxy_check_lock.acquire(blocking=False):
+            return
+        try:
+            self.last_proxy_check = time.time()
+            logger.info("🔄 重试前检查代理连接...")
+            if not self.test_proxy(timeout=5):
+                logger.warning("⚠️ 代理连接异常，尝试重新配置...")
+                self.setup_connection_with_retry()
+        finally:
+            self._proxy_check_lock.release()
+
+    def _fetch_data_with_retry(self, url, params, data_type, max_retries=None, allow_empty_response=False,
+                               fallback=True):
+        """带重试的数据获取 - 按错误类型决定是否重试，重试前去相关抖动退避并消耗进程级重试预算
+
+        端点熔断时不请求上游，直接返回最近一次成功的响应
+        """
+        flight_key = self._flight_key(url, params)
+        ticket = self.circuit_breakers.allow(url)
+        if not ticket:
+            return self._circuit_fallback(flight_key, data_type, allow_empty_response, fallback)
 
-                with self.opener.open(req, timeout=10) as response:
-                    print(f"📊 响应状态: {response.getcode()}")
+        policy = self.retry_policy.policy_for(url, max_retries)
+        self.retry_policy.begin()
 
-                    if response.getcode() == 200:
-                        # 检查响应内容类型
-                        content_type = response.headers.get('content-type', '').lower()
-                        if 'application/json' not in content_type:
-                            print(f"⚠️ {data_type}响应不是JSON格式: {content_type}")
-                            continue
+        # 构建完整URL
+        query_string = urllib.parse.urlencode(params)
+        full_url = f"{url}?{query_string}"
 
-                        try:
-                            # 读取响应数据
-                            response_data = response.read()
+        delay = 0
+        attempt = 0
+        while True:
+            attempt += 1
+            error_class = BAD_RESPONSE
+            try:
+                headers = self.get_api_headers()
 
-                            # 检查是否是gzip压缩
-                            if response_data[:2] == b'\x1f\x8b':
-                                # 解压gzip数据
-                                response_data = gzip.decompress(response_data)
+                logger.debug("🔍 %s请求: %s", data_type, full_url)
 
-                            # 解码为字符串
-                            response_text = response_data.decode('utf-8')
-                            data = json.loads(response_text)
+                req = urllib.request.Request(full_url, headers=headers)
 
-                            if data.get('success'):
-                                data_count = len(data.get('data', []) if isinstance(data.get('data'), list)
-                                               else data.get('data', {}).get('tss', []))
-                                print(f"✅ {data_type}数据获取成功 ({data_count} 项)")
-                                return data
-                            else:
-                                error_msg = data.get('msg', '未知错误')
-                                print(f"❌ {data_type}数据API错误: {error_msg}")
-
-                                # 对于某些特定错误，可以返回空响应而不是失败
-                                if allow_empty_response and ('invalid params' in error_msg.lower() or 'not found' in error_msg.lower()):
-                                    print(f"⚠️ {data_type}数据不可用，返回空响应")
-                                    return {
-                                        'success': True,
-                                        'data': {},
-                                        'msg': f'{data_type}数据暂不可用'
-                                    }
-                        except (ValueError, json.JSONDecodeError) as json_error:
-                            print(f"❌ {data_type}JSON解析错误: {json_error}")
+                with self.governor.slot(url) as permit:
+                    if permit is None:
+                        error_class = QUEUE_TIMEOUT
                     else:
-                        print(f"❌ {data_type}数据HTTP错误: {response.getcode()}")
+                        with self.opener.open(req, timeout=10) as response:
+                            logger.debug("📊 响应状态: %s", response.getcode())
+
+                            if response.getcode() != 200:
+                                logger.error("❌ %s数据HTTP错误: %s", data_type, response.getcode())
+                                error_class = classify_status(response.getcode())
+                            elif 'application/json' not in response.headers.get('content-type', '').lower():
+                                # 检查响应内容类型
+                                logger.warning("⚠️ %s响应不是JSON格式: %s", data_type,
+                                               response.headers.get('content-type', ''))
+                            else:
+                                try:
+                                    # 按Content-Encoding流式解压后直接解析
+                                    data = json_codec.loads(read_decoded(response))
+
+                                    if data.get('success'):
+                                        data_count = len(data.get('data', []) if isinstance(data.get('data'), list)
+                                                       else data.get('data', {}).get('tss', []))
+                                        logger.debug("✅ %s数据获取成功 (%s 项)", data_type, data_count)
+                                        permit.mark(SUCCESS)
+                                        error_class = None
+                                        if fallback:
+                                            self.circuit_breakers.remember(flight_key, data)
+                                        return data
+
+                                    error_msg = data.get('msg', '未知错误')
+                                    logger.error("❌ %s数据API错误: %s", data_type, error_msg)
+                                    permit.mark(API_ERROR)
+                                    error_class = RETRY_API_ERROR
+
+                                    # 对于某些特定错误，可以返回空响应而不是失败
+                                    if allow_empty_response and ('invalid params' in error_msg.lower() or 'not found' in error_msg.lower()):
+                                        logger.warning("⚠️ %s数据不可用，返回空响应", data_type)
+                                        permit.mark(NEUTRAL)  # 参数类错误与上游负载无关
+                                        return {
+                                            'success': True,
+                                            'data': {},
+                                            'msg': f'{data_type}数据暂不可用'
+                                        }
+                                except (ValueError, json.JSONDecodeError) as json_error:
+                                    logger.error("❌ %sJSON解析错误: %s", data_type, json_error)
 
             except Exception as e:
-                print(f"❌ {data_type}数据请求异常 (尝试{attempt+1}): {e}")
+                error_class = classify_exception(e)
+                logger.error("❌ %s数据请求异常 (尝试%s): %s", data_type, attempt, e)
+            finally:
+                self.circuit_breakers.record(url, error_class, ticket)
 
-            if attempt < max_retries - 1:
-                # 注释：已禁用重试延迟，直接重试
-                # wait_time = 2
-                # print(f"⏳ 等待 {wait_time} 秒后重试...")
-                # time.sleep(wait_time)
-                print(f"🔄 立即重试 (已禁用延迟)...")
+            if not self.retry_policy.should_retry(policy, attempt, error_class):
+                break
+            ticket = self.circuit_breakers.allow(url)
+            if not ticket:
+                # 本次失败使端点熔断，不再重试
+                return self._circuit_fallback(flight_key, data_type, allow_empty_response, fallback)
+
+            delay = policy.next_delay(delay)
+            logger.info("🔄 %s数据%s，%.2f 秒后重试 (第 %s 次尝试)...", data_type, error_class, delay, attempt + 1)
+            time.sleep(delay)
+
+            # 连接类错误且代理曾失败过时，按间隔重新检测代理
+            if self.use_proxy and self.proxy_retry_count > 0 and error_class in (TIMEOUT, CONNECTION):
+                self._recheck_proxy()
+
+        logger.error("❌ %s数据获取失败 (%s)，已尝试 %s 次", data_type, error_class, attempt)
 
-        print(f"❌ {data_type}数据获取失败，已尝试 {max_retries} 次")
-        
         # 如果允许空响应，返回空数据而不是None
         if allow_empty_response:
-            print(f"⚠️ 返回 {data_type} 空响应作为降级处理")
+            logger.warning("⚠️ 返回 %s 空响应作为降级处理", data_type)
             return {
                 'success': True,
                 'data': {},
                 'msg': f'{data_type}数据暂不可用'
             }
-        
+
         return None
-    
+
+    def _fetch_series(self, key, url, params, data_type, interval, window=None, **kwargs):
+        """时序接口 - 已有基准窗口时只请求尾部并按时间戳合并，否则全量请求并保存为基准
+
+        获取到的数据（全量或增量部分）同时写入本地时序存储；重启后先用本地数据作为基准窗口。
+        端点熔断期间直接返回已合并的最新窗口，不用旧的全量响应覆盖基准窗口
+        """
+        if self.disk_store is not None and self.series_store.needs_seed(key):
+            self.series_store.seed(key, self.disk_store.load(key, window), window)
+
+        if self.circuit_breakers.is_open(url):
+            latest = self.series_store.latest(key)
+            if latest is not None:
+                logger.debug("⛔ %s端点熔断中，返回已合并的最新窗口", data_type)
+                return latest
+
+        tail = self.series_store.plan_tail(key, interval)
+        if tail is not None:
+            response = self.fetch_data_with_retry(url, dict(params, **tail), f"{data_type}增量",
+                                                  fallback=False, **kwargs)
+            merged = self.series_store.merge(key, response)
+            if merged is not None:
+                if self.disk_store is not None:
+                    self.disk_store.save(key, response)
+                return merged
+            logger.debug("🔁 %s增量合并失败，改为全量请求", data_type)
+
+        response = self.fetch_data_with_retry(url, params, data_type, fallback=False, **kwargs)
+        if (response is None or not response.get('data')) and self.circuit_breakers.is_open(url):
+            return self.series_store.latest(key) or response
+        response = self.series_store.store(key, response, window)
+        if self.disk_store is not None:
+            self.disk_store.save(key, response)
+        return response
+
     def fetch_chart_data(self, base_coin="PEPE", interval="1d", data_type="USD"):
         """获取图表数据"""
         url = f"{self.base_url}/api/openInterest/chart"
@@ -456,9 +557,17 @@ class CoinankAPI:
             'interval': interval,
             'type': data_type
         }
-        return self.fetch_data_with_retry(url, params, "图表")
+        return self._fetch_series(('openinterest', base_coin, interval, data_type),
+                                  url, params, "图表", interval)
     
     def fetch_ticker_data(self, base_coin="PEPE"):
+        """获取期货数据 - 相同代币的并发请求合并"""
+        url = f"{self.base_url}/api/tickers"
+        params = {'baseCoin': base_coin}
+        return self.single_flight.do(self._flight_key(url, params),
+                                     lambda: self._fetch_ticker_data(base_coin))
+
+    def _fetch_ticker_data(self, base_coin="PEPE"):
         """获取期货数据 - 使用urllib直连"""
         url = f"{self.base_url}/api/tickers"
         params = {'baseCoin': base_coin}
@@ -467,54 +576,72 @@ class CoinankAPI:
         query_string = urllib.parse.urlencode(params)
         full_url = f"{url}?{query_string}"
 
-        print(f"🔍 获取期货数据: {full_url}")
+        logger.debug("🔍 获取期货数据: %s", full_url)
 
+        flight_key = self._flight_key(url, params)
+        ticket = self.circuit_breakers.allow(url)
+        if not ticket:
+            return self._circuit_fallback(flight_key, "期货")
+
+        error_class = BAD_RESPONSE
         try:
             headers = self.get_api_headers()
             req = urllib.request.Request(full_url, headers=headers)
 
-            with self.opener.open(req, timeout=10) as response:
-                print(f"📊 响应状态: {response.getcode()}")
+            with self.governor.slot(url) as permit:
+                if permit is None:
+                    error_class = QUEUE_TIMEOUT
+                    return None
 
-                if response.getcode() == 200:
-                    # 检查响应内容类型
-                    content_type = response.headers.get('content-type', '').lower()
-                    if 'application/json' not in content_type:
-                        print(f"⚠️ 期货数据响应不是JSON格式: {content_type}")
-                        return None
+                with self.opener.open(req, timeout=10) as response:
+                    logger.debug("📊 响应状态: %s", response.getcode())
 
-                    try:
-                        # 读取响应数据
-                        response_data = response.read()
-
-                        # 检查是否是gzip压缩
-                        if response_data[:2] == b'\x1f\x8b':
-                            # 解压gzip数据
-                            response_data = gzip.decompress(response_data)
-
-                        # 解码为字符串
-                        response_text = response_data.decode('utf-8')
-                        data = json.loads(response_text)
-                        if data.get('success'):
-                            data_count = len(data.get('data', []))
-                            print(f"✅ 期货数据获取成功 ({data_count} 项)")
-                            return data
-                        else:
-                            error_msg = data.get('msg', '未知错误')
-                            print(f"❌ 期货数据API错误: {error_msg}")
+                    if response.getcode() == 200:
+                        # 检查响应内容类型
+                        content_type = response.headers.get('content-type', '').lower()
+                        if 'application/json' not in content_type:
+                            logger.warning("⚠️ 期货数据响应不是JSON格式: %s", content_type)
+                            return None
+
+                        try:
+                            # 按Content-Encoding流式解压后直接解析
+                            data = json_codec.loads(read_decoded(response))
+                            if data.get('success'):
+                                data_count = len(data.get('data', []))
+                                logger.debug("✅ 期货数据获取成功 (%s 项)", data_count)
+                                permit.mark(SUCCESS)
+                                error_class = None
+                                self.circuit_breakers.remember(flight_key, data)
+                                return data
+                            else:
+                                error_msg = data.get('msg', '未知错误')
+                                logger.error("❌ 期货数据API错误: %s", error_msg)
+                                permit.mark(API_ERROR)
+                                error_class = RETRY_API_ERROR
+                                return None
+                        except (ValueError, json.JSONDecodeError) as json_error:
+                            logger.error("❌ 期货数据JSON解析错误: %s", json_error)
                             return None
-                    except (ValueError, json.JSONDecodeError) as json_error:
-                        print(f"❌ 期货数据JSON解析错误: {json_error}")
+                    else:
+                        logger.error("❌ 期货数据HTTP错误: %s", response.getcode())
+                        error_class = classify_status(response.getcode())
                         return None
-                else:
-                    print(f"❌ 期货数据HTTP错误: {response.getcode()}")
-                    return None
 
         except Exception as e:
-            print(f"❌ 期货数据请求异常: {e}")
+            error_class = classify_exception(e)
+            logger.error("❌ 期货数据请求异常: %s", e)
             return None
+        finally:
+            self.circuit_breakers.record(url, error_class, ticket)
 
     def fetch_spot_data(self, base_coin="PEPE"):
+        """获取现货数据 - 相同代币的并发请求合并"""
+        url = f"{self.base_url}/api/tickers/getSpotTickers"
+        params = {'baseCoin': base_coin}
+        return self.single_flight.do(self._flight_key(url, params),
+                                     lambda: self._fetch_spot_data(base_coin))
+
+    def _fetch_spot_data(self, base_coin="PEPE"):
         """获取现货数据 - 使用urllib直连"""
         url = f"{self.base_url}/api/tickers/getSpotTickers"
         params = {'baseCoin': base_coin}
@@ -523,52 +650,63 @@ class CoinankAPI:
         query_string = urllib.parse.urlencode(params)
         full_url = f"{url}?{query_string}"
 
-        print(f"🔍 获取现货数据: {full_url}")
+        logger.debug("🔍 获取现货数据: %s", full_url)
+
+        flight_key = self._flight_key(url, params)
+        ticket = self.circuit_breakers.allow(url)
+        if not ticket:
+            return self._circuit_fallback(flight_key, "现货")
 
+        error_class = BAD_RESPONSE
         try:
             headers = self.get_api_headers()
             req = urllib.request.Request(full_url, headers=headers)
 
-            with self.opener.open(req, timeout=10) as response:
-                print(f"📊 响应状态: {response.getcode()}")
+            with self.governor.slot(url) as permit:
+                if permit is None:
+                    error_class = QUEUE_TIMEOUT
+                    return None
 
-                if response.getcode() == 200:
-                    # 检查响应内容类型
-                    content_type = response.headers.get('content-type', '').lower()
-                    if 'application/json' not in content_type:
-                        print(f"⚠️ 现货数据响应不是JSON格式: {content_type}")
-                        return None
+                with self.opener.open(req, timeout=10) as response:
+                    logger.debug("📊 响应状态: %s", response.getcode())
 
-                    try:
-                        # 读取响应数据
-                        response_data = response.read()
-
-                        # 检查是否是gzip压缩
-                        if response_data[:2] == b'\x1f\x8b':
-                            # 解压gzip数据
-                            response_data = gzip.decompress(response_data)
-
-                        # 解码为字符串
-                        response_text = response_data.decode('utf-8')
-                        data = json.loads(response_text)
-                        if data.get('success'):
-                            data_count = len(data.get('data', []))
-                            print(f"✅ 现货数据获取成功 ({data_count} 项)")
-                            return data
-                        else:
-                            error_msg = data.get('msg', '未知错误')
-                            print(f"❌ 现货数据API错误: {error_msg}")
+                    if response.getcode() == 200:
+                        # 检查响应内容类型
+                        content_type = response.headers.get('content-type', '').lower()
+                        if 'application/json' not in content_type:
+                            logger.warning("⚠️ 现货数据响应不是JSON格式: %s", content_type)
                             return None
-                    except (ValueError, json.JSONDecodeError) as json_error:
-                        print(f"❌ 现货数据JSON解析错误: {json_error}")
+
+                        try:
+                            # 按Content-Encoding流式解压后直接解析
+                            data = json_codec.loads(read_decoded(response))
+                            if data.get('success'):
+                                data_count = len(data.get('data', []))
+                                logger.debug("✅ 现货数据获取成功 (%s 项)", data_count)
+                                permit.mark(SUCCESS)
+                                error_class = None
+                                self.circuit_breakers.remember(flight_key, data)
+                                return data
+                            else:
+                                error_msg = data.get('msg', '未知错误')
+                                logger.error("❌ 现货数据API错误: %s", error_msg)
+                                permit.mark(API_ERROR)
+                                error_class = RETRY_API_ERROR
+                                return None
+                        except (ValueError, json.JSONDecodeError) as json_error:
+                            logger.error("❌ 现货数据JSON解析错误: %s", json_error)
+                            return None
+                    else:
+                        logger.error("❌ 现货数据HTTP错误: %s", response.getcode())
+                        error_class = classify_status(response.getcode())
                         return None
-                else:
-                    print(f"❌ 现货数据HTTP错误: {response.getcode()}")
-                    return None
 
         except Exception as e:
-            print(f"❌ 现货数据请求异常: {e}")
+            error_class = classify_exception(e)
+            logger.error("❌ 现货数据请求异常: %s", e)
             return None
+        finally:
+            self.circuit_breakers.record(url, error_class, ticket)
     
     def fetch_volume_chart(self, base_coin="PEPE", exchange_name="ALL", interval="1d"):
         """获取24H成交额图表数据"""
@@ -578,7 +716,8 @@ class CoinankAPI:
             "exchangeName": exchange_name,
             "interval": interval
         }
-        return self.fetch_data_with_retry(url, params, "24H成交额")
+        return self._fetch_series(('volume', base_coin, exchange_name, interval),
+                                  url, params, "24H成交额", interval)
     
     def fetch_open_interest_chart(self, base_coin="PEPE", interval="1d", data_type="USD"):
         """获取合约持仓量图表数据"""
@@ -588,7 +727,8 @@ class CoinankAPI:
             "interval": interval,
             "type": data_type
         }
-        return self.fetch_data_with_retry(url, params, "合约持仓量")
+        return self._fetch_series(('openinterest', base_coin, interval, data_type),
+                                  url, params, "合约持仓量", interval)
     
     def fetch_long_short_flow(self, base_coin="PEPE", exchange_name="", interval="5m", limit=500):
         """获取净流入数据"""
@@ -599,7 +739,8 @@ class CoinankAPI:
             "baseCoin": base_coin,
             "limit": limit
         }
-        return self.fetch_data_with_retry(url, params, "净流入")
+        return self._fetch_series(('longshort', base_coin, exchange_name, interval),
+                                  url, params, "净流入", interval, window=int(limit))
     
     def fetch_funding_rate_chart(self, base_coin="PEPE", exchange_type="USDT", funding_type=1, interval="5m"):
         """获取资金费率图表数据 - 支持降级处理"""
@@ -611,10 +752,12 @@ class CoinankAPI:
             'interval': interval
         }
         
-        print(f"🔍 获取 {base_coin} 资金费率图表数据，参数: {params}")
+        logger.debug("🔍 获取 %s 资金费率图表数据，参数: %s", base_coin, params)
         
         # 使用允许空响应的选项，避免某些代币不支持时导致API失败
-        return self.fetch_data_with_retry(url, params, "资金费率图表", max_retries=2, allow_empty_response=True)
+        return self._fetch_series(('fundingrate', base_coin, exchange_type, funding_type, interval),
+                                  url, params, "资金费率图表", interval,
+                                  allow_empty_response=True)
     
     def fetch_funding_rate_history(self, base_coin="PEPE", exchange_type="USDT"):
         """获取资金费率历史数据 - 支持降级处理"""
@@ -624,10 +767,10 @@ class CoinankAPI:
             'exchangeType': exchange_type
         }
         
-        print(f"🔍 获取 {base_coin} 资金费率历史数据，参数: {params}")
+        logger.debug("🔍 获取 %s 资金费率历史数据，参数: %s", base_coin, params)
         
         # 使用允许空响应的选项，避免某些代币不支持时导致API失败
-        return self.fetch_data_with_retry(url, params, "资金费率历史", max_retries=2, allow_empty_response=True)
+        return self.fetch_data_with_retry(url, params, "资金费率历史", allow_empty_response=True)
 
     def fetch_coin_detail(self, base_coin="PEPE"):
         """获取代币详细信息"""
@@ -636,92 +779,152 @@ class CoinankAPI:
             'baseCoin': base_coin
         }
 
-        print(f"🔍 获取 {base_coin} 代币详情，参数: {params}")
+        logger.debug("🔍 获取 %s 代币详情，参数: %s", base_coin, params)
 
         return self.fetch_data_with_retry(url, params, "代币详情")
 
+    def _complete_data_tasks(self, token, include_funding=True):
+        """完整数据的子请求及优先级 - 资金费率为后台数据，让位于核心数据"""
+        data_tasks = [
+            ('chart_data', PRIORITY_NORMAL, lambda: self.fetch_chart_data(token)),
+            ('ticker_data', PRIORITY_NORMAL, lambda: self.fetch_ticker_data(token)),
+            ('spot_data', PRIORITY_NORMAL, lambda: self.fetch_spot_data(token)),
+            ('oi_chart_data', PRIORITY_NORMAL, lambda: self.fetch_open_interest_chart(token)),
+            ('volume_chart_data', PRIORITY_NORMAL, lambda: self.fetch_volume_chart(token)),
+            ('net_flow_data', PRIORITY_NORMAL, lambda: self.fetch_long_short_flow(token))
+        ]
+        if include_funding:
+            data_tasks += [
+                ('funding_rate_chart', PRIORITY_LOW, lambda: self.fetch_funding_rate_chart(token)),
+                ('funding_rate_history', PRIORITY_LOW, lambda: self.fetch_funding_rate_history(token))
+            ]
+        return data_tasks
+
+    @staticmethod
+    def _complete_data_result(token, results):
+        """汇总完整数据的子请求结果，全部失败返回None"""
+        if not any(results.values()):
+            return None
+
+        return {
+            'chart_data': results.get('chart_data'),
+            'ticker_data': results.get('ticker_data'),
+            'spot_data': results.get('spot_data'),
+            'oi_chart_data': results.get('oi_chart_data'),
+            'volume_chart_data': results.get('volume_chart_data'),
+            'net_flow_data': results.get('net_flow_data'),
+            'funding_rate_chart': results.get('funding_rate_chart'),
+            'funding_rate_history': results.get('funding_rate_history'),
+            'token': token,
+            'fetch_time': datetime.now().isoformat()
+        }
+
     def get_complete_token_data(self, token="PEPE"):
         """获取完整的代币数据 - 优化版本：并行请求"""
-        print(f"📊 正在获取 {token} 完整数据...")
+        logger.debug("📊 正在获取 %s 完整数据...", token)
 
         # 建立会话
         if not self.establish_session():
-            print("❌ 建立会话失败")
+            logger.error("❌ 建立会话失败")
             return None
 
-        # 使用线程池并行获取数据
-        import concurrent.futures
-        import threading
-
-        # 定义所有需要获取的数据
-        data_tasks = [
-            ('chart_data', lambda: self.fetch_chart_data(token)),
-            ('ticker_data', lambda: self.fetch_ticker_data(token)),
-            ('spot_data', lambda: self.fetch_spot_data(token)),
-            ('oi_chart_data', lambda: self.fetch_open_interest_chart(token)),
-            ('volume_chart_data', lambda: self.fetch_volume_chart(token)),
-            ('net_flow_data', lambda: self.fetch_long_short_flow(token)),
-            ('funding_rate_chart', lambda: self.fetch_funding_rate_chart(token)),
-            ('funding_rate_history', lambda: self.fetch_funding_rate_history(token))
-        ]
-
+        data_tasks = self._complete_data_tasks(token)
         results = {}
         success_count = 0
 
-        # 并行执行所有请求 - 提高并发度
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            # 提交所有任务
-            future_to_name = {
-                executor.submit(task_func): name
-                for name, task_func in data_tasks
-            }
+        # 提交到共享线程池并行执行
+        future_to_name = {
+            self.worker_pool.submit(task_func, priority=priority): name
+            for name, priority, task_func in data_tasks
+        }
 
-            # 收集结果
-            for future in concurrent.futures.as_completed(future_to_name):
+        # 收集结果
+        try:
+            for future in concurrent.futures.as_completed(future_to_name, timeout=15):
                 name = future_to_name[future]
                 try:
-                    result = future.result(timeout=15)  # 15秒超时
+                    result = future.result()
                     results[name] = result
                     if result:
                         success_count += 1
-                        print(f"✅ {name} 获取成功")
+                        logger.debug("✅ %s 获取成功", name)
                     else:
-                        print(f"❌ {name} 获取失败")
+                        logger.error("❌ %s 获取失败", name)
                 except Exception as e:
-                    print(f"❌ {name} 获取异常: {e}")
+                    logger.error("❌ %s 获取异常: %s", name, e)
                     results[name] = None
+        except concurrent.futures.TimeoutError:
+            logger.warning("⏳ 部分数据获取超时: %s", [n for f, n in future_to_name.items() if not f.done()])
+            # 调用方已不再等待，尚未开始的子请求移出共享线程池队列
+            self.worker_pool.cancel(future_to_name)
 
-        print(f"📈 数据获取结果: {success_count}/8 成功")
+        logger.debug("📈 数据获取结果: %s/%s 成功", success_count, len(data_tasks))
 
         if success_count == 0:
-            print("❌ 未能获取到任何数据")
+            logger.error("❌ 未能获取到任何数据")
             return None
 
-        return {
-            'chart_data': results.get('chart_data'),
-            'ticker_data': results.get('ticker_data'),
-            'spot_data': results.get('spot_data'),
-            'oi_chart_data': results.get('oi_chart_data'),
-            'volume_chart_data': results.get('volume_chart_data'),
-            'net_flow_data': results.get('net_flow_data'),
-            'funding_rate_chart': results.get('funding_rate_chart'),
-            'funding_rate_history': results.get('funding_rate_history'),
-            'token': token,
-            'fetch_time': datetime.now().isoformat()
-        }
+        return self._complete_data_result(token, results)
+
+    def iter_complete_token_data(self, tokens, timeout=BATCH_TIMEOUT, include_funding=True):
+        """批量获取多个代币的完整数据，按代币完成顺序逐个产出 (token, 数据或None)
+
+        只建立一次会话；所有代币的子请求平铺提交到共享线程池，
+        由线程池大小统一限制并发，不再为每个代币各自扇出。
+        调用方提前停止迭代（如客户端断开）时取消尚未开始的子请求。
+        """
+        tokens = list(tokens)
+        if not tokens:
+            return
+
+        if not self.establish_session():
+            logger.error("❌ 建立会话失败")
+            for token in tokens:
+                yield token, None
+            return
+
+        results = {token: {} for token in tokens}
+        remaining = {}
+        future_to_task = {}
+        for token in tokens:
+            data_tasks = self._complete_data_tasks(token, include_funding)
+            remaining[token] = len(data_tasks)
+            for name, priority, task_func in data_tasks:
+                future_to_task[self.worker_pool.submit(task_func, priority=priority)] = (token, name)
+
+        try:
+            try:
+                for future in concurrent.futures.as_completed(future_to_task, timeout=timeout):
+                    token, name = future_to_task[future]
+                    try:
+                        results[token][name] = future.result()
+                    except Exception as e:
+                        logger.error("❌ %s %s 获取异常: %s", token, name, e)
+                        results[token][name] = None
+
+                    remaining[token] -= 1
+                    if remaining[token] == 0:
+                        yield token, self._complete_data_result(token, results.pop(token))
+            except concurrent.futures.TimeoutError:
+                logger.warning("⏳ 批量获取超时，未完成代币: %s", list(results))
+
+            # 超时的代币用已完成的部分结果汇总
+            for token in list(results):
+                yield token, self._complete_data_result(token, results.pop(token))
+        finally:
+            self.worker_pool.cancel(future_to_task)
 
     def get_basic_token_data(self, token="PEPE"):
         """获取基础代币数据 - 快速版本，获取核心数据但确保图表能显示"""
-        print(f"⚡ 快速获取 {token} 基础数据...")
+        logger.debug("⚡ 快速获取 %s 基础数据...", token)
 
         # 建立会话
         if not self.establish_session():
-            print("❌ 建立会话失败")
+            logger.error("❌ 建立会话失败")
             return None
 
         # 获取核心数据：价格图表、期货数据、现货数据（这3个是最重要的）
-        import concurrent.futures
-
+        # 代币切换时用户在等待，使用高优先级插队
         basic_tasks = [
             ('chart_data', lambda: self.fetch_chart_data(token)),
             ('ticker_data', lambda: self.fetch_ticker_data(token)),
@@ -731,23 +934,26 @@ class CoinankAPI:
         results = {}
         success_count = 0
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-            future_to_name = {
-                executor.submit(task_func): name
-                for name, task_func in basic_tasks
-            }
+        future_to_name = {
+            self.worker_pool.submit(task_func, priority=PRIORITY_HIGH): name
+            for name, task_func in basic_tasks
+        }
 
-            for future in concurrent.futures.as_completed(future_to_name):
+        try:
+            for future in concurrent.futures.as_completed(future_to_name, timeout=8):
                 name = future_to_name[future]
                 try:
-                    result = future.result(timeout=8)
+                    result = future.result()
                     results[name] = result
                     if result:
                         success_count += 1
-                        print(f"✅ {name} 获取成功")
+                        logger.debug("✅ %s 获取成功", name)
                 except Exception as e:
-                    print(f"❌ {name} 获取异常: {e}")
+                    logger.error("❌ %s 获取异常: %s", name, e)
                     results[name] = None
+        except concurrent.futures.TimeoutError:
+            logger.warning("⏳ 部分基础数据获取超时: %s", [n for f, n in future_to_name.items() if not f.done()])
+            self.worker_pool.cancel(future_to_name)
 
         if success_count == 0:
             return None
@@ -766,6 +972,11 @@ class CoinankAPI:
             'is_basic': True  # 标记为基础数据
         }
 
+    def close(self):
+        """关闭客户端 - 排空共享线程池中已排队的任务"""
+        logger.info("🛑 正在关闭API客户端线程池...")
+        self.worker_pool.shutdown(wait=True)
+
 
 def create_api_client(use_proxy=False):
     """创建API客户端实例 - 默认使用直连"""
@@ -775,14 +986,14 @@ def create_api_client(use_proxy=False):
 def quick_test(use_proxy=False):
     """快速测试API连接 - 默认使用直连"""
     connection_type = "代理" if use_proxy else "直连"
-    print(f"🧪 快速测试API连接 ({connection_type})...")
+    logger.debug("🧪 快速测试API连接 (%s)...", connection_type)
 
     api = create_api_client(use_proxy=use_proxy)
     if api.test_connection():
-        print(f"✅ {connection_type}连接成功")
+        logger.info("✅ %s连接成功", connection_type)
         return api
     else:
-        print(f"❌ {connection_type}连接失败")
+        logger.error("❌ %s连接失败", connection_type)
         return None
 
 
@@ -793,6 +1004,6 @@ if __name__ == "__main__":
         # 测试数据获取
         data = api.get_complete_token_data("PEPE")
         if data:
-            print(f"✅ 成功获取到 {data['token']} 数据")
+            logger.info("✅ 成功获取到 %s 数据", data['token'])
         else:
-            print("❌ 数据获取失败") 
\ No newline at end of file
+            logger.error("❌ 数据获取失败") 
\ No newline at end of file
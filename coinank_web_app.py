@@ -11,8 +11,12 @@ import json
 import socket
 import threading
 import argparse
+import atexit
+import hashlib
+import numpy as np
 from datetime import datetime
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, jsonify, request, send_from_directory, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 import requests
 import warnings
 warnings.filterwarnings('ignore')
@@ -25,18 +29,62 @@ if sys.platform == 'win32':
 
 # 导入数据获取器
 from coin_api import CoinankAPI
+from async_api import SyncCoinankAPI
+from cache import TTLCache
+from app_logging import get_logger
+import json_codec
+from compression import CompressionStats, negotiate_encoding, should_compress, compress
+from series import (price_series, total_series, net_flow_series, positive_series,
+                    to_records, delta_encode, to_float_array,
+                    lttb_indices, downsample_chart)
+from refresh_scheduler import HotKeyScheduler
+from push_hub import PushHub
+from rollup import SERIES_AGGREGATIONS, rollup
+from series_store import interval_ms
+from disk_store import columns_to_response
+from config import (BATCH_MAX_SYMBOLS, BATCH_TIMEOUT, PUSH_HEARTBEAT, PUSH_MAX_TOPICS,
+                    HISTORY_MAX_POINTS, ROLLUP_ENABLED, ROLLUP_BASE_INTERVALS,
+                    ROLLUP_MAX_POINTS, ROLLUP_MIN_POINTS, ROLLUP_MIN_COVERAGE,
+                    DOWNSAMPLE_MIN_POINTS)
+
+logger = get_logger(__name__)
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """Flask JSON提供者 - jsonify经由json_codec序列化，响应体直接使用bytes"""
+
+    def dumps(self, obj, **kwargs):
+        return json_codec.dumps(obj, sort_keys=kwargs.get('sort_keys', False)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return json_codec.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(json_codec.dumps(obj), mimetype=self.mimetype)
 
 # Flask应用配置
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'coinank-web-app-secret-key'
+app.json = CodecJSONProvider(app)
 
 # 全局变量
 api_client = None
 supported_tokens = []  # 动态支持代币，不再限制
 current_token = "PEPE"
-data_cache = {}
-last_update_time = {}
-CACHE_DURATION = 300  # 缓存时间（秒）- 5分钟
+data_cache = TTLCache()  # 有界线程安全缓存，各命名空间TTL见config.CACHE_TTLS
+refresh_scheduler = HotKeyScheduler(data_cache)  # 热点key到期前预刷新
+data_cache.access_listener = refresh_scheduler.record_access
+push_hub = PushHub()  # (代币, 数据流) 主题的SSE推送
+
+compression_stats = CompressionStats()  # 响应压缩统计
+
+# 时序字段及其列，?format=columnar时由逐点字典转为并列数组
+SERIES_FIELDS = {
+    'price_data': ('time', 'price'),
+    'oi_time_series': ('time', 'value'),
+    'net_flow_time_series': ('time', 'value', 'buy_volume', 'sell_volume'),
+    'volume_time_series': ('time', 'value')
+}
 update_timer = None
 
 def check_port_available(port):
@@ -54,86 +102,89 @@ def check_port_available(port):
 
 def find_available_port(start_port=5000, max_attempts=10):
     """查找可用端口 - 带调试信息"""
-    print(f"🔍 正在查找从{start_port}开始的可用端口...")
+    logger.debug("🔍 正在查找从%s开始的可用端口...", start_port)
     
     for i in range(max_attempts):
         port = start_port + i
-        print(f"   检查端口 {port}...", end='')
-        
+
         if check_port_available(port):
-            print(f" ✅ 可用")
+            logger.debug("   检查端口 %s... ✅ 可用", port)
             return port
         else:
-            print(f" ❌ 不可用")
+            logger.debug("   检查端口 %s... ❌ 不可用", port)
     
-    print(f"❌ 检查了 {max_attempts} 个端口，都不可用")
+    logger.error("❌ 检查了 %s 个端口，都不可用", max_attempts)
     return None
 
-def initialize_api_client(use_proxy=False):
-    """初始化API客户端 - 支持代理和直连模式"""
+def initialize_api_client(use_proxy=False, use_async=False):
+    """初始化API客户端 - 支持代理和直连模式，可选asyncio客户端"""
     global api_client
     try:
         proxy_mode = "代理模式" if use_proxy else "直连模式"
-        print(f"🔧 正在初始化API客户端 ({proxy_mode})...")
+        client_mode = "asyncio" if use_async else "线程"
+        logger.info("🔧 正在初始化API客户端 (%s, %s)...", proxy_mode, client_mode)
 
         # 创建API客户端，根据参数选择模式
-        api_client = CoinankAPI(use_proxy=use_proxy)
+        if use_async:
+            # 单事件循环 + 并发信号量，同步门面供Flask线程调用
+            api_client = SyncCoinankAPI(use_proxy=use_proxy)
+        else:
+            api_client = CoinankAPI(use_proxy=use_proxy)
 
         # 测试连接
         if api_client.test_connection():
             connection_type = "代理" if api_client.use_proxy else "直连"
-            print(f"✅ API客户端初始化成功 ({connection_type})")
+            logger.info("✅ API客户端初始化成功 (%s)", connection_type)
 
             # 输出详细连接状态
             if hasattr(api_client, 'get_connection_status'):
                 status = api_client.get_connection_status()
-                print(f"📡 连接状态: {status['status']}")
+                logger.debug("📡 连接状态: %s", status['status'])
                 if status['use_proxy'] and status['proxy_config']:
-                    print(f"🔗 代理配置: {status['proxy_config']['http']}")
+                    logger.info("🔗 代理配置: %s", status['proxy_config']['http'])
 
             return True
         else:
-            print("❌ urllib直连失败")
+            logger.error("❌ urllib直连失败")
             return False
     except Exception as e:
-        print(f"❌ 初始化API客户端失败: {e}")
+        logger.error("❌ 初始化API客户端失败: %s", e)
         return False
 
-def get_token_data(token):
-    """获取代币数据（带缓存）"""
-    cache_key = f"{token}_data"
-    current_time = time.time()
-
-    # 检查缓存
-    if (cache_key in data_cache and
-        cache_key in last_update_time and
-        current_time - last_update_time[cache_key] < CACHE_DURATION):
-        return data_cache[cache_key]
-
-    # 获取新数据
+def load_token_data(token):
+    """从上游获取并处理完整代币数据（不经过缓存），失败返回None"""
     try:
-        print(f"📊 正在获取 {token} 完整数据...")
+        logger.debug("📊 正在获取 %s 完整数据...", token)
 
         # 使用新的API客户端获取数据
         raw_data = api_client.get_complete_token_data(token)
 
         if not raw_data:
-            print(f"❌ 获取 {token} 数据失败 - raw_data为None")
+            logger.error("❌ 获取 %s 数据失败 - raw_data为None", token)
             return None
 
-        print(f"[调试] 原始数据键: {list(raw_data.keys())}")
+        return process_token_data(token, raw_data)
 
-        # 检查每个数据字段
-        for key, value in raw_data.items():
-            if isinstance(value, dict):
-                success = value.get('success', False)
-                data_count = len(value.get('data', [])) if isinstance(value.get('data'), list) else 'N/A'
-                print(f"[调试] {key}: success={success}, data_count={data_count}")
-            else:
-                print(f"[调试] {key}: {type(value)} - {value}")
+    except Exception as e:
+        logger.exception("❌ 获取 %s 数据失败: %s", token, e)
+        return None
+
+def process_token_data(token, raw_data):
+    """处理上游返回的完整代币原始数据，失败返回None"""
+    try:
+        # 检查每个数据字段 - 仅在调试级别启用时遍历
+        if logger.debug_enabled:
+            logger.debug("[调试] 原始数据键: %s", list(raw_data.keys()))
+            for key, value in raw_data.items():
+                if isinstance(value, dict):
+                    success = value.get('success', False)
+                    data_count = len(value.get('data', [])) if isinstance(value.get('data'), list) else 'N/A'
+                    logger.debug("[调试] %s: success=%s, data_count=%s", key, success, data_count)
+                else:
+                    logger.debug("[调试] %s: %s - %s", key, type(value), value)
 
         # 处理数据
-        processed_data = process_data_for_web(
+        return process_data_for_web(
             raw_data.get('chart_data'),
             raw_data.get('ticker_data'),
             raw_data.get('spot_data'),
@@ -143,39 +194,24 @@ def get_token_data(token):
             token
         )
 
-        # 缓存数据
-        data_cache[cache_key] = processed_data
-        last_update_time[cache_key] = current_time
-
-        return processed_data
-
     except Exception as e:
-        print(f"❌ 获取 {token} 数据失败: {e}")
-        import traceback
-        print(f"❌ 详细错误信息: {traceback.format_exc()}")
+        logger.exception("❌ 处理 %s 数据失败: %s", token, e)
         return None
 
-def get_basic_token_data(token):
-    """获取基础代币数据（快速版本）"""
-    cache_key = f"{token}_basic_data"
-    current_time = time.time()
-
-    # 检查缓存（基础数据缓存时间更短）
-    basic_cache_duration = 60  # 1分钟
-    if (cache_key in data_cache and
-        cache_key in last_update_time and
-        current_time - last_update_time[cache_key] < basic_cache_duration):
-        return data_cache[cache_key]
-
-    # 获取新的基础数据
+def get_token_data(token):
+    """获取代币数据（带缓存，过期后先返回旧数据再后台刷新）"""
+    return data_cache.get_or_load('token', token, lambda: load_token_data(token))
+
+def load_basic_token_data(token):
+    """从上游获取并处理基础代币数据（不经过缓存），失败返回None"""
     try:
-        print(f"⚡ 正在快速获取 {token} 基础数据...")
+        logger.debug("⚡ 正在快速获取 %s 基础数据...", token)
 
         # 使用基础数据API
         raw_data = api_client.get_basic_token_data(token)
 
         if not raw_data:
-            print(f"❌ 获取 {token} 基础数据失败")
+            logger.error("❌ 获取 %s 基础数据失败", token)
             return None
 
         # 处理基础数据 - 只处理已获取的核心数据
@@ -192,202 +228,76 @@ def get_basic_token_data(token):
         # 标记为基础数据
         processed_data['is_basic'] = True
 
-        # 缓存基础数据
-        data_cache[cache_key] = processed_data
-        last_update_time[cache_key] = current_time
-
         return processed_data
 
     except Exception as e:
-        print(f"❌ 获取 {token} 基础数据失败: {e}")
+        logger.error("❌ 获取 %s 基础数据失败: %s", token, e)
         return None
 
+def get_basic_token_data(token):
+    """获取基础代币数据（快速版本，基础数据缓存时间更短）"""
+    return data_cache.get_or_load('basic', token, lambda: load_basic_token_data(token))
+
 def process_data_for_web(chart_data, ticker_data, spot_data, oi_chart_data, volume_chart_data, net_flow_data, token):
     """处理数据用于Web展示"""
     try:
-        print(f"[调试] 开始处理数据，输入参数:")
-        print(f"[调试] - chart_data: {type(chart_data)} {'有数据' if chart_data else '无数据'}")
-        print(f"[调试] - ticker_data: {type(ticker_data)} {'有数据' if ticker_data else '无数据'}")
-        print(f"[调试] - spot_data: {type(spot_data)} {'有数据' if spot_data else '无数据'}")
-        print(f"[调试] - oi_chart_data: {type(oi_chart_data)} {'有数据' if oi_chart_data else '无数据'}")
-        print(f"[调试] - volume_chart_data: {type(volume_chart_data)} {'有数据' if volume_chart_data else '无数据'}")
-        print(f"[调试] - net_flow_data: {type(net_flow_data)} {'有数据' if net_flow_data else '无数据'}")
+        logger.debug("[调试] 开始处理数据", token=token, chart=bool(chart_data), ticker=bool(ticker_data),
+                     spot=bool(spot_data), oi_chart=bool(oi_chart_data),
+                     volume_chart=bool(volume_chart_data), net_flow=bool(net_flow_data))
 
         # 提取价格数据
         price_data = []
+        price_values = np.empty(0)
         if chart_data and chart_data.get('success'):
             data = chart_data.get('data', {})
-            timestamps = data.get('tss', [])
-            prices = data.get('prices', [])
-
-            print(f"[调试] 价格数据: timestamps={len(timestamps)}, prices={len(prices)}")
+            price_times, price_values = price_series(data.get('tss', []), data.get('prices', []))
+            price_data = to_records(time=price_times, price=price_values)
 
-            min_length = min(len(timestamps), len(prices))
-            for i in range(min_length):
-                if prices[i] and timestamps[i]:
-                    price_data.append({
-                        'time': timestamps[i],
-                        'price': prices[i]
-                    })
-
-            print(f"[调试] 处理后价格数据点数: {len(price_data)}")
-
-        # 提取持仓量数据 - 使用新的持仓量API数据
-        print(f"[调试] 开始处理持仓量数据...")
-        oi_data = []
-        oi_time_series = []  # 用于在价格图表上显示的时序数据
+            logger.debug("[调试] 处理后价格数据点数: %s", len(price_data))
 
-        # 优先使用持仓量图表API数据
+        # 提取持仓量时序数据（用于在价格图表上显示）- 各交易所逐时间点求和
+        oi_time_series = []
         if oi_chart_data and oi_chart_data.get('success'):
-            print(f"[调试] 使用持仓量图表API数据")
             data = oi_chart_data.get('data', {})
+            oi_times, oi_totals = total_series(data.get('tss', []), data.get('dataValues', {}))
+            oi_time_series = to_records(time=oi_times, value=oi_totals)
 
-            # 处理时序数据（用于价格图表）
-            timestamps = data.get('tss', [])
-            data_values = data.get('dataValues', {})
-
-            print(f"[调试] 持仓量数据: timestamps={len(timestamps)}, dataValues_keys={list(data_values.keys()) if data_values else 'None'}")
-
-            if timestamps and data_values and len(data_values) > 0:
-                # 为每个时间点计算总持仓量
-                for i, timestamp in enumerate(timestamps):
-                    total_oi = 0
-                    for exchange, values in data_values.items():
-                        if i < len(values) and values[i] is not None:
-                            total_oi += values[i]
-
-                    if total_oi > 0:
-                        oi_time_series.append({
-                            'time': timestamp,
-                            'value': total_oi
-                        })
-
-            # 处理分布数据（用于饼图）
-            for exchange, values in data_values.items():
-                if values:
-                    total_value = sum(v for v in values if v is not None and v > 0)
-                    if total_value > 0:
-                        oi_data.append({
-                            'exchange': exchange,
-                            'value': total_value
-                        })
-                        print(f"[调试] 持仓量API - {exchange}: {total_value}")
-
-        # 如果持仓量API数据为空，回退到期货数据
-        if not oi_data and ticker_data:
-            print(f"[调试] 持仓量API数据为空，使用期货数据...")
-            ticker_list = ticker_data.get('data', [])
-            for ticker in ticker_list:
-                oi_usd = ticker.get('oiUSD', 0)
-                exchange_name = ticker.get('exchangeName', '')
-                if oi_usd and oi_usd > 0 and exchange_name:
-                    oi_data.append({
-                        'exchange': exchange_name,
-                        'value': oi_usd
-                    })
-                    print(f"[调试] 期货持仓量 - {exchange_name}: {oi_usd}")
-
-        print(f"[调试] 最终持仓量分布数据数量: {len(oi_data)}")
-        print(f"[调试] 持仓量时序数据数量: {len(oi_time_series)}")
+        logger.debug("[调试] 持仓量时序数据数量: %s", len(oi_time_series))
 
-        # 处理净流入数据
-        print(f"[调试] 开始处理净流入数据...")
+        # 处理净流入数据 - 多空任一侧为空的点直接丢弃
         net_flow_time_series = []
         if net_flow_data and net_flow_data.get('success'):
-            print(f"[调试] 使用净流入API数据")
-
-            try:
-                data = net_flow_data.get('data', {})
-                long_ratios = data.get('longRatios', [])
-                short_ratios = data.get('shortRatios', [])
-                timestamps = data.get('tss', [])
-
-                print(f"[调试] 多头数据数量: {len(long_ratios)}")
-                print(f"[调试] 空头数据数量: {len(short_ratios)}")
-                print(f"[调试] 时间戳数量: {len(timestamps)}")
-
-                # 确保所有数组长度一致
-                min_length = min(len(long_ratios), len(short_ratios), len(timestamps))
-                print(f"[调试] 使用数据长度: {min_length}")
-
-                for i in range(min_length):
-                    timestamp = timestamps[i]
-                    long_volume = long_ratios[i] if i < len(long_ratios) else 0
-                    short_volume = short_ratios[i] if i < len(short_ratios) else 0
-                    net_flow = long_volume - short_volume
-
-                    net_flow_time_series.append({
-                        'time': timestamp,
-                        'value': net_flow,
-                        'buy_volume': long_volume,
-                        'sell_volume': short_volume
-                    })
-
-                    if i < 3:  # 只打印前3个数据点进行调试
-                        print(f"[调试] 净流入数据点 {i}: 时间={timestamp}, 多头={long_volume}, 空头={short_volume}, 净流入={net_flow}")
-
-            except Exception as e:
-                print(f"[调试] 处理净流入数据时出错: {e}")
-                import traceback
-                print(f"[调试] 详细错误: {traceback.format_exc()}")
+            data = net_flow_data.get('data', {})
+            flow_times, long_volumes, short_volumes, net_flows = net_flow_series(
+                data.get('tss', []), data.get('longRatios', []), data.get('shortRatios', []))
+            net_flow_time_series = to_records(time=flow_times, value=net_flows,
+                                              buy_volume=long_volumes, sell_volume=short_volumes)
         else:
-            print(f"[调试] 净流入数据为空或API调用失败")
+            logger.debug("[调试] 净流入数据为空或API调用失败")
 
-        print(f"[调试] 净流入时序数据数量: {len(net_flow_time_series)}")
+        logger.debug("[调试] 净流入时序数据数量: %s", len(net_flow_time_series))
 
-        # 处理24H成交额数据
-        print(f"[调试] 开始处理24H成交额数据...")
+        # 处理24H成交额数据 - 使用single字段，跳过空值和非正值
         volume_time_series = []
         if volume_chart_data and volume_chart_data.get('success'):
-            print(f"[调试] 使用24H成交额API数据")
-
-            try:
-                data = volume_chart_data.get('data', {})
-                timestamps = data.get('tss', [])
-                single_values = data.get('single', [])  # 使用single字段而不是dataValues
-
-                print(f"[调试] 24H成交额时间戳数量: {len(timestamps)}")
-                print(f"[调试] 24H成交额数据数量: {len(single_values)}")
-
-                # 确保时间戳和数据数量一致
-                min_length = min(len(timestamps), len(single_values))
-                print(f"[调试] 使用数据长度: {min_length}")
-
-                for i in range(min_length):
-                    timestamp = timestamps[i]
-                    volume_value = single_values[i]
-
-                    # 跳过null值
-                    if volume_value is not None and volume_value > 0:
-                        volume_time_series.append({
-                            'time': timestamp,
-                            'value': volume_value
-                        })
-
-                        if i < 3:  # 只打印前3个数据点进行调试
-                            print(f"[调试] 24H成交额数据点 {i}: 时间={timestamp}, 成交额={volume_value}")
-
-            except Exception as e:
-                print(f"[调试] 处理24H成交额数据时出错: {e}")
-                import traceback
-                print(f"[调试] 详细错误: {traceback.format_exc()}")
+            data = volume_chart_data.get('data', {})
+            volume_times, volume_values = positive_series(data.get('tss', []), data.get('single', []))
+            volume_time_series = to_records(time=volume_times, value=volume_values)
         else:
-            print(f"[调试] 24H成交额数据为空或API调用失败")
+            logger.debug("[调试] 24H成交额数据为空或API调用失败")
 
-        print(f"[调试] 24H成交额时序数据数量: {len(volume_time_series)}")
+        logger.debug("[调试] 24H成交额时序数据数量: %s", len(volume_time_series))
 
         # 提取价格数据用于统计
-        prices = [item['price'] for item in price_data if item['price'] > 0]
+        prices = price_values[price_values > 0]
 
         # 期货市场数据
         futures_data = []
         if ticker_data and ticker_data.get('success'):
             ticker_list = ticker_data.get('data', [])
-            print(f"[调试] 原始期货数据数量: {len(ticker_list)}")
+            logger.debug("[调试] 原始期货数据数量: %s", len(ticker_list))
 
             for ticker in ticker_list:
-                print(f"[调试] 期货数据: {ticker.get('exchangeName', 'Unknown')} - oiUSD: {ticker.get('oiUSD', 'None')} - price: {ticker.get('lastPrice', 'None')}")
-
                 # 放宽过滤条件，只要有交易所名称就显示
                 if ticker.get('exchangeName') and ticker.get('lastPrice', 0) > 0:
                     # 修复fundingRate为None的问题
@@ -404,17 +314,15 @@ def process_data_for_web(chart_data, ticker_data, spot_data, oi_chart_data, volu
                         'change_24h': ticker.get('priceChange24h', 0)  # 修改为change_24h
                     })
 
-            print(f"[调试] 过滤后期货数据数量: {len(futures_data)}")
+            logger.debug("[调试] 过滤后期货数据数量: %s", len(futures_data))
     
         # 现货市场数据
         spot_data_list = []
         if spot_data and spot_data.get('success'):
             spot_list = spot_data.get('data', [])
-            print(f"[调试] 原始现货数据数量: {len(spot_list)}")
+            logger.debug("[调试] 原始现货数据数量: %s", len(spot_list))
 
             for spot in spot_list:
-                print(f"[调试] 现货数据: {spot.get('exchangeName', 'Unknown')} - turnover24h: {spot.get('turnover24h', 'None')} - price: {spot.get('lastPrice', 'None')}")
-
                 # 放宽过滤条件，只要有交易所名称就显示
                 if spot.get('exchangeName') and spot.get('lastPrice', 0) > 0:
                     spot_data_list.append({
@@ -425,21 +333,21 @@ def process_data_for_web(chart_data, ticker_data, spot_data, oi_chart_data, volu
                         'depth': 0  # 添加depth字段
                     })
 
-            print(f"[调试] 过滤后现货数据数量: {len(spot_data_list)}")
+            logger.debug("[调试] 过滤后现货数据数量: %s", len(spot_data_list))
 
         # 统计信息
         stats = {
-            'current_price': prices[-1] if prices else 0,
-            'highest_price': max(prices) if prices else 0,
-            'lowest_price': min(prices) if prices else 0,
-            'total_oi': sum(item['oi_usd'] for item in futures_data),
+            'current_price': float(prices[-1]) if len(prices) else 0,
+            'highest_price': float(prices.max()) if len(prices) else 0,
+            'lowest_price': float(prices.min()) if len(prices) else 0,
+            'total_oi': sum(item['open_interest'] or 0 for item in futures_data),
             'total_volume': sum(item['volume_24h'] for item in spot_data_list),
             'exchanges_count': len(futures_data),
             'avg_funding_rate': sum(item['funding_rate'] for item in futures_data) / len(futures_data) if futures_data else 0
         }
 
         if len(prices) > 1:
-            stats['price_change_percent'] = ((prices[-1] - prices[0]) / prices[0]) * 100
+            stats['price_change_percent'] = float((prices[-1] - prices[0]) / prices[0] * 100)
         else:
             stats['price_change_percent'] = 0
 
@@ -494,7 +402,7 @@ def process_data_for_web(chart_data, ticker_data, spot_data, oi_chart_data, volu
         # 生成持仓量分布数据 (OI Distribution)
         oi_data = []
         for item in futures_data:
-            if item.get('open_interest', 0) > 0:
+            if (item.get('open_interest') or 0) > 0:
                 oi_data.append({
                     'exchange': item['exchange'],
                     'value': item['open_interest']
@@ -519,9 +427,7 @@ def process_data_for_web(chart_data, ticker_data, spot_data, oi_chart_data, volu
         }
 
     except Exception as e:
-        print(f"❌ 处理数据时出错: {e}")
-        import traceback
-        print(f"❌ 详细错误信息: {traceback.format_exc()}")
+        logger.exception("❌ 处理数据时出错: %s", e)
 
         # 返回基本的空数据结构，确保应用不会崩溃
         return {
@@ -546,6 +452,142 @@ def process_data_for_web(chart_data, ticker_data, spot_data, oi_chart_data, volu
             'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
 
+def series_columns(rows, fields):
+    """逐点字典转为{字段: [值...]}，与逐点字典共享数值对象"""
+    return {field: [row.get(field) for row in rows] for field in fields}
+
+def columnar_view(data, delta=False):
+    """并列数组格式 - 时序字段返回{字段: [值...]}，可选时间戳差分编码
+
+    并列数组只在请求该格式时由逐点字典构造，不随缓存值保存，序列化结果按缓存条目记忆
+    """
+    result = dict(data)
+    for name, fields in SERIES_FIELDS.items():
+        series = series_columns(data.get(name) or [], fields)
+        if delta:
+            series = dict(series, time=delta_encode(series['time']), time_encoding='delta')
+        result[name] = series
+    return result
+
+def downsample_view(data, max_points):
+    """?max_points=N - 各时序字段按LTTB降采样到N个点，多列共用同一组下标"""
+    result = dict(data)
+    for name, fields in SERIES_FIELDS.items():
+        rows = data.get(name) or []
+        if len(rows) <= max_points:
+            continue
+        series = series_columns(rows, fields)
+        ys = np.vstack([to_float_array(series[field], len(rows)) for field in fields[1:]])
+        keep = lttb_indices(to_float_array(series['time']), ys, max_points).tolist()
+        result[name] = [rows[i] for i in keep]
+    return result
+
+def parse_max_points():
+    """解析?max_points=N，未指定或无法解析返回None，过小的值按DOWNSAMPLE_MIN_POINTS处理"""
+    max_points = request.args.get('max_points', type=int)
+    if max_points is None or max_points <= 0:
+        return None
+    return max(max_points, DOWNSAMPLE_MIN_POINTS)
+
+def encode_json(payload):
+    """序列化为紧凑JSON字节（与jsonify输出一致）"""
+    return json_codec.dumps(payload)
+
+def compute_etag(body):
+    """按响应体内容哈希生成强ETag（不含引号）"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def encoded_etag(etag, encoding):
+    """同一内容的不同压缩编码是不同的表示，ETag加编码后缀区分"""
+    return f"{etag}-{encoding}" if encoding else etag
+
+def etag_matches(etag):
+    """If-None-Match是否命中 - 忽略编码后缀与弱标记，按内容比较"""
+    tags = request.if_none_match
+    if not tags:
+        return False
+    if tags.star_tag:
+        return True
+    return any(tag.split('-', 1)[0] == etag for tag in tags.as_set(include_weak=True))
+
+def not_modified_response(etag, encoding=None):
+    """304响应 - 客户端缓存的内容仍然有效"""
+    response = app.response_class(status=304)
+    response.set_etag(encoded_etag(etag, encoding))
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def json_body_response(body, encoding=None, status=200, etag=None):
+    """用已序列化（可能已压缩）的字节构造JSON响应"""
+    response = app.response_class(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding))
+        # 允许浏览器缓存但每次都携带If-None-Match重新验证
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def cached_json_response(namespace, key, value, view, build_payload):
+    """缓存数据的JSON响应 - 序列化结果、ETag与压缩结果按(缓存条目, 视图, 编码)记忆
+
+    缓存命中时直接返回预先压缩好的字节，不再重复序列化和压缩；
+    If-None-Match命中时返回304
+    """
+    body, reused, cost = data_cache.memoize(namespace, key, value, ('json', view),
+                                            lambda: encode_json(build_payload()))
+    compression_stats.record_serialize(cost, reused)
+    etag = data_cache.memoize(namespace, key, value, ('etag', view), lambda: compute_etag(body))[0]
+
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is not None and not should_compress(body):
+        encoding = None
+
+    if etag_matches(etag):
+        return not_modified_response(etag, encoding)
+
+    if encoding is None:
+        return json_body_response(body, etag=etag)
+
+    compressed, reused, cost = data_cache.memoize(namespace, key, value, ('json', view, encoding),
+                                                  lambda: compress(body, encoding))
+    compression_stats.record_compress(encoding, len(body), len(compressed), cost, reused)
+    return json_body_response(compressed, encoding, etag=etag)
+
+@app.after_request
+def compress_response(response):
+    """为未经缓存记忆的JSON响应（期货/现货数据、统计、错误信息等）补充ETag并压缩"""
+    if (response.is_streamed or response.status_code in (204, 304) or
+            'Content-Encoding' in response.headers or response.mimetype != 'application/json'):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    body = response.get_data()
+    if encoding is not None and not should_compress(body):
+        encoding = None
+
+    # 成功的GET请求按内容生成ETag，内容未变时返回304
+    if request.method == 'GET' and response.status_code == 200 and 'ETag' not in response.headers:
+        etag = compute_etag(body)
+        if etag_matches(etag):
+            return not_modified_response(etag, encoding)
+        response.set_etag(encoded_etag(etag, encoding))
+        response.headers['Cache-Control'] = 'no-cache'
+
+    if encoding is None:
+        return response
+
+    started = time.perf_counter()
+    compressed = compress(body, encoding)
+    compression_stats.record_compress(encoding, len(body), len(compressed),
+                                      time.perf_counter() - started, False)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 @app.route('/')
 def index():
     """主页 - 返回简单的API状态页面"""
@@ -573,6 +615,13 @@ def get_token_api(token):
 
     # 检查是否请求基础数据
     basic_only = request.args.get('basic', 'false').lower() == 'true'
+    # 可选并列数组格式: ?format=columnar[&delta=true]
+    columnar = request.args.get('format', '').lower() == 'columnar'
+    delta = request.args.get('delta', 'false').lower() == 'true'
+    # 可选图表降采样: ?max_points=N
+    max_points = parse_max_points()
+
+    namespace = 'basic' if basic_only else 'token'
 
     try:
         if basic_only:
@@ -586,11 +635,22 @@ def get_token_api(token):
             # 如果成功获取数据，将代币添加到支持列表中（如果不存在）
             if token not in supported_tokens:
                 supported_tokens.append(token)
-                print(f"✅ 新增支持代币: {token}")
-
-            return jsonify({
+                logger.info("✅ 新增支持代币: %s", token)
+
+            def view_data():
+                return downsample_view(data, max_points) if max_points else data
+
+            if columnar:
+                return cached_json_response(
+                    namespace, token, data, ('columnar-delta' if delta else 'columnar', max_points),
+                    lambda: {
+                        'success': True,
+                        'format': 'columnar',
+                        'data': columnar_view(view_data(), delta=delta)
+                    })
+            return cached_json_response(namespace, token, data, ('rows', max_points), lambda: {
                 'success': True,
-                'data': data
+                'data': view_data()
             })
         else:
             return jsonify({
@@ -598,29 +658,153 @@ def get_token_api(token):
                 'error': f'输入代币有误：无法获取 {token} 的数据，请检查代币符号是否正确'
             }), 400
     except Exception as e:
-        print(f"❌ 获取代币 {token} 数据时发生异常: {e}")
+        logger.error("❌ 获取代币 %s 数据时发生异常: %s", token, e)
         return jsonify({
             'success': False,
             'error': f'输入代币有误：{token} 数据获取失败，请检查代币符号是否正确'
         }), 400
 
+def parse_symbols(value):
+    """解析?symbols=BTC,ETH,... - 转大写、去空、按出现顺序去重"""
+    symbols = []
+    for symbol in (value or '').split(','):
+        symbol = symbol.strip().upper()
+        if symbol and symbol not in symbols:
+            symbols.append(symbol)
+    return symbols
+
+def batch_line(token, data, view):
+    """批量接口的一行NDJSON - 按(缓存条目, 视图)记忆序列化结果"""
+    def build():
+        if view == 'rows':
+            body = data
+        else:
+            body = columnar_view(data, delta=view == 'columnar-delta')
+        return encode_json({'token': token, 'success': True, 'data': body}) + b'\n'
+
+    line, reused, cost = data_cache.memoize('token', token, data, ('ndjson', view), build)
+    compression_stats.record_serialize(cost, reused)
+    return line
+
+@app.route('/api/tokens/batch')
+def get_tokens_batch():
+    """批量获取多个代币的完整数据（自选列表一次请求）
+
+    ?symbols=BTC,ETH,... 以NDJSON流式返回：缓存命中的代币立即输出，
+    其余代币的上游请求统一提交到共享线程池，每个代币完成即输出一行；
+    多worker部署时先采用其他worker写入共享缓存的值，正由其他worker加载的代币等待其结果，
+    只为取得刷新锁的代币请求上游，结果同时写回共享缓存；
+    最后一行为汇总。支持与/api/token相同的 ?format=columnar[&delta=true]
+    """
+    symbols = parse_symbols(request.args.get('symbols'))
+    if not symbols:
+        return jsonify({'success': False, 'error': '请通过 symbols 参数指定代币，如 ?symbols=BTC,ETH'}), 400
+    if len(symbols) > BATCH_MAX_SYMBOLS:
+        return jsonify({
+            'success': False,
+            'error': f'单次最多请求 {BATCH_MAX_SYMBOLS} 个代币，当前 {len(symbols)} 个'
+        }), 400
+
+    if request.args.get('format', '').lower() == 'columnar':
+        view = 'columnar-delta' if request.args.get('delta', 'false').lower() == 'true' else 'columnar'
+    else:
+        view = 'rows'
+
+    def loader_for(token):
+        return lambda: load_token_data(token)
+
+    def loaded_line(token, data):
+        if data is not None:
+            if token not in supported_tokens:
+                supported_tokens.append(token)
+                logger.info("✅ 新增支持代币: %s", token)
+            return batch_line(token, data, view)
+        return encode_json({
+            'token': token,
+            'success': False,
+            'error': f'输入代币有误：无法获取 {token} 的数据，请检查代币符号是否正确'
+        }) + b'\n'
+
+    def generate():
+        started = time.perf_counter()
+        succeeded = cached = 0
+
+        # 先输出缓存可直接返回的代币（过期但在宽限期内的同时触发后台刷新）
+        missing = []
+        for token in symbols:
+            data = data_cache.get_servable('token', token, loader_for(token))
+            if data is None:
+                missing.append(token)
+            else:
+                succeeded += 1
+                cached += 1
+                yield batch_line(token, data, view)
+
+        if missing and api_client is not None:
+            # 共享缓存协调：采用其他worker的结果，取得刷新锁的代币才由本进程请求上游
+            locks, waiting = {}, []
+            try:
+                for token in missing:
+                    data, lock = data_cache.claim_fill('token', token, loader_for(token))
+                    if data is not None:
+                        succeeded += 1
+                        cached += 1
+                        yield batch_line(token, data, view)
+                    elif lock is None:
+                        waiting.append(token)
+                    else:
+                        locks[token] = lock
+
+                if locks:
+                    logger.debug("📦 批量获取 %s 个代币: %s", len(locks), list(locks))
+                    for token, raw_data in api_client.iter_complete_token_data(list(locks), timeout=BATCH_TIMEOUT,
+                                                                               include_funding=False):
+                        data = process_token_data(token, raw_data) if raw_data else None
+                        data_cache.complete_fill('token', token, data, loader_for(token), locks.pop(token))
+                        if data is None:
+                            # 上游失败时与/api/token一样回退到尚可用的旧值
+                            data = data_cache.get_fallback('token', token)
+                        succeeded += data is not None
+                        yield loaded_line(token, data)
+
+                # 其他worker正在加载的代币：等待其写入共享缓存，等不到再自行加载
+                for token in waiting:
+                    data = data_cache.get_or_load('token', token, loader_for(token))
+                    succeeded += data is not None
+                    yield loaded_line(token, data)
+            finally:
+                # 客户端中途断开或上游超时未返回的代币，释放刷新锁
+                for token, lock in locks.items():
+                    data_cache.complete_fill('token', token, None, None, lock)
+        else:
+            for token in missing:
+                yield encode_json({'token': token, 'success': False, 'error': 'API客户端未初始化'}) + b'\n'
+
+        yield encode_json({
+            'done': True,
+            'requested': len(symbols),
+            'succeeded': succeeded,
+            'cached': cached,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }) + b'\n'
+
+    response = app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    # 禁止反向代理缓冲，保证逐行到达客户端
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/refresh/<token>')
 def refresh_token_data(token):
     """刷新特定代币的数据"""
     token = token.upper()  # 转换为大写
 
-    # 清除缓存
-    cache_key = f"{token}_data"
-    if cache_key in data_cache:
-        del data_cache[cache_key]
-    if cache_key in last_update_time:
-        del last_update_time[cache_key]
-
-    # 重新获取数据
+    # 强制同步刷新缓存（失败时不回退旧数据）
     try:
-        data = get_token_data(token)
+        data = data_cache.refresh('token', token, lambda: load_token_data(token))
         if data:
-            return jsonify({
+            # 与/api/token（不带max_points）相同的视图key，刷新后的首个GET可直接复用序列化结果
+            return cached_json_response('token', token, data, ('rows', None), lambda: {
                 'success': True,
                 'data': data
             })
@@ -635,6 +819,90 @@ def refresh_token_data(token):
             'error': f'输入代币有误：{token} 数据刷新失败'
         }), 400
 
+def chart_view(data, max_points):
+    """图表数据按?max_points降采样，未指定时原样返回"""
+    return downsample_chart(data, max_points) if max_points else data
+
+def fundingrate_view(result_data, max_points):
+    """资金费率响应中的图表数据按?max_points降采样"""
+    if not max_points:
+        return result_data
+    price_data = result_data['data'].get('priceData') or {}
+    return dict(result_data, data=dict(result_data['data'], priceData=chart_view(price_data, max_points)))
+
+def rollup_window(tss, now_ms, step, base_step, points, min_points):
+    """本地基础周期时间戳tss能否聚合出最近points个interval周期的点，能则返回起始桶时间戳，否则None
+
+    本地历史须至少覆盖min_points个目标周期，且覆盖范围内的实际基础点数不低于ROLLUP_MIN_COVERAGE
+    """
+    if len(tss) == 0:
+        return None
+    window_start = (now_ms // step - points + 1) * step
+    # 从本地历史中第一个完整的桶开始，不输出缺少开头数据的桶
+    first = max(window_start, -(-int(tss[0]) // step) * step)
+    if (now_ms - first) // step + 1 < min_points:
+        return None
+    lo = int(np.searchsorted(tss, first))
+    if len(tss) - lo < (now_ms - first) // base_step * ROLLUP_MIN_COVERAGE:
+        return None
+    return first
+
+def rollup_from_base(namespace, base_key, base_loader, disk_key, base_interval, interval,
+                     points, min_points=None):
+    """由本地基础周期时序聚合出interval周期的最近points个点（本地历史至少覆盖min_points个，默认为points）
+
+    先检查本地历史覆盖范围，不足时直接返回，不触碰基础周期缓存（避免一次请求额外请求一次上游）；
+    能聚合时基础周期经由缓存获取（TTL内不请求上游，过期时增量刷新并写入本地存储），聚合结果记忆在
+    基础周期的缓存条目上，不同周期不再各占一个缓存条目。返回 (基础周期缓存值, 与上游结构相同的响应)；
+    未启用、周期不能整除、或本地历史不足时返回 (None, None)，由调用方照常请求上游
+    """
+    disk_store = getattr(api_client, 'disk_store', None)
+    step, base_step = interval_ms(interval), interval_ms(base_interval)
+    try:
+        points = int(points)
+    except (TypeError, ValueError):
+        return None, None
+    min_points = points if min_points is None else min(min_points, points)
+    if (not ROLLUP_ENABLED or disk_store is None or not step or not base_step or
+            step <= base_step or step % base_step or points <= 0):
+        return None, None
+
+    now_ms = int(time.time() * 1000)
+    tss = disk_store.read(disk_key, start=(now_ms // step - points + 1) * step)[0]
+    if rollup_window(tss, now_ms, step, base_step, points, min_points) is None:
+        return None, None
+
+    base_value = data_cache.get_or_load(namespace, base_key, base_loader)
+    if not base_value:
+        return None, None
+
+    def build():
+        now_ms = int(time.time() * 1000)
+        tss, columns, attrs = disk_store.read(disk_key, start=(now_ms // step - points + 1) * step)
+        first = rollup_window(tss, now_ms, step, base_step, points, min_points)
+        if first is None:
+            return None
+        lo = int(np.searchsorted(tss, first))
+        bucket_tss, rolled = rollup(tss[lo:], {name: values[lo:] for name, values in columns.items()},
+                                    step, SERIES_AGGREGATIONS.get(disk_key[0], 'last'))
+        if 'interval' in attrs:
+            attrs = dict(attrs, interval=interval)
+        return columns_to_response(bucket_tss, rolled, attrs)
+
+    rolled = data_cache.memoize(namespace, base_key, base_value, ('rollup', interval, points), build)[0]
+    if rolled is None:
+        return None, None
+    return base_value, rolled
+
+def load_volume24h_data(token, exchange_name, interval):
+    """从上游获取24H成交量数据，失败返回None"""
+    volume_data = api_client.fetch_volume_chart(token, exchange_name, interval)
+    if volume_data and volume_data.get('success'):
+        logger.debug("✅ 24H成交量数据获取成功: %s", token)
+        return volume_data
+    logger.error("❌ 24H成交量数据获取失败: %s", token)
+    return None
+
 @app.route('/api/volume24h/<token>')
 def get_volume24h_data(token):
     """获取24H成交量数据"""
@@ -644,51 +912,45 @@ def get_volume24h_data(token):
     exchange_name = request.args.get('exchangeName', 'ALL')
     interval = request.args.get('interval', '1d')
 
-    # 构建缓存键
-    cache_key = f"{token}_volume24h_{exchange_name}_{interval}"
-    current_time = time.time()
-
-    # 检查缓存
-    if (cache_key in data_cache and
-        cache_key in last_update_time and
-        current_time - last_update_time[cache_key] < CACHE_DURATION):
-        print(f"📊 返回缓存的24H成交量数据: {token}")
+    if not api_client:
         return jsonify({
-            'success': True,
-            'data': data_cache[cache_key]
-        })
+            'success': False,
+            'error': 'API client not initialized'
+        }), 500
 
-    # 获取新数据
-    if api_client:
-        try:
-            volume_data = api_client.fetch_volume_chart(token, exchange_name, interval)
-            if volume_data and volume_data.get('success'):
-                # 缓存数据
-                data_cache[cache_key] = volume_data
-                last_update_time[cache_key] = current_time
-                print(f"✅ 24H成交量数据获取成功: {token}")
-                return jsonify({
-                    'success': True,
-                    'data': volume_data
-                })
-            else:
-                print(f"❌ 24H成交量数据获取失败: {token}")
-                return jsonify({
-                    'success': False,
-                    'error': 'Failed to fetch volume data'
-                }), 500
-        except Exception as e:
-            print(f"❌ 24H成交量数据获取异常: {e}")
+    # 构建缓存键
+    cache_key = f"{token}_{exchange_name}_{interval}"
+
+    try:
+        volume_data = data_cache.get_or_load(
+            'volume24h', cache_key,
+            lambda: load_volume24h_data(token, exchange_name, interval))
+        if volume_data:
+            return cached_json_response('volume24h', cache_key, volume_data, 'default', lambda: {
+                'success': True,
+                'data': volume_data
+            })
+        else:
             return jsonify({
                 'success': False,
-                'error': str(e)
+                'error': 'Failed to fetch volume data'
             }), 500
-    else:
+    except Exception as e:
+        logger.error("❌ 24H成交量数据获取异常: %s", e)
         return jsonify({
             'success': False,
-            'error': 'API client not initialized'
+            'error': str(e)
         }), 500
 
+def load_netflow_data(token, exchange_name, interval, limit):
+    """从上游获取净流入数据，失败返回None"""
+    netflow_data = api_client.fetch_long_short_flow(token, exchange_name, interval, limit)
+    if netflow_data and netflow_data.get('success'):
+        logger.debug("✅ 净流入数据获取成功: %s", token)
+        return netflow_data
+    logger.error("❌ 净流入数据获取失败: %s", token)
+    return None
+
 @app.route('/api/netflow/<token>')
 def get_netflow_data(token):
     """获取净流入数据"""
@@ -698,53 +960,59 @@ def get_netflow_data(token):
     exchange_name = request.args.get('exchangeName', '')
     interval = request.args.get('interval', '12h')
     limit = request.args.get('limit', '500')
+    max_points = parse_max_points()
 
-    # 构建缓存键
-    cache_key = f"{token}_netflow_{exchange_name}_{interval}_{limit}"
-    current_time = time.time()
-
-    # 检查缓存
-    if (cache_key in data_cache and
-        cache_key in last_update_time and
-        current_time - last_update_time[cache_key] < CACHE_DURATION):
-        print(f"📊 返回缓存的净流入数据: {token}")
-        cached_data = data_cache[cache_key]
+    if not api_client:
         return jsonify({
-            'success': True,
-            'data': cached_data.get('data', []) if isinstance(cached_data, dict) else cached_data
-        })
+            'success': False,
+            'error': 'API client not initialized'
+        }), 500
 
-    # 获取新数据
-    if api_client:
-        try:
-            netflow_data = api_client.fetch_long_short_flow(token, exchange_name, interval, limit)
-            if netflow_data and netflow_data.get('success'):
-                # 缓存数据
-                data_cache[cache_key] = netflow_data
-                last_update_time[cache_key] = current_time
-                print(f"✅ 净流入数据获取成功: {token}")
-                return jsonify({
-                    'success': True,
-                    'data': netflow_data.get('data', [])  # 直接返回数据数组
-                })
-            else:
-                print(f"❌ 净流入数据获取失败: {token}")
-                return jsonify({
-                    'success': False,
-                    'error': 'Failed to fetch net flow data'
-                }), 500
-        except Exception as e:
-            print(f"❌ 净流入数据获取异常: {e}")
+    # 构建缓存键
+    cache_key = f"{token}_{exchange_name}_{interval}_{limit}"
+
+    try:
+        # 粗周期优先由本地5m等细周期时序聚合（买卖额累加）
+        base_interval = ROLLUP_BASE_INTERVALS.get('netflow')
+        base_key = f"{token}_{exchange_name}_{base_interval}_500"
+        base_value, rolled = rollup_from_base(
+            'netflow', base_key, lambda: load_netflow_data(token, exchange_name, base_interval, '500'),
+            ('longshort', token, exchange_name, base_interval), base_interval, interval,
+            limit, ROLLUP_MIN_POINTS)
+        if rolled:
+            return cached_json_response(
+                'netflow', base_key, base_value, ('rollup', interval, limit, max_points),
+                lambda: {'success': True, 'data': chart_view(rolled['data'], max_points)})
+
+        netflow_data = data_cache.get_or_load(
+            'netflow', cache_key,
+            lambda: load_netflow_data(token, exchange_name, interval, limit))
+        if netflow_data:
+            return cached_json_response('netflow', cache_key, netflow_data, ('default', max_points), lambda: {
+                'success': True,
+                'data': chart_view(netflow_data.get('data', []), max_points)  # 直接返回数据数组
+            })
+        else:
             return jsonify({
                 'success': False,
-                'error': str(e)
+                'error': 'Failed to fetch net flow data'
             }), 500
-    else:
+    except Exception as e:
+        logger.error("❌ 净流入数据获取异常: %s", e)
         return jsonify({
             'success': False,
-            'error': 'API client not initialized'
+            'error': str(e)
         }), 500
 
+def load_openinterest_data(token, interval, data_type):
+    """从上游获取合约持仓量数据，失败返回None"""
+    oi_data = api_client.fetch_chart_data(token, interval, data_type)
+    if oi_data and oi_data.get('success'):
+        logger.debug("✅ 合约持仓量数据获取成功: %s", token)
+        return oi_data
+    logger.error("❌ 合约持仓量数据获取失败: %s", token)
+    return None
+
 @app.route('/api/openinterest/<token>')
 def get_openinterest_data(token):
     """获取合约持仓量数据"""
@@ -753,99 +1021,150 @@ def get_openinterest_data(token):
     # 获取请求参数
     interval = request.args.get('interval', '1h')
     data_type = request.args.get('type', 'USD')
+    max_points = parse_max_points()
 
-    # 构建缓存键
-    cache_key = f"{token}_openinterest_{interval}_{data_type}"
-    current_time = time.time()
-
-    # 检查缓存
-    if (cache_key in data_cache and
-        cache_key in last_update_time and
-        current_time - last_update_time[cache_key] < CACHE_DURATION):
-        print(f"📊 返回缓存的合约持仓量数据: {token}")
-        cached_data = data_cache[cache_key]
+    if not api_client:
         return jsonify({
-            'success': True,
-            'data': cached_data.get('data', {}) if isinstance(cached_data, dict) else cached_data
-        })
+            'success': False,
+            'error': 'API client not initialized'
+        }), 500
 
-    # 获取新数据
-    if api_client:
-        try:
-            oi_data = api_client.fetch_chart_data(token, interval, data_type)
-            if oi_data and oi_data.get('success'):
-                # 缓存数据
-                data_cache[cache_key] = oi_data
-                last_update_time[cache_key] = current_time
-                print(f"✅ 合约持仓量数据获取成功: {token}")
-                return jsonify({
-                    'success': True,
-                    'data': oi_data.get('data', {})  # 直接返回数据对象
-                })
-            else:
-                print(f"❌ 合约持仓量数据获取失败: {token}")
-                return jsonify({
-                    'success': False,
-                    'error': 'Failed to fetch open interest data'
-                }), 500
-        except Exception as e:
-            print(f"❌ 合约持仓量数据获取异常: {e}")
+    # 构建缓存键
+    cache_key = f"{token}_{interval}_{data_type}"
+
+    try:
+        # 粗周期优先由本地细周期时序聚合（价格与持仓量取桶内最后值）
+        base_interval = ROLLUP_BASE_INTERVALS.get('openinterest')
+        base_key = f"{token}_{base_interval}_{data_type}"
+        base_value, rolled = rollup_from_base(
+            'openinterest', base_key, lambda: load_openinterest_data(token, base_interval, data_type),
+            ('openinterest', token, base_interval, data_type), base_interval, interval,
+            ROLLUP_MAX_POINTS, ROLLUP_MIN_POINTS)
+        if rolled:
+            return cached_json_response(
+                'openinterest', base_key, base_value, ('rollup', interval, max_points),
+                lambda: {'success': True, 'data': chart_view(rolled['data'], max_points)})
+
+        oi_data = data_cache.get_or_load(
+            'openinterest', cache_key,
+            lambda: load_openinterest_data(token, interval, data_type))
+        if oi_data:
+            return cached_json_response('openinterest', cache_key, oi_data, ('default', max_points), lambda: {
+                'success': True,
+                'data': chart_view(oi_data.get('data', {}), max_points)  # 直接返回数据对象
+            })
+        else:
             return jsonify({
                 'success': False,
-                'error': str(e)
+                'error': 'Failed to fetch open interest data'
             }), 500
-    else:
+    except Exception as e:
+        logger.error("❌ 合约持仓量数据获取异常: %s", e)
         return jsonify({
             'success': False,
-            'error': 'API client not initialized'
+            'error': str(e)
         }), 500
 
+def load_coin_detail(token):
+    """从上游获取代币详情，失败返回None"""
+    detail_data = api_client.fetch_coin_detail(token)
+    if detail_data and detail_data.get('success'):
+        logger.debug("✅ 代币详情获取成功: %s", token)
+        return detail_data
+    logger.error("❌ 代币详情获取失败: %s", token)
+    return None
+
 @app.route('/api/coindetail/<token>')
 def get_coin_detail(token):
     """获取代币详细信息"""
     token = token.upper()
 
-    # 构建缓存键
-    cache_key = f"{token}_coindetail"
-    current_time = time.time()
-
-    # 检查缓存（代币详情缓存时间较长，1小时）
-    DETAIL_CACHE_DURATION = 3600  # 1小时
-    if (cache_key in data_cache and
-        cache_key in last_update_time and
-        current_time - last_update_time[cache_key] < DETAIL_CACHE_DURATION):
-        print(f"📊 返回缓存的代币详情: {token}")
-        return jsonify(data_cache[cache_key])
-
-    # 获取新数据
-    if api_client:
-        try:
-            detail_data = api_client.fetch_coin_detail(token)
-            if detail_data and detail_data.get('success'):
-                # 缓存数据
-                data_cache[cache_key] = detail_data
-                last_update_time[cache_key] = current_time
-                print(f"✅ 代币详情获取成功: {token}")
-                return jsonify(detail_data)
-            else:
-                print(f"❌ 代币详情获取失败: {token}")
-                return jsonify({
-                    'success': False,
-                    'error': 'Failed to fetch coin detail'
-                }), 500
-        except Exception as e:
-            print(f"❌ 代币详情获取异常: {e}")
+    if not api_client:
+        return jsonify({
+            'success': False,
+            'error': 'API client not initialized'
+        }), 500
+
+    try:
+        # 代币详情缓存时间较长，1小时
+        detail_data = data_cache.get_or_load('coindetail', token, lambda: load_coin_detail(token))
+        if detail_data:
+            return cached_json_response('coindetail', token, detail_data, 'default', lambda: detail_data)
+        else:
             return jsonify({
                 'success': False,
-                'error': str(e)
+                'error': 'Failed to fetch coin detail'
             }), 500
-    else:
+    except Exception as e:
+        logger.error("❌ 代币详情获取异常: %s", e)
         return jsonify({
             'success': False,
-            'error': 'API client not initialized'
+            'error': str(e)
         }), 500
 
 
+def load_fundingrate_data(token, interval):
+    """从上游获取资金费率图表与历史数据并合并，全部失败返回None"""
+    logger.debug("📊 开始获取 %s 资金费率数据...", token)
+
+    # 顺序获取数据，避免并发问题 - 使用正确的参数传递
+    logger.debug("📊 获取资金费率图表数据...")
+    price_data = api_client.fetch_funding_rate_chart(
+        base_coin=token,
+        interval=interval  # 支持前端传递的interval参数
+    )
+    logger.debug("📊 资金费率图表数据结果: %s", price_data.get('success') if price_data else 'None')
+
+    logger.debug("📊 获取资金费率历史数据...")
+    funding_data = api_client.fetch_funding_rate_history(token)
+    logger.debug("📊 资金费率历史数据结果: %s", funding_data.get('success') if funding_data else 'None')
+
+    # 检查数据获取结果，允许部分失败
+    price_success = price_data and price_data.get('success')
+    funding_success = funding_data and funding_data.get('success')
+
+    logger.debug("📊 数据获取结果: price_success=%s, funding_success=%s", price_success, funding_success)
+
+    if not (price_success or funding_success):
+        logger.error("❌ 资金费率数据完全获取失败: price_success=%s, funding_success=%s", price_success, funding_success)
+        return None
+
+    # 处理图表数据 - 资金费率图表API已包含价格和费率数据
+    chart_data = price_data.get('data', {}) if price_success else {}
+
+    # 资金费率图表API返回的数据格式正好符合前端期望：
+    # chartData: [timestamp, price, exchange1_rate, exchange2_rate, ...]
+    # exchanges: ["Binance", "Okex", "Bybit", ...]
+    processed_price_data = {
+        'exchanges': chart_data.get('exchanges', []),
+        'type': chart_data.get('type', 'USDT'),
+        'interval': chart_data.get('interval', interval),
+        'baseCoin': chart_data.get('baseCoin', token),
+        'chartData': chart_data.get('chartData', [])
+    }
+
+    # 处理历史数据 - 保持原始格式供后续扩展使用
+    processed_funding_data = funding_data.get('data', []) if funding_success else []
+
+    # 合并数据
+    result_data = {
+        'success': True,
+        'data': {
+            'priceData': processed_price_data,
+            'fundingData': processed_funding_data
+        },
+        'warnings': []
+    }
+
+    # 添加警告信息
+    if not price_success:
+        result_data['warnings'].append(f'{token} 资金费率图表数据暂不可用')
+    if not funding_success:
+        result_data['warnings'].append(f'{token} 资金费率历史数据暂不可用')
+
+    logger.debug("✅ 资金费率数据处理完成: %s (warnings: %s)", token, len(result_data['warnings']))
+    return result_data
+
 @app.route('/api/fundingrate/<token>')
 def get_fundingrate_data(token):
     """获取资金费率数据"""
@@ -853,108 +1172,57 @@ def get_fundingrate_data(token):
 
     # 获取请求参数
     interval = request.args.get('interval', '1h')
+    max_points = parse_max_points()
+
+    if not api_client:
+        return jsonify({
+            'success': False,
+            'error': 'API client not initialized'
+        }), 500
 
     # 构建缓存键
-    cache_key = f"{token}_fundingrate_{interval}"
-    current_time = time.time()
-
-    # 检查缓存（资金费率缓存时间较短，30分钟）
-    FUNDING_CACHE_DURATION = 1800  # 30分钟
-    if (cache_key in data_cache and
-        cache_key in last_update_time and
-        current_time - last_update_time[cache_key] < FUNDING_CACHE_DURATION):
-        print(f"📊 返回缓存的资金费率数据: {token}")
-        return jsonify(data_cache[cache_key])
-
-    # 获取新数据
-    if api_client:
-        try:
-            # 使用coin_api.py中的方法获取数据
-            print(f"📊 开始获取 {token} 资金费率数据...")
-
-            # 顺序获取数据，避免并发问题 - 使用正确的参数传递
-            print(f"📊 获取资金费率图表数据...")
-            price_data = api_client.fetch_funding_rate_chart(
-                base_coin=token,
-                interval=interval  # 支持前端传递的interval参数
-            )
-            print(f"📊 资金费率图表数据结果: {price_data.get('success') if price_data else 'None'}")
-
-            print(f"📊 获取资金费率历史数据...")
-            funding_data = api_client.fetch_funding_rate_history(token)
-            print(f"📊 资金费率历史数据结果: {funding_data.get('success') if funding_data else 'None'}")
-
-            # 检查数据获取结果，允许部分失败
-            price_success = price_data and price_data.get('success')
-            funding_success = funding_data and funding_data.get('success')
-            
-            print(f"📊 数据获取结果: price_success={price_success}, funding_success={funding_success}")
-            
-            if price_success or funding_success:
-                # 处理图表数据 - 资金费率图表API已包含价格和费率数据
-                chart_data = price_data.get('data', {}) if price_success else {}
-                
-                # 资金费率图表API返回的数据格式正好符合前端期望：
-                # chartData: [timestamp, price, exchange1_rate, exchange2_rate, ...]
-                # exchanges: ["Binance", "Okex", "Bybit", ...]
-                processed_price_data = {
-                    'exchanges': chart_data.get('exchanges', []),
-                    'type': chart_data.get('type', 'USDT'),
-                    'interval': chart_data.get('interval', interval),
-                    'baseCoin': chart_data.get('baseCoin', token),
-                    'chartData': chart_data.get('chartData', [])
-                }
-                
-                # 处理历史数据 - 保持原始格式供后续扩展使用
-                processed_funding_data = funding_data.get('data', []) if funding_success else []
-                
-                # 合并数据
-                result_data = {
-                    'success': True,
-                    'data': {
-                        'priceData': processed_price_data,
-                        'fundingData': processed_funding_data
-                    },
-                    'warnings': []
-                }
-                
-                # 添加警告信息
-                if not price_success:
-                    result_data['warnings'].append(f'{token} 资金费率图表数据暂不可用')
-                if not funding_success:
-                    result_data['warnings'].append(f'{token} 资金费率历史数据暂不可用')
-
-                # 缓存数据
-                data_cache[cache_key] = result_data
-                last_update_time[cache_key] = current_time
-                print(f"✅ 资金费率数据处理完成: {token} (warnings: {len(result_data['warnings'])})")
-                return jsonify(result_data)
-            else:
-                print(f"❌ 资金费率数据完全获取失败: price_success={price_success}, funding_success={funding_success}")
-                return jsonify({
-                    'success': False,
-                    'error': f'{token} 资金费率数据暂不可用，可能该代币不支持资金费率查询'
-                }), 404
+    cache_key = f"{token}_{interval}"
 
-        except Exception as e:
-            print(f"❌ 资金费率数据获取异常: {e}")
+    try:
+        # 粗周期优先由本地细周期时序聚合图表数据，费率历史沿用基础周期条目
+        base_interval = ROLLUP_BASE_INTERVALS.get('fundingrate')
+        base_key = f"{token}_{base_interval}"
+        base_value, rolled = rollup_from_base(
+            'fundingrate', base_key, lambda: load_fundingrate_data(token, base_interval),
+            ('fundingrate', token, 'USDT', 1, base_interval), base_interval, interval,
+            ROLLUP_MAX_POINTS, ROLLUP_MIN_POINTS)
+        if rolled:
+            rolled_data = dict(base_value, data=dict(base_value['data'], priceData={
+                'exchanges': rolled['data'].get('exchanges', []),
+                'type': rolled['data'].get('type', 'USDT'),
+                'interval': interval,
+                'baseCoin': rolled['data'].get('baseCoin', token),
+                'chartData': rolled['data'].get('chartData', [])
+            }))
+            return cached_json_response(
+                'fundingrate', base_key, base_value, ('rollup', interval, max_points),
+                lambda: fundingrate_view(rolled_data, max_points))
+
+        # 资金费率缓存时间较短，30分钟
+        result_data = data_cache.get_or_load(
+            'fundingrate', cache_key,
+            lambda: load_fundingrate_data(token, interval))
+        if result_data:
+            return cached_json_response('fundingrate', cache_key, result_data, ('default', max_points),
+                                        lambda: fundingrate_view(result_data, max_points))
+        else:
             return jsonify({
                 'success': False,
-                'error': str(e)
-            }), 500
-    else:
+                'error': f'{token} 资金费率数据暂不可用，可能该代币不支持资金费率查询'
+            }), 404
+    except Exception as e:
+        logger.error("❌ 资金费率数据获取异常: %s", e)
         return jsonify({
             'success': False,
-            'error': 'API client not initialized'
+            'error': str(e)
         }), 500
 
 
-
-
-
-
-
-
 @app.route('/api/futures-data/<token>')
 def get_futures_market_data(token):
     """获取期货市场数据 - 专门用于TablesSection组件"""
@@ -977,7 +1245,7 @@ def get_futures_market_data(token):
                             'funding_rate': item.get('fundingRate', 0)
                         })
 
-                print(f"✅ 期货市场数据获取成功: {token} ({len(futures_markets)} 个交易所)")
+                logger.debug("✅ 期货市场数据获取成功: %s (%s 个交易所)", token, len(futures_markets))
                 return jsonify({
                     'success': True,
                     'data': {
@@ -985,13 +1253,13 @@ def get_futures_market_data(token):
                     }
                 })
             else:
-                print(f"❌ 期货市场数据获取失败: {token}")
+                logger.error("❌ 期货市场数据获取失败: %s", token)
                 return jsonify({
                     'success': False,
                     'error': 'Failed to fetch futures market data'
                 }), 500
         except Exception as e:
-            print(f"❌ 期货市场数据获取异常: {e}")
+            logger.error("❌ 期货市场数据获取异常: %s", e)
             return jsonify({
                 'success': False,
                 'error': str(e)
@@ -1024,7 +1292,7 @@ def get_spot_market_data(token):
                             'depth': 0  # 现货数据中没有深度信息
                         })
 
-                print(f"✅ 现货市场数据获取成功: {token} ({len(spot_markets)} 个交易所)")
+                logger.debug("✅ 现货市场数据获取成功: %s (%s 个交易所)", token, len(spot_markets))
                 return jsonify({
                     'success': True,
                     'data': {
@@ -1032,13 +1300,13 @@ def get_spot_market_data(token):
                     }
                 })
             else:
-                print(f"❌ 现货市场数据获取失败: {token}")
+                logger.error("❌ 现货市场数据获取失败: %s", token)
                 return jsonify({
                     'success': False,
                     'error': 'Failed to fetch spot market data'
                 }), 500
         except Exception as e:
-            print(f"❌ 现货市场数据获取异常: {e}")
+            logger.error("❌ 现货市场数据获取异常: %s", e)
             return jsonify({
                 'success': False,
                 'error': str(e)
@@ -1050,13 +1318,216 @@ def get_spot_market_data(token):
         }), 500
 
 
+# 推送数据流 - 使用与各轮询接口默认参数相同的缓存键，推送与轮询共享缓存条目，
+# 上游请求频率仍由各命名空间TTL决定
+def push_fetch(namespace, key, loader):
+    if not api_client:
+        return None
+    return data_cache.get_or_load(namespace, key, loader)
+
+def push_token(token):
+    return push_fetch('token', token, lambda: load_token_data(token))
+
+def push_netflow(token):
+    return push_fetch('netflow', f"{token}__12h_500", lambda: load_netflow_data(token, '', '12h', '500'))
+
+def push_openinterest(token):
+    return push_fetch('openinterest', f"{token}_1h_USD", lambda: load_openinterest_data(token, '1h', 'USD'))
+
+def push_fundingrate(token):
+    return push_fetch('fundingrate', f"{token}_1h", lambda: load_fundingrate_data(token, '1h'))
+
+def push_volume24h(token):
+    return push_fetch('volume24h', f"{token}_ALL_1d", lambda: load_volume24h_data(token, 'ALL', '1d'))
+
+push_hub.register_stream('token', push_token, lambda value: value)
+push_hub.register_stream('netflow', push_netflow, lambda value: value.get('data', []))
+push_hub.register_stream('openinterest', push_openinterest, lambda value: value.get('data', {}))
+push_hub.register_stream('fundingrate', push_fundingrate, lambda value: value)
+push_hub.register_stream('volume24h', push_volume24h, lambda value: value)
+
+def parse_topics(value):
+    """解析?topics=BTC:token,ETH:netflow - 返回[(代币, 数据流)]，未知数据流抛出ValueError"""
+    topics = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        token, _, stream = item.partition(':')
+        topic = (token.strip().upper(), stream.strip().lower() or 'token')
+        if not topic[0] or topic[1] not in push_hub.streams:
+            raise ValueError(f'无效的订阅主题: {item}')
+        if topic not in topics:
+            topics.append(topic)
+    return topics
+
+@app.route('/api/stream')
+def stream_updates():
+    """实时推送（Server-Sent Events）
+
+    ?topics=BTC:token,BTC:netflow,ETH:fundingrate 订阅 (代币, 数据流) 主题。
+    连接后先收到各主题的snapshot事件，之后数据变化时收到patch事件（相对上一版本的增量），
+    客户端积压过多时重新收到snapshot。数据流与同名轮询接口的默认参数一致。
+    """
+    try:
+        topics = parse_topics(request.args.get('topics'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e), 'streams': push_hub.streams}), 400
+    if not topics:
+        return jsonify({
+            'success': False,
+            'error': '请通过 topics 参数指定订阅主题，如 ?topics=BTC:token,BTC:netflow',
+            'streams': push_hub.streams
+        }), 400
+    if len(topics) > PUSH_MAX_TOPICS:
+        return jsonify({
+            'success': False,
+            'error': f'单个连接最多订阅 {PUSH_MAX_TOPICS} 个主题，当前 {len(topics)} 个'
+        }), 400
+
+    def generate():
+        subscriber = push_hub.subscribe(topics)
+        try:
+            # 断线后浏览器EventSource按该间隔（毫秒）自动重连
+            yield b'retry: 3000\n\n'
+            while not subscriber.closed:
+                events = subscriber.get(PUSH_HEARTBEAT)
+                # 无事件时发送注释行保活，同时尽早发现已断开的连接
+                yield events or b': ping\n\n'
+        finally:
+            push_hub.unsubscribe(subscriber)
+
+    response = app.response_class(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# 本地历史数据：名称 -> (默认周期, 时序key构造函数, 返回的列过滤)，默认参数与对应的数据接口一致
+HISTORY_SERIES = {
+    'price': ('1d', lambda token, args, interval: ('openinterest', token, interval, args.get('type', 'USD')),
+              lambda name: name == 'prices'),
+    'openinterest': ('1h', lambda token, args, interval: ('openinterest', token, interval, args.get('type', 'USD')),
+                     lambda name: name.startswith('dataValues.')),
+    'netflow': ('12h', lambda token, args, interval: ('longshort', token, args.get('exchangeName', ''), interval),
+                None),
+    'volume': ('1d', lambda token, args, interval: ('volume', token, args.get('exchangeName', 'ALL'), interval),
+               None),
+    'fundingrate': ('1h', lambda token, args, interval: ('fundingrate', token, 'USDT', 1, interval),
+                    None)
+}
+
+@app.route('/api/history/<token>')
+def get_history_data(token):
+    """从本地时序存储读取历史数据（不请求上游）
+
+    ?series=price|openinterest|netflow|volume|fundingrate，其余参数与对应数据接口相同；
+    ?start= / ?end= 为毫秒时间戳，?limit= 取最近N个点。返回并列数组格式，缺失值为null；
+    ?rollup=1h 把本地时序聚合到更粗的周期（净流入累加，price时序为OHLC，其余列含netflow的价格取最后值）
+    """
+    token = token.upper()
+    disk_store = getattr(api_client, 'disk_store', None)
+    if disk_store is None:
+        return jsonify({'success': False, 'error': '本地时序存储未启用'}), 404
+
+    series = request.args.get('series', 'price').lower()
+    if series not in HISTORY_SERIES:
+        return jsonify({
+            'success': False,
+            'error': f'不支持的时序: {series}',
+            'series': list(HISTORY_SERIES)
+        }), 400
+
+    # 无法解析的整数参数按未指定处理
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    limit = min(request.args.get('limit', HISTORY_MAX_POINTS, type=int), HISTORY_MAX_POINTS)
+
+    default_interval, make_key, keep = HISTORY_SERIES[series]
+    interval = request.args.get('interval', default_interval)
+    key = make_key(token, request.args, interval)
+
+    rollup_interval = request.args.get('rollup')
+    ratio = 1
+    if rollup_interval:
+        step, base_step = interval_ms(rollup_interval), interval_ms(interval)
+        if not step or not base_step or step <= base_step or step % base_step:
+            return jsonify({
+                'success': False,
+                'error': f'rollup周期 {rollup_interval} 必须是 {interval} 的整数倍'
+            }), 400
+        ratio = step // base_step
+
+    tss, columns, attrs = disk_store.read(key, start, end, limit * ratio)
+    columns = {name: values for name, values in columns.items() if keep is None or keep(name)}
+    if rollup_interval:
+        how = 'ohlc' if series == 'price' else SERIES_AGGREGATIONS.get(key[0], 'last')
+        tss, columns = rollup(tss, columns, step, how)
+        tss, columns = tss[-limit:], {name: values[-limit:] for name, values in columns.items()}
+
+    # 内存映射切片直接交给序列化，不转换为Python列表
+    data = {'time': tss}
+    data.update(columns)
+    return jsonify({
+        'success': True,
+        'format': 'columnar',
+        'series': series,
+        'interval': rollup_interval or interval,
+        'count': len(tss),
+        'attrs': attrs,
+        'data': data
+    })
+
+@app.route('/api/stats')
+def get_stats():
+    """获取服务端性能统计（连接池等）"""
+    if not api_client:
+        return jsonify({
+            'success': False,
+            'error': 'API client not initialized'
+        }), 500
 
+    worker_pool = getattr(api_client, 'worker_pool', None)
+    single_flight = getattr(api_client, 'single_flight', None)
+    series_store = getattr(api_client, 'series_store', None)
+    governor = getattr(api_client, 'governor', None)
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'pid': os.getpid(),  # 多进程部署时区分处理请求的worker
+            'connection_pool': api_client.get_connection_status().get('connection_pool'),
+            'worker_pool': worker_pool.get_stats() if worker_pool else None,
+            'single_flight': single_flight.get_stats() if single_flight else None,
+            'series_store': series_store.get_stats() if series_store else None,
+            'governor': governor.get_stats() if governor else None,
+            'retry_policy': api_client.retry_policy.get_stats() if getattr(api_client, 'retry_policy', None) else None,
+            'circuit_breakers': (api_client.circuit_breakers.get_stats()
+                                 if getattr(api_client, 'circuit_breakers', None) else None),
+            'disk_store': api_client.disk_store.get_stats() if getattr(api_client, 'disk_store', None) else None,
+            'cache': data_cache.get_stats(),
+            'compression': compression_stats.get_stats(),
+            'refresh_scheduler': refresh_scheduler.get_stats(),
+            'push': push_hub.get_stats()
+        }
+    })
 
 
 def start_background_tasks():
     """启动后台任务"""
-    # 移除自动刷新功能，只保留手动刷新
-    print("🔄 后台任务已启动（已禁用自动刷新）")
+    # 按访问热度在TTL到期前预刷新热门代币，手动刷新仍可用
+    refresh_scheduler.start()
+    logger.info("🔄 后台任务已启动（热点预刷新: 前%s个key，到期前%s秒，每分钟预算%s次请求）",
+                refresh_scheduler.top_n, refresh_scheduler.lead_time, refresh_scheduler.budget.capacity)
+    # 推送主题刷新线程，无订阅时空转
+    push_hub.start()
+
+def shutdown_api_client():
+    """进程退出时停止缓存后台刷新并关闭API客户端，排空共享线程池"""
+    refresh_scheduler.stop()
+    push_hub.stop()
+    data_cache.shutdown()
+    if api_client and hasattr(api_client, 'close'):
+        api_client.close()
 
 def kill_process_on_port(port):
     """终止占用端口的进程"""
@@ -1066,20 +1537,20 @@ def kill_process_on_port(port):
             try:
                 for conn in proc.info['connections']:
                     if conn.laddr.port == port:
-                        print(f"发现占用端口{port}的进程: {proc.info['name']} (PID: {proc.info['pid']})")
+                        logger.info("发现占用端口%s的进程: %s (PID: %s)", port, proc.info['name'], proc.info['pid'])
                         proc.kill()
-                        print(f"已终止进程 {proc.info['pid']}")
+                        logger.info("已终止进程 %s", proc.info['pid'])
                         return True
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 pass
     except ImportError:
-        print("psutil库未安装，无法自动终止进程")
+        logger.warning("psutil库未安装，无法自动终止进程")
     except Exception as e:
-        print(f"终止进程时出错: {e}")
+        logger.warning("终止进程时出错: %s", e)
     return False
 
 if __name__ == '__main__':
-    print("🚀 启动Coinank Web应用...")
+    logger.info("🚀 启动Coinank Web应用...")
 
     # 解析命令行参数
     parser = argparse.ArgumentParser(description='Coinank Web Application')
@@ -1087,83 +1558,89 @@ if __name__ == '__main__':
                        help='服务器端口号 (默认: 自动查找)')
     parser.add_argument('--proxy', type=str, default='false',
                        help='使用代理模式 (true/false，默认: false)')
+    parser.add_argument('--async-client', type=str, default='false',
+                       help='使用asyncio客户端 (true/false，默认: false)')
     args = parser.parse_args()
 
     # 解析代理参数
     use_proxy = args.proxy.lower() in ['true', '1', 'yes', 'on']
     proxy_mode = "代理模式" if use_proxy else "直连模式"
-    print(f"🔧 网络模式: {proxy_mode}")
+    logger.info("🔧 网络模式: %s", proxy_mode)
 
     # 处理端口参数
     if args.port:
         port = args.port
-        print(f"🔧 使用命令行指定端口: {port}")
+        logger.info("🔧 使用命令行指定端口: %s", port)
     else:
         # 查找可用端口
         port = find_available_port(5001, 10)
 
+    # 解析客户端参数
+    use_async = args.async_client.lower() in ['true', '1', 'yes', 'on']
+
     # 初始化API客户端
-    if not initialize_api_client(use_proxy=use_proxy):
-        print("⚠️ 初始化失败，但将继续启动Web服务器...")
+    if not initialize_api_client(use_proxy=use_proxy, use_async=use_async):
+        logger.warning("⚠️ 初始化失败，但将继续启动Web服务器...")
 
     # 初始化默认支持的代币
     if 'PEPE' not in supported_tokens:
         supported_tokens.append('PEPE')
-        print("✅ 已添加默认代币: PEPE")
+        logger.info("✅ 已添加默认代币: PEPE")
 
     if port is None:
-        print("⚠️ 自动查找端口失败，尝试使用默认端口5001...")
+        logger.warning("⚠️ 自动查找端口失败，尝试使用默认端口5001...")
         port = 5001
 
         # 再次检查5001端口
         if not check_port_available(5001):
-            print("端口5001被占用，尝试终止占用的进程...")
+            logger.info("端口5001被占用，尝试终止占用的进程...")
             if kill_process_on_port(5001):
-                print("已终止占用进程，使用端口5001")
+                logger.info("已终止占用进程，使用端口5001")
             else:
-                print("无法终止占用进程，强制使用端口5001（Flask会处理端口冲突）")
+                logger.info("无法终止占用进程，强制使用端口5001（Flask会处理端口冲突）")
     
     if port != 5001:
-        print(f"✅ 使用端口{port}")
+        logger.info("✅ 使用端口%s", port)
     else:
-        print(f"✅ 使用默认端口{port}")
+        logger.info("✅ 使用默认端口%s", port)
     
     # 启动后台任务
     start_background_tasks()
+    atexit.register(shutdown_api_client)
     
-    print("✅ Web应用启动成功!")
-    print(f"🌐 访问地址: http://localhost:{port}")
-    print(f"🪙 支持的代币: {', '.join(supported_tokens)}")
+    logger.info("✅ Web应用启动成功!")
+    logger.info("🌐 访问地址: http://localhost:%s", port)
+    logger.info("🪙 支持的代币: %s", ', '.join(supported_tokens))
     
     try:
         # 启动Flask应用
         app.run(host='127.0.0.1', port=port, debug=False)
     except OSError as e:
         if "Address already in use" in str(e):
-            print(f"❌ 端口{port}被占用，尝试使用其他端口...")
+            logger.error("❌ 端口%s被占用，尝试使用其他端口...", port)
             # 尝试使用端口5002-5010
             for backup_port in range(5002, 5011):
                 if check_port_available(backup_port):
-                    print(f"✅ 使用备用端口{backup_port}")
-                    print(f"🌐 访问地址: http://localhost:{backup_port}")
+                    logger.info("✅ 使用备用端口%s", backup_port)
+                    logger.info("🌐 访问地址: http://localhost:%s", backup_port)
                     app.run(host='127.0.0.1', port=backup_port, debug=False)
                     break
             else:
-                print("❌ 无法找到可用端口，请手动终止占用端口的进程后重试")
+                logger.error("❌ 无法找到可用端口，请手动终止占用端口的进程后重试")
                 sys.exit(1)
         else:
-            print(f"❌ 启动Web服务器失败: {e}")
-            print("可能的解决方案:")
-            print("1. 检查防火墙设置")
-            print("2. 尝试以管理员权限运行")
-            print("3. 检查网络配置")
+            logger.error("❌ 启动Web服务器失败: %s", e)
+            logger.info("可能的解决方案:")
+            logger.info("1. 检查防火墙设置")
+            logger.info("2. 尝试以管理员权限运行")
+            logger.info("3. 检查网络配置")
             sys.exit(1)
     except Exception as e:
-        print(f"❌ 启动Web服务器失败: {e}")
-        print("可能的解决方案:")
-        print("1. 检查端口是否被占用")
-        print("2. 检查防火墙设置")
-        print("3. 尝试以管理员权限运行")
+        logger.error("❌ 启动Web服务器失败: %s", e)
+        logger.info("可能的解决方案:")
+        logger.info("1. 检查端口是否被占用")
+        logger.info("2. 检查防火墙设置")
+        logger.info("3. 尝试以管理员权限运行")
 
 # 临时处理connection-status请求，用于调试
 @app.route('/api/connection-status')
@@ -1182,8 +1659,8 @@ def connection_status_deprecated():
         'remote_addr': request.remote_addr
     }
 
-    print(f"⚠️ 检测到对已删除API的调用: /api/connection-status")
-    print(f"📋 请求信息: {request_info}")
+    logger.warning("⚠️ 检测到对已删除API的调用: /api/connection-status")
+    logger.debug("📋 请求信息: %s", request_info)
 
     return jsonify({
         'success': False,
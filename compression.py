@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+响应压缩模块 - Accept-Encoding协商与gzip/brotli/zstd压缩
+brotli、zstandard为可选依赖，未安装时只协商gzip
+压缩结果由调用方按缓存条目记忆，这里负责编码器与压缩率/CPU节省统计
+"""
+
+import gzip
+import threading
+
+from config import (COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL,
+                    COMPRESSION_BROTLI_QUALITY, COMPRESSION_ZSTD_LEVEL)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _gzip(data):
+    # mtime=0 保证相同内容压缩结果相同
+    return gzip.compress(data, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+
+
+def _zstd(data):
+    return zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compress(data)
+
+
+# 可用编码器，按服务端偏好排序（同q值时优先压缩率更高的编码）
+COMPRESSORS = {}
+if brotli is not None:
+    COMPRESSORS['br'] = _brotli
+if zstandard is not None:
+    COMPRESSORS['zstd'] = _zstd
+COMPRESSORS['gzip'] = _gzip
+
+
+def parse_accept_encoding(header):
+    """解析Accept-Encoding，返回{编码: q值}"""
+    result = {}
+    for part in (header or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        coding, _, params = part.partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        result[coding.strip().lower()] = q
+    return result
+
+
+def negotiate_encoding(header):
+    """选择客户端接受且本地可用的最佳编码，无可用编码返回None"""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for coding in COMPRESSORS:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def should_compress(body):
+    """过小的响应压缩收益不抵开销"""
+    return len(body) >= COMPRESSION_MIN_SIZE
+
+
+def compress(body, encoding):
+    """按编码压缩响应体"""
+    return COMPRESSORS[encoding](body)
+
+
+class CompressionStats:
+    """压缩统计 - 压缩率，以及命中记忆结果而省下的序列化/压缩CPU时间"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.serialize_count = 0
+        self.serialize_seconds = 0.0
+        self.serialize_reused = 0
+        self.cpu_saved_seconds = 0.0
+        self.encodings = {}
+
+    def _encoding_stats(self, encoding):
+        stats = self.encodings.get(encoding)
+        if stats is None:
+            stats = {'compressed': 0, 'reused': 0, 'bytes_in': 0, 'bytes_out': 0,
+                     'compress_seconds': 0.0, 'served_bytes_in': 0, 'served_bytes_out': 0}
+            self.encodings[encoding] = stats
+        return stats
+
+    def record_serialize(self, seconds, reused):
+        with self._lock:
+            if reused:
+                self.serialize_reused += 1
+                self.cpu_saved_seconds += seconds
+            else:
+                self.serialize_count += 1
+                self.serialize_seconds += seconds
+
+    def record_compress(self, encoding, size_in, size_out, seconds, reused):
+        with self._lock:
+            stats = self._encoding_stats(encoding)
+            stats['served_bytes_in'] += size_in
+            stats['served_bytes_out'] += size_out
+            if reused:
+                stats['reused'] += 1
+                self.cpu_saved_seconds += seconds
+            else:
+                stats['compressed'] += 1
+                stats['bytes_in'] += size_in
+                stats['bytes_out'] += size_out
+                stats['compress_seconds'] += seconds
+
+    def get_stats(self):
+        with self._lock:
+            encodings = {}
+            for encoding, stats in self.encodings.items():
+                served_in = stats['served_bytes_in']
+                encodings[encoding] = {
+                    'compressed': stats['compressed'],
+                    'reused': stats['reused'],
+                    'ratio': round(stats['served_bytes_out'] / served_in, 4) if served_in else 0,
+                    'bytes_saved': served_in - stats['served_bytes_out'],
+                    'compress_ms': round(stats['compress_seconds'] * 1000, 2)
+                }
+            return {
+                'available_encodings': list(COMPRESSORS),
+                'min_size': COMPRESSION_MIN_SIZE,
+                'serialized': self.serialize_count,
+                'serialize_reused': self.serialize_reused,
+                'serialize_ms': round(self.serialize_seconds * 1000, 2),
+                'cpu_saved_ms': round(self.cpu_saved_seconds * 1000, 2),
+                'encodings': encodings
+            }
@@ -2,6 +2,8 @@
 Configuration file for coinank replica
 """
 
+import os
+
 # API Configuration
 USE_SAMPLE_DATA = True  # Set to False to try live API calls
 API_TIMEOUT = 30  # seconds
@@ -36,4 +38,157 @@ API_HEADERS = {
     'Sec-Fetch-Site': 'same-site',
     'Priority': 'u=0',
     'TE': 'trailers'
-}
\ No newline at end of file
+}
+
+# HTTP连接池配置
+HTTP_POOL_MAXSIZE = 10  # 每个主机保留的最大空闲连接数
+HTTP_POOL_IDLE_TIMEOUT = 30  # 空闲连接超时（秒），超时后不再复用
+ASYNC_MAX_CONCURRENCY = 100  # 异步客户端同时在途的上游请求上限
+
+# 共享工作线程池配置
+WORKER_POOL_SIZE = 16  # 进程内并行获取上游数据的最大线程数
+
+# 缓存配置
+CACHE_MAX_ENTRIES = 2000  # 最大缓存条目数
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # 最大缓存字节数（按JSON大小估算），0为不限制
+CACHE_TTLS = {  # 各命名空间缓存时间（秒）
+    'token': 300,          # 完整代币数据 - 5分钟
+    'basic': 60,           # 基础代币数据 - 1分钟
+    'volume24h': 300,      # 24H成交量 - 5分钟
+    'netflow': 300,        # 净流入 - 5分钟
+    'openinterest': 300,   # 合约持仓量 - 5分钟
+    'fundingrate': 1800,   # 资金费率 - 30分钟
+    'coindetail': 3600     # 代币详情 - 1小时
+}
+CACHE_STALE_GRACE_RATIO = 1.0  # 过期后宽限期 = TTL × 该比例，宽限期内先返回旧值再后台刷新
+CACHE_STALE_IF_ERROR = 86400  # 上游失败时最多回退使用多久以前的旧值（秒）
+CACHE_REFRESH_WORKERS = 4  # 后台刷新线程数
+
+# 热点预刷新调度配置
+SCHEDULER_TOP_N = 20  # 每轮最多预刷新的热点key数量
+SCHEDULER_LEAD_TIME = 30  # TTL到期前多少秒开始预刷新
+SCHEDULER_JITTER = 15  # 预刷新时间随机提前的最大秒数，避免同时刷新
+SCHEDULER_INTERVAL = 5  # 调度检查间隔（秒）
+SCHEDULER_HALF_LIFE = 600  # 访问热度半衰期（秒）
+SCHEDULER_BUDGET_PER_MINUTE = 120  # 预刷新每分钟允许消耗的上游请求数
+SCHEDULER_NAMESPACE_COST = {  # 各命名空间一次刷新大致消耗的上游请求数
+    'token': 8,
+    'basic': 3,
+    'fundingrate': 2
+}
+
+# 日志配置（可通过环境变量覆盖）
+LOG_LEVEL = os.environ.get('COINANK_LOG_LEVEL', 'INFO')  # DEBUG / INFO / WARNING / ERROR
+LOG_FORMAT = os.environ.get('COINANK_LOG_FORMAT', 'text')  # text 或 json（每行一条JSON）
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('COINANK_LOG_DEBUG_SAMPLE_RATE', '1.0'))  # 调试日志采样率
+
+# 响应压缩配置（brotli / zstandard 为可选依赖，未安装时仅使用gzip）
+COMPRESSION_MIN_SIZE = 1024  # 小于该字节数的响应不压缩
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 8  # 压缩结果按缓存条目复用，可使用较高压缩级别
+COMPRESSION_ZSTD_LEVEL = 10
+
+# 上游响应解码配置
+UPSTREAM_MAX_RESPONSE_BYTES = 32 * 1024 * 1024  # 解压后响应体上限（字节），超出视为异常响应
+UPSTREAM_READ_CHUNK_SIZE = 64 * 1024  # 分块读取/解压的块大小
+
+# 批量代币接口配置
+BATCH_MAX_SYMBOLS = 50  # 单次批量请求的代币数上限
+BATCH_TIMEOUT = 30  # 批量请求等待上游的总时长（秒），超时的代币返回已获取的部分数据
+
+# 实时推送配置（SSE）
+PUSH_INTERVAL = 5  # 刷新线程检查各主题的间隔（秒），上游请求频率仍由缓存TTL决定
+PUSH_HEARTBEAT = 15  # 无事件时发送心跳注释的间隔（秒）
+PUSH_MAX_TOPICS = 20  # 单个连接可订阅的主题数上限
+PUSH_QUEUE_SIZE = 100  # 每个连接待发送事件上限，积压溢出时丢弃并重发快照
+PUSH_REFRESH_WORKERS = 4  # 主题刷新线程数，避免慢主题阻塞其他主题
+
+# 时序增量合并配置
+SERIES_STORE_MAX_SERIES = 500  # 保存的时序条数上限（LRU）
+SERIES_TAIL_OVERLAP = 2  # 增量请求额外重叠的点数，用于更新未收盘的K线
+SERIES_FULL_REFRESH_EVERY = 30  # 连续增量合并达到该次数后做一次全量校正
+SERIES_TAIL_PARAMS = {  # 各接口的增量参数：('limit', 参数名) 按点数，('since', 参数名) 按起始时间戳
+    'longshort': ('limit', 'limit'),
+    'openinterest': None,  # 上游未提供已知的点数/起始时间参数，仅保存窗口
+    'fundingrate': None    # 同上
+}
+
+# 本地时序存储配置（价格/持仓量/净流入/成交量/资金费率，内存映射列式文件）
+DISK_STORE_ENABLED = True  # 关闭后不写入也不从本地预热
+DISK_STORE_DIR = os.path.join(DATA_DIR, 'series')
+DISK_STORE_MAX_OPEN_SERIES = 256  # 同时打开（保留内存映射）的时序数，超出按LRU关闭
+DISK_STORE_MAX_ROWS = 500000  # 每条时序最多保留的行数（5m周期约4.7年），0为不限
+DISK_STORE_RETENTION_DAYS = 365  # 只保留最新时间戳之前该天数内的数据，0为不限
+DISK_STORE_COMPACT_SLACK = 0.1  # 超出保留范围的行数达到总行数的该比例才重写文件，摊薄重写开销
+HISTORY_MAX_POINTS = 100000  # /api/history 单次返回的点数上限
+
+# 多周期降采样配置（粗周期由本地最细周期时序聚合，不再单独请求上游）
+ROLLUP_ENABLED = True
+ROLLUP_BASE_INTERVALS = {  # 各数据接口在本地保存的最细周期，须为上游支持的周期
+    'netflow': '5m',
+    'openinterest': '5m',
+    'fundingrate': '5m'
+}
+ROLLUP_MAX_POINTS = 500  # 无limit参数的接口（持仓量、资金费率）聚合后最多返回的点数
+ROLLUP_MIN_POINTS = 200  # 本地历史至少覆盖的目标周期点数（净流入limit更大时也只要求该点数，不足部分返回较少的点）
+ROLLUP_MIN_COVERAGE = 0.95  # 覆盖范围内实际基础点数的最低占比，停机造成的空洞过多时回退上游
+
+# 图表降采样配置（?max_points=N，LTTB保留形状特征）
+DOWNSAMPLE_MIN_POINTS = 20  # max_points小于该值时按该值处理
+
+# 生产部署配置（gunicorn多进程，见gunicorn.conf.py与wsgi.py，可通过环境变量覆盖）
+WSGI_BIND = os.environ.get('COINANK_BIND', '127.0.0.1:5001')
+WSGI_WORKERS = int(os.environ.get('COINANK_WORKERS', min(os.cpu_count() or 1, 4)))  # worker进程数
+WSGI_THREADS = int(os.environ.get('COINANK_THREADS', '16'))  # 每个worker的线程数，SSE长连接各占一个线程
+WSGI_TIMEOUT = 60  # worker失去响应多久后被重启（秒）
+WSGI_GRACEFUL_TIMEOUT = 30  # 平滑重启/退出时等待进行中请求的时长（秒），超时的SSE连接由客户端自动重连
+WSGI_KEEPALIVE = 5  # 客户端keep-alive连接空闲保持时长（秒）
+WSGI_MAX_REQUESTS = 0  # worker处理多少请求后自动重启（会丢失进程内缓存），0为不重启
+WSGI_USE_PROXY = os.environ.get('COINANK_USE_PROXY', 'false').lower() in ('true', '1', 'yes', 'on')
+WSGI_ASYNC_CLIENT = os.environ.get('COINANK_ASYNC_CLIENT', 'false').lower() in ('true', '1', 'yes', 'on')
+
+# 跨进程共享缓存配置（Redis协议，多worker部署时作为进程内缓存的第二级）
+SHARED_CACHE_URL = os.environ.get('COINANK_SHARED_CACHE_URL', '')  # redis://主机:端口/库号 或 unix:///路径，留空不启用
+SHARED_CACHE_STANDIN = True  # gunicorn多worker且未配置SHARED_CACHE_URL时，主进程启动自带的替身服务
+SHARED_CACHE_STANDIN_SOCKET = os.path.join(DATA_DIR, 'cache.sock')
+SHARED_CACHE_STANDIN_MAX_BYTES = 512 * 1024 * 1024  # 替身服务的内存上限，超出按LRU淘汰
+SHARED_CACHE_PREFIX = 'coinank:'
+SHARED_CACHE_TIMEOUT = 2  # 共享缓存命令超时（秒）
+SHARED_CACHE_POOL_SIZE = 8  # 每个worker保留的空闲连接数
+SHARED_CACHE_LOCK_TTL = 45  # 刷新锁自动过期时间（秒），应大于一次上游加载的最长耗时
+SHARED_CACHE_LOCK_WAIT = 15  # 其他worker正在加载时最多等待多久（秒），超时后自行加载
+SHARED_CACHE_RETRY = 30  # 共享缓存出错后多久重试（秒），期间只使用进程内缓存
+
+# 上游自适应并发配置（AIMD，按端点族 /api/<族>/... 分别调节）
+GOVERNOR_ENABLED = True
+GOVERNOR_INITIAL_LIMIT = 8  # 每个端点族的初始并发上限
+GOVERNOR_MIN_LIMIT = 1
+GOVERNOR_MAX_LIMIT = 32
+GOVERNOR_INCREASE = 1.0  # 并发用满时，每约limit个成功请求上限增加的数量
+GOVERNOR_DECREASE = 0.5  # 429/503、超时或success:false时上限乘以该系数
+GOVERNOR_COOLDOWN = 2  # 两次减小之间的最短间隔（秒），同一批并发失败只退让一次
+GOVERNOR_ACQUIRE_TIMEOUT = 10  # 排队等待名额的最长时间（秒），超时本次请求按失败处理
+GOVERNOR_FAMILY_LIMITS = {}  # 按端点族覆盖 (初始, 最小, 最大)，如 {'fundingRate': (4, 1, 16)}
+
+# 上游重试策略配置（错误分类 + 去相关抖动退避 + 进程级重试预算）
+RETRY_MAX_ATTEMPTS = 2  # 单次获取最多尝试次数（含首次）
+RETRY_BASE_DELAY = 0.2  # 退避基准间隔（秒）
+RETRY_MAX_DELAY = 3.0  # 单次退避上限（秒）
+RETRY_ON = ('timeout', 'connection', 'throttled', 'server_error', 'api_error', 'bad_response')  # 可重试的错误类型
+RETRY_BUDGET_RATIO = 0.1  # 每个首次请求积累的重试额度，即重试最多约占请求量的10%
+RETRY_BUDGET_MIN_PER_SECOND = 0.1  # 请求量很低时每秒补充的保底重试额度（远低于正常请求量下按比例积累的额度）
+RETRY_BUDGET_WINDOW = 100  # 额度上限为 RETRY_BUDGET_RATIO × 该请求数，避免长时间空闲后积攒大量重试
+RETRY_ENDPOINT_OVERRIDES = {
+    # 不支持的代币返回success:false，重试不会成功
+    'fundingRate': {'retry_on': ('timeout', 'connection', 'throttled', 'server_error', 'bad_response')},
+}  # 按端点族覆盖 max_attempts / base_delay / max_delay / retry_on
+PROXY_CHECK_INTERVAL = 60  # 重试时重新检测代理的最短间隔（秒），期间的重试直接复用当前连接
+
+# 上游熔断配置（按端点路径，熔断期间返回最近一次成功的响应）
+CIRCUIT_ENABLED = True
+CIRCUIT_FAILURE_THRESHOLD = 5  # 连续多少次上游故障后打开熔断
+CIRCUIT_OPEN_SECONDS = 30  # 熔断打开时长（秒），之后进入半开状态探测
+CIRCUIT_HALF_OPEN_PROBES = 1  # 半开状态同时放行的探测请求数
+CIRCUIT_FAILURE_CLASSES = ('timeout', 'connection', 'throttled', 'server_error')  # 计为故障的错误类型
+CIRCUIT_ENDPOINT_OVERRIDES = {}  # 按端点路径覆盖，如 {'/api/longshort/buySell': {'failure_threshold': 3}}
+CIRCUIT_FALLBACK_MAX_ENTRIES = 256  # 保存最近成功响应的请求数上限（LRU）
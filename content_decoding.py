@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+上游响应内容解码模块 - 按Content-Encoding流式解压
+- gzip/deflate使用zlib增量解压；brotli、zstandard为可选依赖，安装后才在Accept-Encoding中声明
+- 响应体分块读取、分块解压并追加到同一个缓冲区，原始压缩数据不整体驻留内存
+- 解压后大小超过上限时中止，防止异常大的响应（或压缩炸弹）占满内存：每一层解码的单次输出都以剩余额度为上限
+  （zlib为max_length，brotli为output_buffer_limit）；zstandard的流式接口不支持输出上限，
+  先按帧头声明的原始大小拒绝，未声明时把输入切成ZSTD_SLICE_BYTES小段逐段解压，单次超出额度最多约8MB
+"""
+
+import zlib
+
+from config import UPSTREAM_MAX_RESPONSE_BYTES, UPSTREAM_READ_CHUNK_SIZE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# zstd单段输入的字节数；RLE块约4字节可展开为128KB，256字节一段最多展开约8MB
+ZSTD_SLICE_BYTES = 256
+
+
+class ContentDecodingError(ValueError):
+    """响应内容无法解码"""
+
+
+class ResponseTooLarge(ContentDecodingError):
+    """解码后的响应超过大小上限"""
+
+
+class _ZlibDecoder:
+    """gzip/deflate增量解压 - 每次输出不超过剩余额度，超出即可判定过大"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        # gzip: 16+MAX_WBITS；deflate: 自动识别zlib头，失败时回退为raw deflate
+        wbits = 16 + zlib.MAX_WBITS if encoding == 'gzip' else 32 + zlib.MAX_WBITS
+        self._obj = zlib.decompressobj(wbits)
+        self._started = False
+
+    def decompress(self, data, limit):
+        try:
+            out = self._obj.decompress(data, limit + 1)
+        except zlib.error:
+            if self.encoding != 'deflate' or self._started:
+                raise
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            out = self._obj.decompress(data, limit + 1)
+        self._started = True
+        return out
+
+    def flush(self):
+        return self._obj.flush()
+
+
+class _BrotliDecoder:
+    def __init__(self):
+        self._obj = brotli.Decompressor()
+
+    def decompress(self, data, limit):
+        try:
+            return self._obj.process(data, output_buffer_limit=limit + 1)
+        except TypeError:  # brotli<1.1不支持输出上限
+            return self._obj.process(data)
+
+    def flush(self):
+        return b''
+
+
+class _ZstdDecoder:
+    """decompressobj不支持输出上限，按帧头声明大小提前拒绝，并分段解压限制单次膨胀"""
+
+    def __init__(self):
+        self._obj = zstandard.ZstdDecompressor().decompressobj()
+        self._checked = False
+
+    def decompress(self, data, limit):
+        if not self._checked:
+            self._checked = True
+            try:
+                declared = zstandard.frame_content_size(data)
+            except zstandard.ZstdError:  # 首块不足一个完整帧头
+                declared = -1
+            if declared > limit:
+                raise ResponseTooLarge(f"zstd帧声明的原始大小 {declared} 字节超过上限")
+
+        out = bytearray()
+        for start in range(0, len(data), ZSTD_SLICE_BYTES):
+            out += self._obj.decompress(data[start:start + ZSTD_SLICE_BYTES])
+            if len(out) > limit:
+                break
+        return out
+
+    def flush(self):
+        return b''
+
+
+DECODERS = {
+    'gzip': lambda: _ZlibDecoder('gzip'),
+    'x-gzip': lambda: _ZlibDecoder('gzip'),
+    'deflate': lambda: _ZlibDecoder('deflate')
+}
+if brotli is not None:
+    DECODERS['br'] = _BrotliDecoder
+if zstandard is not None:
+    DECODERS['zstd'] = _ZstdDecoder
+
+# 只声明能够解码的编码
+ACCEPT_ENCODING = ', '.join(['gzip', 'deflate'] + [c for c in ('br', 'zstd') if c in DECODERS])
+
+
+class StreamDecoder:
+    """按Content-Encoding逐块解码，结果累积在一个bytearray中"""
+
+    def __init__(self, content_encoding=None, max_bytes=UPSTREAM_MAX_RESPONSE_BYTES):
+        codings = [c.strip().lower() for c in (content_encoding or '').split(',')]
+        codings = [c for c in codings if c and c != 'identity']
+        unsupported = [c for c in codings if c not in DECODERS]
+        if unsupported:
+            raise ContentDecodingError(f"不支持的Content-Encoding: {', '.join(unsupported)}")
+
+        # 多重编码按施加顺序的逆序解码
+        self._decoders = [DECODERS[c]() for c in reversed(codings)]
+        # 未声明编码时兼容旧逻辑：按gzip魔数识别
+        self._sniff = not codings
+        self.max_bytes = max_bytes
+        self.buffer = bytearray()
+        self.raw_bytes = 0
+
+    def _append(self, data):
+        if len(self.buffer) + len(data) > self.max_bytes:
+            raise ResponseTooLarge(f"响应解码后超过 {self.max_bytes} 字节上限")
+        self.buffer += data
+
+    def _decode(self, decoder, data):
+        """经过一层解码；任一层（含多重编码的中间层）输出超过剩余额度即中止，被截断的输入不会被悄悄丢弃"""
+        limit = self.max_bytes - len(self.buffer)
+        data = decoder.decompress(data, limit)
+        if len(data) > limit:
+            raise ResponseTooLarge(f"响应解码后超过 {self.max_bytes} 字节上限")
+        return data
+
+    def feed(self, chunk):
+        """输入一块原始响应数据"""
+        if not chunk:
+            return
+        self.raw_bytes += len(chunk)
+        if self._sniff:
+            self._sniff = False
+            if chunk[:2] == b'\x1f\x8b':
+                self._decoders = [_ZlibDecoder('gzip')]
+
+        data = chunk
+        try:
+            for decoder in self._decoders:
+                data = self._decode(decoder, data)
+        except ResponseTooLarge:
+            raise
+        except Exception as e:
+            raise ContentDecodingError(f"响应解压失败: {e}") from e
+        self._append(data)
+
+    def finish(self):
+        """结束输入，返回解码后的完整内容"""
+        try:
+            for i, decoder in enumerate(self._decoders):
+                data = decoder.flush()
+                for later in self._decoders[i + 1:]:
+                    data = self._decode(later, data)
+                self._append(data)
+        except ResponseTooLarge:
+            raise
+        except Exception as e:
+            raise ContentDecodingError(f"响应解压失败: {e}") from e
+        return self.buffer
+
+
+def read_decoded(response, max_bytes=UPSTREAM_MAX_RESPONSE_BYTES, chunk_size=UPSTREAM_READ_CHUNK_SIZE):
+    """分块读取urllib风格的响应并按其Content-Encoding解码，返回bytearray"""
+    decoder = StreamDecoder(response.headers.get('Content-Encoding'), max_bytes)
+    while True:
+        chunk = response.read(chunk_size)
+        if not chunk:
+            break
+        decoder.feed(chunk)
+    return decoder.finish()
@@ -11,9 +11,10 @@ import base64
 import urllib.request
 import urllib.error
 import urllib.parse
-import gzip
 import io
 from datetime import datetime
+from http_pool import build_pooled_opener
+from content_decoding import ACCEPT_ENCODING, read_decoded
 
 
 class DataFetcher:
@@ -31,16 +32,9 @@ class DataFetcher:
         print("🔧 使用urllib直连模式")
 
     def setup_urllib_direct(self):
-        """配置urllib直连"""
-        try:
-            # 创建无代理的opener
-            proxy_handler = urllib.request.ProxyHandler({})
-            self.opener = urllib.request.build_opener(proxy_handler)
-            print("✅ urllib直连配置完成")
-        except Exception as e:
-            print(f"❌ urllib配置失败: {e}")
-            # 使用默认opener
-            self.opener = urllib.request.build_opener()
+        """配置直连 - 使用与coin_api.py共享的keep-alive连接池"""
+        self.opener = build_pooled_opener()
+        print("✅ 连接池直连配置完成")
 
     def establish_session(self):
         """建立会话 - 使用urllib"""
@@ -53,7 +47,7 @@ class DataFetcher:
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:140.0) Gecko/20100101 Firefox/140.0',
                     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
                     'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',
-                    'Accept-Encoding': 'gzip, deflate, br, zstd',
+                    'Accept-Encoding': ACCEPT_ENCODING,
                     'Connection': 'keep-alive',
                     'Upgrade-Insecure-Requests': '1',
                     'Sec-Fetch-Dest': 'document',
@@ -89,7 +83,7 @@ class DataFetcher:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:140.0) Gecko/20100101 Firefox/140.0',
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
+            'Accept-Encoding': ACCEPT_ENCODING,
             'client': 'web',
             'web-version': '101',
             'coinank-apikey': api_key,
@@ -128,17 +122,8 @@ class DataFetcher:
                         return None
 
                     try:
-                        # 读取响应数据
-                        response_data = response.read()
-
-                        # 检查是否是gzip压缩
-                        if response_data[:2] == b'\x1f\x8b':
-                            # 解压gzip数据
-                            response_data = gzip.decompress(response_data)
-
-                        # 解码为字符串
-                        response_text = response_data.decode('utf-8')
-                        data = json.loads(response_text)
+                        # 按Content-Encoding流式解压后直接解析
+                        data = json.loads(read_decoded(response))
                         if data.get('success'):
                             data_count = len(data.get('data', []))
                             print(f"✅ 期货数据获取成功 ({data_count} 项)")
@@ -184,17 +169,8 @@ class DataFetcher:
                         return None
 
                     try:
-                        # 读取响应数据
-                        response_data = response.read()
-
-                        # 检查是否是gzip压缩
-                        if response_data[:2] == b'\x1f\x8b':
-                            # 解压gzip数据
-                            response_data = gzip.decompress(response_data)
-
-                        # 解码为字符串
-                        response_text = response_data.decode('utf-8')
-                        data = json.loads(response_text)
+                        # 按Content-Encoding流式解压后直接解析
+                        data = json.loads(read_decoded(response))
                         if data.get('success'):
                             data_count = len(data.get('data', []))
                             print(f"✅ 现货数据获取成功 ({data_count} 项)")
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+本地时序存储模块 - 每条时序一个目录，按列保存为定宽二进制文件，读取时内存映射
+- tss.i8: int64时间戳（升序）；c0.f8, c1.f8...: float64数值列，缺失值为NaN
+- meta.json: 列名、已提交行数与非时序字段，先写临时文件再原子替换
+- 写入只覆盖新数据首个时间戳之后的部分，之前的历史保留；文件从不截短，
+  已映射的旧视图保持有效，行数以meta为准
+- 保留策略：超出DISK_STORE_MAX_ROWS行或早于最新时间戳DISK_STORE_RETENTION_DAYS天的数据，
+  累计达到DISK_STORE_COMPACT_SLACK比例后整体重写为新一代文件（tss.{代}.i8），meta原子切换后删除旧文件
+- 同时打开的时序按LRU保留最多DISK_STORE_MAX_OPEN_SERIES条，关闭时释放其内存映射
+- 读取按时间范围二分定位，返回memmap切片，不复制数据
+- 多进程（gunicorn多worker）共用同一目录：写入时持有目录下的文件锁并先重新加载meta，
+  读取时meta有变化才重新加载
+"""
+
+import contextlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows下只有单进程运行方式
+    fcntl = None
+
+from config import (DISK_STORE_DIR, DISK_STORE_MAX_OPEN_SERIES, DISK_STORE_MAX_ROWS,
+                    DISK_STORE_RETENTION_DAYS, DISK_STORE_COMPACT_SLACK)
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+META_FILE = 'meta.json'
+LOCK_FILE = 'write.lock'
+TSS_FILE = 'tss.i8'
+DAY_MS = 86400 * 1000
+ROWS_PREFIX = 'chartData.'  # 行结构(chartData)的列名前缀，按列位置编号
+
+
+def series_dir_name(key):
+    """时序key转目录名，如 ('longshort', 'BTC', '', '5m') -> longshort_BTC_-_5m"""
+    parts = [re.sub(r'[^A-Za-z0-9.-]', '-', str(part)) or '-' for part in key]
+    return '_'.join(parts)
+
+
+def response_to_columns(data):
+    """上游data转为 (时间戳列表, {列名: 数值列表}, 非时序字段)，不支持的结构返回None"""
+    if isinstance(data.get('tss'), list):
+        tss = data['tss']
+        columns, attrs = {}, {}
+        for key, value in data.items():
+            if key == 'tss':
+                continue
+            if isinstance(value, list) and len(value) == len(tss):
+                columns[key] = value
+            elif (isinstance(value, dict) and value and
+                  all(isinstance(v, list) and len(v) == len(tss) for v in value.values())):
+                for name, values in value.items():
+                    columns[f"{key}.{name}"] = values
+            else:
+                attrs[key] = value
+        return tss, columns, attrs
+
+    rows = data.get('chartData')
+    if isinstance(rows, list) and all(isinstance(row, list) and row for row in rows):
+        width = max((len(row) for row in rows), default=1)
+        columns = {f"{ROWS_PREFIX}{i}": [row[i] if i < len(row) else None for row in rows]
+                   for i in range(1, width)}
+        attrs = {key: value for key, value in data.items() if key != 'chartData'}
+        return [row[0] for row in rows], columns, attrs
+
+    return None
+
+
+def _to_list(values):
+    """数值列转JSON友好的列表，NaN还原为None"""
+    return [None if value != value else value for value in values.tolist()]
+
+
+def columns_to_response(tss, columns, attrs):
+    """response_to_columns的逆过程，重建与上游相同结构的响应"""
+    data = dict(attrs)
+    times = tss.tolist()
+    row_columns = [(name, values) for name, values in columns.items() if name.startswith(ROWS_PREFIX)]
+    if row_columns:
+        row_columns.sort(key=lambda item: int(item[0][len(ROWS_PREFIX):]))
+        value_lists = [_to_list(values) for _, values in row_columns]
+        data['chartData'] = [[ts, *row] for ts, row in zip(times, zip(*value_lists))]
+    else:
+        data['tss'] = times
+        for name, values in columns.items():
+            outer, _, inner = name.partition('.')
+            if inner:
+                data.setdefault(outer, {})[inner] = _to_list(values)
+            else:
+                data[name] = _to_list(values)
+    return {'success': True, 'data': data}
+
+
+class ColumnarSeries:
+    """单条时序的列式文件"""
+
+    def __init__(self, path, max_rows=DISK_STORE_MAX_ROWS, retention_days=DISK_STORE_RETENTION_DAYS,
+                 compact_slack=DISK_STORE_COMPACT_SLACK):
+        self.path = path
+        self.max_rows = max_rows
+        self.retention_ms = int(retention_days * DAY_MS)
+        self.compact_slack = compact_slack
+        self._lock = threading.Lock()
+        self.columns = []  # 列名，文件名为 c{序号}.f8（第0代）或 c{序号}.{代}.f8
+        self.count = 0
+        self.generation = 0  # 每次保留策略重写文件加1
+        self.attrs = {}
+        self._maps = None  # ((代, count, 列数), tss映射, [列映射])
+        self._meta_mtime = None
+        self._load_meta()
+
+    def _load_meta(self):
+        meta_path = os.path.join(self.path, META_FILE)
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ 时序元数据损坏，忽略: %s (%s)", self.path, e)
+            return
+        self.columns = meta.get('columns', [])
+        self.count = meta.get('count', 0)
+        self.generation = meta.get('generation', 0)
+        self.attrs = meta.get('attrs', {})
+        self._meta_mtime = mtime
+
+    def _reload_if_changed(self):
+        """其他进程写入过时重新加载meta（调用方持有锁）"""
+        try:
+            mtime = os.stat(os.path.join(self.path, META_FILE)).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._meta_mtime:
+            self._load_meta()
+
+    @contextlib.contextmanager
+    def _process_lock(self):
+        """跨进程写锁，不支持fcntl的平台只依赖进程内锁"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.path, LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write_meta(self):
+        meta = {'columns': self.columns, 'count': self.count, 'generation': self.generation, 'attrs': self.attrs}
+        tmp_path = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+        self._meta_mtime = os.stat(os.path.join(self.path, META_FILE)).st_mtime_ns
+
+    @staticmethod
+    def _write_at(file_path, array, offset_rows, padding_rows=0):
+        """从第offset_rows行开始写入（文件不存在时创建），padding_rows为写入前补齐的NaN行数"""
+        mode = 'r+b' if os.path.exists(file_path) else 'w+b'
+        with open(file_path, mode) as f:
+            f.seek((offset_rows - padding_rows) * array.itemsize)
+            if padding_rows:
+                f.write(np.full(padding_rows, np.nan, dtype=array.dtype).tobytes())
+            f.write(array.tobytes())
+
+    def _tss_path(self, generation=None):
+        generation = self.generation if generation is None else generation
+        name = TSS_FILE if generation == 0 else f"tss.{generation}.i8"
+        return os.path.join(self.path, name)
+
+    def _column_path(self, index, generation=None):
+        generation = self.generation if generation is None else generation
+        name = f"c{index}.f8" if generation == 0 else f"c{index}.{generation}.f8"
+        return os.path.join(self.path, name)
+
+    def _mapped(self):
+        """当前行数的内存映射（调用方持有锁）"""
+        shape = (self.generation, self.count, len(self.columns))
+        if self._maps is not None and self._maps[0] == shape:
+            return self._maps
+        if self.count == 0:
+            tss = np.empty(0, dtype=np.int64)
+            values = [np.empty(0, dtype=np.float64) for _ in self.columns]
+        else:
+            tss = np.memmap(self._tss_path(), dtype=np.int64, mode='r', shape=(self.count,))
+            values = [np.memmap(self._column_path(i), dtype=np.float64, mode='r', shape=(self.count,))
+                      for i in range(len(self.columns))]
+        self._maps = (shape, tss, values)
+        return self._maps
+
+    def write(self, tss, columns, attrs):
+        """写入一段数据：已有数据中时间戳不早于tss[0]的部分被替换，返回写入行数"""
+        if not tss:
+            return 0
+        new_tss = np.asarray(tss, dtype=np.int64)
+        new_columns = {name: np.asarray([np.nan if v is None else v for v in values], dtype=np.float64)
+                       for name, values in columns.items()}
+
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with self._process_lock():
+                self._reload_if_changed()
+                self._write_locked(new_tss, new_columns, attrs)
+        return len(new_tss)
+
+    def _write_locked(self, new_tss, new_columns, attrs):
+        """写入数据文件并提交meta（调用方持有进程内锁与文件锁）"""
+        _, old_tss, _ = self._mapped()
+        cut = int(np.searchsorted(old_tss, new_tss[0], side='left'))
+        count = cut + len(new_tss)
+
+        self._write_at(self._tss_path(), new_tss, cut)
+        for name in new_columns:
+            if name not in self.columns:
+                # 新出现的列（如新交易所），历史部分补NaN
+                self.columns.append(name)
+                self._write_at(self._column_path(len(self.columns) - 1), np.empty(0), cut, padding_rows=cut)
+        for index, name in enumerate(self.columns):
+            values = new_columns.get(name)
+            if values is None:
+                values = np.full(len(new_tss), np.nan)
+            self._write_at(self._column_path(index), values, cut)
+
+        self.count = count
+        self.attrs = attrs
+        self._write_meta()
+
+        drop = self._expired_rows()
+        if drop and drop >= self.compact_slack * self.count:
+            self._compact_locked(drop)
+
+    def _expired_rows(self):
+        """超出行数上限或保留天数的前缀行数（调用方持有锁）"""
+        _, tss, _ = self._mapped()
+        drop = 0
+        if self.max_rows and self.count > self.max_rows:
+            drop = self.count - self.max_rows
+        if self.retention_ms and self.count:
+            drop = max(drop, int(np.searchsorted(tss, int(tss[-1]) - self.retention_ms, side='left')))
+        return drop
+
+    def _compact_locked(self, drop):
+        """丢弃前drop行：剩余数据写入下一代文件，meta原子切换后删除旧文件（调用方持有进程内锁与文件锁）
+
+        其他进程已映射的旧文件在删除后仍然有效，下次读取时按新meta重新映射
+        """
+        _, tss, values = self._mapped()
+        old_generation, generation = self.generation, self.generation + 1
+        with open(self._tss_path(generation), 'wb') as f:
+            f.write(np.ascontiguousarray(tss[drop:]).tobytes())
+        for index, column in enumerate(values):
+            with open(self._column_path(index, generation), 'wb') as f:
+                f.write(np.ascontiguousarray(column[drop:]).tobytes())
+
+        self.generation = generation
+        self.count -= drop
+        self._maps = None
+        self._write_meta()
+
+        for path in [self._tss_path(old_generation)] + [self._column_path(i, old_generation)
+                                                        for i in range(len(self.columns))]:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+        logger.info("🧹 时序%s按保留策略丢弃 %s 行，保留 %s 行", os.path.basename(self.path), drop, self.count)
+
+    def close(self):
+        """释放内存映射（已返回给调用方的切片仍然有效）"""
+        with self._lock:
+            self._maps = None
+
+    def read(self, start=None, end=None, limit=None):
+        """按时间范围读取 [start, end]，返回 (tss切片, {列名: 切片}, 非时序字段)，均为内存映射视图"""
+        with self._lock:
+            self._reload_if_changed()
+            try:
+                _, tss, values = self._mapped()
+            except FileNotFoundError:
+                # 读到旧meta后其他进程恰好完成重写并删除了旧文件
+                self._load_meta()
+                _, tss, values = self._mapped()
+            columns = list(self.columns)
+            attrs = dict(self.attrs)
+
+        lo = 0 if start is None else int(np.searchsorted(tss, start, side='left'))
+        hi = len(tss) if end is None else int(np.searchsorted(tss, end, side='right'))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return tss[lo:hi], {name: column[lo:hi] for name, column in zip(columns, values)}, attrs
+
+
+class DiskSeriesStore:
+    """本地时序存储 - 按时序key管理ColumnarSeries，打开的时序按LRU淘汰"""
+
+    def __init__(self, root=DISK_STORE_DIR, max_open=DISK_STORE_MAX_OPEN_SERIES):
+        self.root = root
+        self.max_open = max_open
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 统计
+        self.closed = 0
+        self.rows_written = 0
+        self.warm_loads = 0
+        self.write_failures = 0
+
+    def series(self, key):
+        name = series_dir_name(key)
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = ColumnarSeries(os.path.join(self.root, name))
+                self._series[name] = series
+                while len(self._series) > self.max_open:
+                    _, evicted = self._series.popitem(last=False)
+                    evicted.close()
+                    self.closed += 1
+            else:
+                self._series.move_to_end(name)
+            return series
+
+    def save(self, key, response):
+        """保存上游响应中的时序（全量或增量），失败只记录日志"""
+        if not response or not response.get('success') or not isinstance(response.get('data'), dict):
+            return
+        converted = response_to_columns(response['data'])
+        if converted is None:
+            return
+        try:
+            rows = self.series(key).write(*converted)
+        except (OSError, ValueError, TypeError) as e:
+            self.write_failures += 1
+            logger.warning("⚠️ 时序写入本地存储失败 %s: %s", series_dir_name(key), e)
+            return
+        with self._lock:
+            self.rows_written += rows
+
+    def load(self, key, limit=None):
+        """读取最近limit个点并重建为上游响应结构，无数据返回None"""
+        tss, columns, attrs = self.series(key).read(limit=limit)
+        if len(tss) == 0:
+            return None
+        with self._lock:
+            self.warm_loads += 1
+        return columns_to_response(tss, columns, attrs)
+
+    def read(self, key, start=None, end=None, limit=None):
+        """按时间范围读取内存映射切片"""
+        return self.series(key).read(start, end, limit)
+
+    def get_stats(self):
+        """获取本地存储统计"""
+        with self._lock:
+            series = list(self._series.values())
+            return {
+                'root': self.root,
+                'open_series': len(series),
+                'max_open_series': self.max_open,
+                'closed_series': self.closed,
+                'stored_rows': sum(s.count for s in series),
+                'rows_written': self.rows_written,
+                'warm_loads': self.warm_loads,
+                'write_failures': self.write_failures
+            }
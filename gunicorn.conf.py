@@ -0,0 +1,56 @@
+"""
+gunicorn配置 - gunicorn -c gunicorn.conf.py wsgi:app
+各参数见config.py的生产部署配置
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from config import (WSGI_BIND, WSGI_WORKERS, WSGI_THREADS, WSGI_TIMEOUT,
+                    WSGI_GRACEFUL_TIMEOUT, WSGI_KEEPALIVE, WSGI_MAX_REQUESTS,
+                    SHARED_CACHE_URL, SHARED_CACHE_STANDIN, SHARED_CACHE_STANDIN_SOCKET)
+
+bind = WSGI_BIND
+workers = WSGI_WORKERS
+worker_class = 'gthread'  # 应用基于线程（缓存后台刷新、SSE推送），每个worker内多线程处理请求
+threads = WSGI_THREADS
+timeout = WSGI_TIMEOUT
+graceful_timeout = WSGI_GRACEFUL_TIMEOUT
+keepalive = WSGI_KEEPALIVE
+max_requests = WSGI_MAX_REQUESTS
+max_requests_jitter = WSGI_MAX_REQUESTS // 10
+preload_app = False  # 各worker自行导入应用，主进程不创建线程与连接
+
+_standin = None
+
+
+def on_starting(server):
+    """多worker且未配置共享缓存时启动替身服务，地址经环境变量传给worker"""
+    global _standin
+    if server.cfg.workers < 2 or SHARED_CACHE_URL or not SHARED_CACHE_STANDIN or not hasattr(os, 'fork'):
+        return
+    socket_path = os.path.abspath(SHARED_CACHE_STANDIN_SOCKET)
+    _standin = subprocess.Popen([sys.executable, '-m', 'shared_cache', '--unix', socket_path])
+    deadline = time.time() + 5
+    while not os.path.exists(socket_path) and time.time() < deadline:
+        time.sleep(0.05)
+    os.environ['COINANK_SHARED_CACHE_URL'] = 'unix://' + socket_path
+    server.log.info("共享缓存替身服务: %s (pid %s)", socket_path, _standin.pid)
+
+
+def on_exit(server):
+    if _standin is not None:
+        _standin.terminate()
+        _standin.wait(timeout=5)
+
+
+def post_worker_init(worker):
+    import wsgi
+    wsgi.init_worker(worker.cfg.workers)
+
+
+def worker_exit(server, worker):
+    import wsgi
+    wsgi.shutdown_worker()
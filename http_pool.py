@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+HTTP连接池模块 - 持久化keep-alive连接
+为coin_api.py和data.py提供共享的按主机连接池，替代urllib每次请求新建TCP+TLS连接
+"""
+
+import io
+import os
+import select
+import socket
+import ssl
+import threading
+import time
+import http.client
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import deque
+
+from config import HTTP_POOL_MAXSIZE, HTTP_POOL_IDLE_TIMEOUT
+
+
+# 会跟随的重定向状态码
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+# 复用连接时可能遇到的"服务器已关闭连接"类异常，遇到后用新连接重试一次
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+
+class HostConnectionPool:
+    """单个主机(含代理)的连接池"""
+
+    def __init__(self, scheme, host, port, proxy=None, maxsize=HTTP_POOL_MAXSIZE,
+                 idle_timeout=HTTP_POOL_IDLE_TIMEOUT, ssl_context=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.proxy = proxy  # (host, port) 或 None
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+
+        self._idle = deque()  # [(conn, last_used), ...]
+        self._lock = threading.Lock()
+
+        # 统计计数
+        self.created = 0
+        self.reused = 0
+        self.discarded_idle = 0
+        self.discarded_unhealthy = 0
+        self.discarded_overflow = 0
+        self.in_use = 0
+
+    def _new_connection(self, timeout):
+        """新建连接 - 代理模式下HTTPS走CONNECT隧道"""
+        if self.proxy:
+            proxy_host, proxy_port = self.proxy
+            if self.scheme == 'https':
+                conn = http.client.HTTPSConnection(proxy_host, proxy_port, timeout=timeout,
+                                                   context=self.ssl_context)
+                conn.set_tunnel(self.host, self.port)
+            else:
+                conn = http.client.HTTPConnection(proxy_host, proxy_port, timeout=timeout)
+        elif self.scheme == 'https':
+            conn = http.client.HTTPSConnection(self.host, self.port, timeout=timeout,
+                                               context=self.ssl_context)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        return conn
+
+    def _is_healthy(self, conn):
+        """健康检查 - 空闲连接上出现可读事件说明对端已关闭或有残留数据"""
+        sock = conn.sock
+        if sock is None:
+            return False
+        try:
+            if isinstance(sock, ssl.SSLSocket) and sock.pending():
+                return False
+            readable, _, _ = select.select([sock], [], [], 0)
+            return not readable
+        except (OSError, ValueError):
+            return False
+
+    def acquire(self, timeout):
+        """获取连接，返回 (conn, 是否复用)"""
+        now = time.time()
+        with self._lock:
+            while self._idle:
+                conn, last_used = self._idle.pop()
+                if now - last_used > self.idle_timeout:
+                    self.discarded_idle += 1
+                    conn.close()
+                    continue
+                if not self._is_healthy(conn):
+                    self.discarded_unhealthy += 1
+                    conn.close()
+                    continue
+                self.reused += 1
+                self.in_use += 1
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+
+            self.created += 1
+            self.in_use += 1
+
+        return self._new_connection(timeout), False
+
+    def release(self, conn):
+        """归还连接到池中"""
+        with self._lock:
+            self.in_use -= 1
+            if conn.sock is None:
+                return
+            if len(self._idle) >= self.maxsize:
+                self.discarded_overflow += 1
+                conn.close()
+                return
+            self._idle.append((conn, time.time()))
+
+    def discard(self, conn):
+        """丢弃连接(出错或响应未读完)"""
+        with self._lock:
+            self.in_use -= 1
+        conn.close()
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                conn.close()
+
+    def get_stats(self):
+        """获取连接池统计"""
+        with self._lock:
+            total = self.created + self.reused
+            return {
+                'host': f"{self.host}:{self.port}",
+                'proxy': f"{self.proxy[0]}:{self.proxy[1]}" if self.proxy else None,
+                'idle': len(self._idle),
+                'in_use': self.in_use,
+                'created': self.created,
+                'reused': self.reused,
+                'reuse_rate': round(self.reused / total, 4) if total else 0,
+                'discarded_idle': self.discarded_idle,
+                'discarded_unhealthy': self.discarded_unhealthy,
+                'discarded_overflow': self.discarded_overflow
+            }
+
+
+class PoolManager:
+    """连接池管理器 - 按(协议, 主机, 端口, 代理)维护连接池"""
+
+    def __init__(self, maxsize=HTTP_POOL_MAXSIZE, idle_timeout=HTTP_POOL_IDLE_TIMEOUT):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.ssl_context = ssl.create_default_context()
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def get_pool(self, scheme, host, port, proxy=None):
+        """获取(或创建)指定主机的连接池"""
+        key = (scheme, host, port, proxy)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = HostConnectionPool(scheme, host, port, proxy=proxy,
+                                          maxsize=self.maxsize,
+                                          idle_timeout=self.idle_timeout,
+                                          ssl_context=self.ssl_context)
+                self._pools[key] = pool
+            return pool
+
+    def clear(self):
+        """关闭所有连接池"""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            pool.close()
+
+    def get_stats(self):
+        """获取全部连接池统计"""
+        with self._lock:
+            pools = list(self._pools.values())
+
+        pool_stats = [pool.get_stats() for pool in pools]
+        created = sum(s['created'] for s in pool_stats)
+        reused = sum(s['reused'] for s in pool_stats)
+        total = created + reused
+        return {
+            'maxsize': self.maxsize,
+            'idle_timeout': self.idle_timeout,
+            'connections_created': created,
+            'connections_reused': reused,
+            'reuse_rate': round(reused / total, 4) if total else 0,
+            'pools': pool_stats
+        }
+
+
+class PooledResponse:
+    """连接池响应 - 接口与urllib响应对象兼容，关闭时归还连接"""
+
+    def __init__(self, pool, conn, response, url):
+        self._pool = pool
+        self._conn = conn
+        self._response = response
+        self._released = False
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def getcode(self):
+        return self.status
+
+    def geturl(self):
+        return self.url
+
+    def info(self):
+        return self.headers
+
+    def read(self, amt=None):
+        return self._response.read(amt)
+
+    def close(self):
+        """关闭响应 - 响应已读完且服务器允许保持连接时归还连接池"""
+        if self._released:
+            return
+        self._released = True
+        if self._response.isclosed() and not self._response.will_close:
+            self._pool.release(self._conn)
+        else:
+            self._response.close()
+            self._pool.discard(self._conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PooledOpener:
+    """基于连接池的opener - 提供与urllib OpenerDirector相同的open()/addheaders接口"""
+
+    def __init__(self, manager, proxies=None):
+        self.manager = manager
+        self.proxies = proxies or {}
+        self.addheaders = []
+
+    def _get_proxy(self, scheme):
+        """解析代理地址"""
+        proxy_url = self.proxies.get(scheme)
+        if not proxy_url:
+            return None
+        parsed = urllib.parse.urlsplit(proxy_url)
+        return (parsed.hostname, parsed.port or 80)
+
+    def _send(self, method, url, headers, timeout):
+        """发送单个请求，复用连接失效时用新连接重试一次"""
+        parsed = urllib.parse.urlsplit(url)
+        scheme = parsed.scheme
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        proxy = self._get_proxy(scheme)
+        pool = self.manager.get_pool(scheme, parsed.hostname, port, proxy)
+
+        # HTTP代理需要绝对URL，其余情况使用路径
+        if proxy and scheme == 'http':
+            target = url
+        else:
+            target = parsed.path or '/'
+            if parsed.query:
+                target += '?' + parsed.query
+
+        while True:
+            conn, reused = pool.acquire(timeout)
+            try:
+                conn.request(method, target, headers=headers)
+                response = conn.getresponse()
+                return PooledResponse(pool, conn, response, url)
+            except STALE_CONNECTION_ERRORS:
+                pool.discard(conn)
+                if not reused:
+                    raise
+            except BaseException:
+                pool.discard(conn)
+                raise
+
+    def open(self, req, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
+        """打开URL或Request对象 - 跟随重定向，4xx/5xx抛出HTTPError"""
+        if isinstance(req, str):
+            req = urllib.request.Request(req)
+        if timeout is socket._GLOBAL_DEFAULT_TIMEOUT:
+            timeout = None
+
+        headers = dict(req.header_items())
+        lower_keys = {k.lower() for k in headers}
+        for name, value in self.addheaders:
+            if name.lower() not in lower_keys:
+                headers[name] = value
+
+        method = req.get_method()
+        url = req.full_url
+
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send(method, url, headers, timeout)
+
+            if response.status in REDIRECT_CODES and response.headers.get('Location'):
+                response.read()
+                response.close()
+                url = urllib.parse.urljoin(url, response.headers['Location'])
+                continue
+
+            if response.status >= 400:
+                body = response.read()
+                response.close()
+                raise urllib.error.HTTPError(url, response.status, response.reason,
+                                             response.headers, io.BytesIO(body))
+
+            return response
+
+        raise urllib.error.URLError(f"重定向次数过多: {url}")
+
+    def get_stats(self):
+        """获取连接池统计"""
+        return self.manager.get_stats()
+
+
+# 进程内共享的连接池管理器
+_shared_manager = None
+_shared_manager_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """fork出的子进程（如gunicorn worker）不复用父进程的连接与锁，首次使用时重新创建"""
+    global _shared_manager, _shared_manager_lock
+    _shared_manager = None
+    _shared_manager_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_shared_pool_manager():
+    """获取进程共享的连接池管理器"""
+    global _shared_manager
+    with _shared_manager_lock:
+        if _shared_manager is None:
+            _shared_manager = PoolManager()
+        return _shared_manager
+
+
+def build_pooled_opener(proxies=None):
+    """创建使用共享连接池的opener"""
+    return PooledOpener(get_shared_pool_manager(), proxies=proxies)
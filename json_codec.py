@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+JSON编解码模块 - 可插拔后端
+安装orjson时使用orjson（直接从bytes解析、直接输出bytes），否则回退到标准库json
+上游响应解析与API响应序列化统一经过这里，避免bytes→str→对象的多次拷贝
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+JSONDecodeError = (json.JSONDecodeError, orjson.JSONDecodeError) if orjson else (json.JSONDecodeError,)
+
+BACKEND = 'orjson' if orjson else 'json'
+
+
+def _default(value):
+    """标准库后端的兜底序列化 - numpy标量/数组等"""
+    if hasattr(value, 'tolist'):
+        value = value.tolist()
+        # 与orjson后端一致：数组中的NaN输出为null
+        if isinstance(value, list):
+            return [None if isinstance(item, float) and item != item else item for item in value]
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def loads(data):
+        """解析JSON（bytes/str均可，bytes不经过解码拷贝）"""
+        return orjson.loads(data)
+
+    def dumps(value, sort_keys=False):
+        """序列化为紧凑的UTF-8 JSON字节"""
+        options = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTIONS
+        return orjson.dumps(value, default=_default, option=options)
+
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_default)
+    _sorted_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'),
+                                       default=_default, sort_keys=True)
+
+    def loads(data):
+        """解析JSON（bytes/str均可，标准库会自动识别UTF-8编码）"""
+        return json.loads(data)
+
+    def dumps(value, sort_keys=False):
+        """序列化为紧凑的UTF-8 JSON字节"""
+        return (_sorted_encoder if sort_keys else _encoder).encode(value).encode('utf-8')
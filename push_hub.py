@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+实时推送模块 - 按 (代币, 数据流) 主题订阅，服务端统一刷新后向所有订阅者扇出增量
+- 每个主题只有一个刷新者，经由数据缓存读取，上游请求量取决于不同主题数而不是连接数
+- 同一版本的事件只序列化一次，所有订阅者共享同一份字节
+- 与上一版本比较生成增量：字典逐键比较，时序数组识别"滑动窗口+追加"，其余整体替换
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import json_codec
+from config import PUSH_INTERVAL, PUSH_QUEUE_SIZE, PUSH_REFRESH_WORKERS
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+# 数组增量最多识别的头部滑出点数，超出按整体替换
+MAX_SLIDE = 16
+
+
+def _splice_op(old, new, path):
+    """数组按滑动窗口比较：结果 = old[trim:trim+keep] + value，无法复用一半以上时返回None"""
+    best_trim, best_keep = 0, 0
+    for trim in range(min(len(old), MAX_SLIDE) + 1):
+        keep = 0
+        limit = min(len(old) - trim, len(new))
+        while keep < limit and old[trim + keep] == new[keep]:
+            keep += 1
+        if keep > best_keep:
+            best_trim, best_keep = trim, keep
+        if trim + keep == len(old):
+            # 旧数组尾部全部保留，不会有更优的trim
+            break
+    if best_keep * 2 < len(new):
+        return None
+    return {'op': 'splice', 'path': path, 'trim': best_trim, 'keep': best_keep, 'value': new[best_keep:]}
+
+
+def diff_payload(old, new, path=()):
+    """生成从old到new的增量操作列表，相同时返回[]
+
+    操作: replace(整体替换) / remove(删除键) / splice(数组滑动窗口+追加)
+    """
+    if type(old) is not type(new):
+        return [{'op': 'replace', 'path': list(path), 'value': new}]
+
+    if isinstance(new, dict):
+        ops = [{'op': 'remove', 'path': list(path + (key,))} for key in old if key not in new]
+        for key, value in new.items():
+            if key not in old:
+                ops.append({'op': 'replace', 'path': list(path + (key,)), 'value': value})
+            elif old[key] != value:
+                ops.extend(diff_payload(old[key], value, path + (key,)))
+        return ops
+
+    if old == new:
+        return []
+
+    if isinstance(new, list) and old:
+        op = _splice_op(old, new, list(path))
+        if op is not None:
+            return [op]
+
+    return [{'op': 'replace', 'path': list(path), 'value': new}]
+
+
+def format_event(event, data):
+    """编码一条SSE事件"""
+    return b'event: ' + event.encode('ascii') + b'\ndata: ' + json_codec.dumps(data) + b'\n\n'
+
+
+class Subscriber:
+    """一个推送连接 - 有界事件队列，积压溢出时改为重发快照"""
+
+    def __init__(self, topics, queue_size=PUSH_QUEUE_SIZE):
+        self.topics = topics
+        self._queue = queue.Queue(queue_size)
+        self.closed = False
+        self.resyncs = 0
+
+    def put(self, event):
+        """放入事件，队列已满返回False"""
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+    def reset(self, events):
+        """丢弃积压事件，改为放入各主题的最新快照"""
+        self.resyncs += 1
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        for event in events:
+            self.put(event)
+
+    def get(self, timeout):
+        """取出当前所有待发送事件合并为一块，超时返回None"""
+        try:
+            chunks = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return None
+        while True:
+            try:
+                chunks.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return b''.join(chunk for chunk in chunks if chunk)
+
+    def close(self):
+        self.closed = True
+        self.put(b'')
+
+
+class Topic:
+    """单个 (代币, 数据流) 主题的最新状态"""
+
+    __slots__ = ('token', 'stream', 'subscribers', 'value', 'payload', 'version', 'snapshot',
+                 'loading', 'last_refresh')
+
+    def __init__(self, token, stream):
+        self.token = token
+        self.stream = stream
+        self.subscribers = set()
+        self.value = None
+        self.payload = None
+        self.version = 0
+        self.snapshot = None
+        self.loading = False
+        self.last_refresh = 0.0
+
+    @property
+    def name(self):
+        return f"{self.token}:{self.stream}"
+
+
+class PushHub:
+    """推送中心 - 管理主题、订阅者与后台刷新线程"""
+
+    def __init__(self, interval=PUSH_INTERVAL, queue_size=PUSH_QUEUE_SIZE, workers=PUSH_REFRESH_WORKERS):
+        self.interval = interval
+        self.queue_size = queue_size
+
+        self._streams = {}  # 数据流名称 -> (fetch(token), build_payload(value))
+        self._topics = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='coinank-push')
+        self._stop = threading.Event()
+        self._thread = None
+
+        # 统计
+        self.subscriber_count = 0
+        self.fetches = 0
+        self.fetch_failures = 0
+        self.snapshots_published = 0
+        self.patches_published = 0
+        self.events_delivered = 0
+        self.bytes_delivered = 0
+        self.resyncs = 0
+
+    def register_stream(self, name, fetch, build_payload):
+        """注册数据流 - fetch(token)返回原始值（应经由缓存），build_payload(value)返回推送内容"""
+        self._streams[name] = (fetch, build_payload)
+
+    @property
+    def streams(self):
+        return list(self._streams)
+
+    def subscribe(self, topics):
+        """订阅 [(token, stream), ...]，已有数据的主题立即放入快照"""
+        subscriber = Subscriber(topics, self.queue_size)
+        to_load = []
+        with self._lock:
+            self.subscriber_count += 1
+            for token, stream in topics:
+                topic = self._topics.get((token, stream))
+                if topic is None:
+                    topic = Topic(token, stream)
+                    self._topics[(token, stream)] = topic
+                topic.subscribers.add(subscriber)
+                if topic.snapshot is not None:
+                    subscriber.put(topic.snapshot)
+                else:
+                    to_load.append(topic)
+        for topic in to_load:
+            self._submit(topic)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """取消订阅，主题没有订阅者时不再刷新"""
+        with self._lock:
+            self.subscriber_count -= 1
+            for key in subscriber.topics:
+                topic = self._topics.get(key)
+                if topic is None:
+                    continue
+                topic.subscribers.discard(subscriber)
+                if not topic.subscribers:
+                    del self._topics[key]
+
+    def _submit(self, topic):
+        with self._lock:
+            if topic.loading:
+                return
+            topic.loading = True
+        try:
+            self._executor.submit(self._refresh, topic)
+        except RuntimeError:
+            # 关闭过程中
+            topic.loading = False
+
+    def _refresh(self, topic):
+        """读取主题最新值，有变化时生成快照与增量事件并扇出"""
+        fetch, build_payload = self._streams[topic.stream]
+        try:
+            value = fetch(topic.token)
+        except Exception as e:
+            logger.exception("❌ 推送主题刷新异常 %s: %s", topic.name, e)
+            value = None
+
+        try:
+            if value is None:
+                return
+            # 缓存条目未更新时返回同一对象，无需比较
+            if value is topic.value:
+                return
+
+            payload = build_payload(value)
+            ops = diff_payload(topic.payload, payload) if topic.payload is not None else None
+            if ops == []:
+                topic.value = value
+                return
+
+            version = topic.version + 1
+            snapshot = format_event('snapshot', {'topic': topic.name, 'version': version, 'data': payload})
+            if ops is None:
+                event = snapshot
+                self.snapshots_published += 1
+            else:
+                event = format_event('patch', {'topic': topic.name, 'version': version,
+                                               'base': topic.version, 'ops': ops})
+                self.patches_published += 1
+
+            with self._lock:
+                topic.value, topic.payload, topic.version, topic.snapshot = value, payload, version, snapshot
+                for subscriber in topic.subscribers:
+                    if subscriber.put(event):
+                        self.events_delivered += 1
+                        self.bytes_delivered += len(event)
+                    else:
+                        # 客户端消费过慢，丢弃积压，改为发送全部主题的最新快照
+                        self.resyncs += 1
+                        subscriber.reset([t.snapshot for t in map(self._topics.get, subscriber.topics)
+                                          if t is not None and t.snapshot is not None])
+        finally:
+            with self._lock:
+                topic.loading = False
+                topic.last_refresh = time.time()
+                self.fetches += 1
+                if value is None:
+                    self.fetch_failures += 1
+
+    def tick(self):
+        """检查所有有订阅者的主题"""
+        with self._lock:
+            topics = [topic for topic in self._topics.values() if not topic.loading]
+        for topic in topics:
+            self._submit(topic)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.exception("❌ 推送刷新异常: %s", e)
+
+    def start(self):
+        """启动刷新线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='push-hub', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止刷新线程并结束所有推送连接"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+        with self._lock:
+            subscribers = {s for topic in self._topics.values() for s in topic.subscribers}
+        for subscriber in subscribers:
+            subscriber.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self):
+        """获取推送统计"""
+        with self._lock:
+            return {
+                'running': bool(self._thread and self._thread.is_alive()),
+                'streams': self.streams,
+                'topics': len(self._topics),
+                'subscribers': self.subscriber_count,
+                'subscriptions': sum(len(topic.subscribers) for topic in self._topics.values()),
+                'fetches': self.fetches,
+                'fetch_failures': self.fetch_failures,
+                'snapshots_published': self.snapshots_published,
+                'patches_published': self.patches_published,
+                'events_delivered': self.events_delivered,
+                'bytes_delivered': self.bytes_delivered,
+                'resyncs': self.resyncs
+            }
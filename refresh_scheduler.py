@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+热点刷新调度模块 - 统计各缓存key的访问频率，在TTL到期前主动刷新热门key
+使热门代币页面始终命中缓存，不再由TTL到期后的第一个访问者承担上游延迟
+"""
+
+import random
+import threading
+import time
+
+from config import (SCHEDULER_TOP_N, SCHEDULER_LEAD_TIME, SCHEDULER_JITTER,
+                    SCHEDULER_INTERVAL, SCHEDULER_BUDGET_PER_MINUTE,
+                    SCHEDULER_HALF_LIFE, SCHEDULER_NAMESPACE_COST)
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+# 最多跟踪的key数量，超出时淘汰热度最低的key
+MAX_TRACKED_KEYS = 1000
+# 热度低于该值（约一个半衰期内无访问）的key不再预刷新，也不再跟踪
+MIN_SCORE = 0.5
+
+
+class RequestBudget:
+    """全局上游请求预算 - 按分钟补充的令牌桶"""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_consume(self, cost):
+        """尝试消耗cost个请求额度"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            if self.tokens < cost:
+                return False
+            self.tokens -= cost
+            return True
+
+    def available(self):
+        with self._lock:
+            return round(self.tokens, 2)
+
+
+class HotKeyScheduler:
+    """热点key预刷新调度器"""
+
+    def __init__(self, cache, top_n=SCHEDULER_TOP_N, lead_time=SCHEDULER_LEAD_TIME,
+                 jitter=SCHEDULER_JITTER, interval=SCHEDULER_INTERVAL,
+                 budget_per_minute=SCHEDULER_BUDGET_PER_MINUTE,
+                 half_life=SCHEDULER_HALF_LIFE, namespace_cost=None):
+        self.cache = cache
+        self.top_n = top_n
+        self.lead_time = lead_time
+        self.jitter = jitter
+        self.interval = interval
+        self.half_life = half_life
+        self.namespace_cost = dict(SCHEDULER_NAMESPACE_COST if namespace_cost is None else namespace_cost)
+        self.budget = RequestBudget(budget_per_minute)
+
+        self._scores = {}  # (namespace, key) -> (score, last_access)
+        self._plans = {}   # (namespace, key) -> (stored_at, refresh_at)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # 统计
+        self.refreshes_triggered = 0
+        self.skipped_budget = 0
+
+    def record_access(self, namespace, key):
+        """记录一次访问 - 热度按半衰期指数衰减"""
+        now = time.time()
+        cache_key = (namespace, key)
+        with self._lock:
+            score, last_access = self._scores.get(cache_key, (0.0, now))
+            decay = 0.5 ** ((now - last_access) / self.half_life)
+            self._scores[cache_key] = (score * decay + 1.0, now)
+
+            if len(self._scores) > MAX_TRACKED_KEYS:
+                coldest = min(self._scores, key=lambda k: self._current_score(k, now))
+                self._scores.pop(coldest, None)
+                self._plans.pop(coldest, None)
+
+    def _current_score(self, cache_key, now):
+        score, last_access = self._scores[cache_key]
+        return score * 0.5 ** ((now - last_access) / self.half_life)
+
+    def hot_keys(self, now=None):
+        """当前热度最高的top_n个key"""
+        now = now or time.time()
+        with self._lock:
+            scored = []
+            for cache_key in list(self._scores):
+                score = self._current_score(cache_key, now)
+                if score < MIN_SCORE:
+                    self._scores.pop(cache_key, None)
+                    self._plans.pop(cache_key, None)
+                else:
+                    scored.append((cache_key, score))
+            scored.sort(key=lambda item: item[1], reverse=True)
+            return scored[:self.top_n]
+
+    def _refresh_at(self, cache_key, entry):
+        """计算刷新时间点：到期前lead_time，并加随机抖动避免集中刷新"""
+        plan = self._plans.get(cache_key)
+        if plan is None or plan[0] != entry.stored_at:
+            lead = min(self.lead_time, entry.ttl * 0.5)
+            jitter = random.uniform(0, min(self.jitter, entry.ttl * 0.25))
+            plan = (entry.stored_at, entry.stored_at + entry.ttl - lead - jitter)
+            self._plans[cache_key] = plan
+        return plan[1]
+
+    def tick(self):
+        """执行一轮调度"""
+        now = time.time()
+        for cache_key, _ in self.hot_keys(now):
+            namespace, key = cache_key
+            entry = self.cache.peek(namespace, key)
+            if entry is None or entry.loader is None:
+                continue
+
+            with self._lock:
+                refresh_at = self._refresh_at(cache_key, entry)
+            if now < refresh_at:
+                continue
+
+            cost = self.namespace_cost.get(namespace, 1)
+            if not self.budget.try_consume(cost):
+                self.skipped_budget += 1
+                continue
+
+            if self.cache.schedule_refresh(namespace, key):
+                self.refreshes_triggered += 1
+                logger.debug("🔥 预刷新热点缓存: %s/%s", namespace, key)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.exception("❌ 热点刷新调度异常: %s", e)
+
+    def set_budget(self, per_minute):
+        """调整每分钟预刷新预算（多worker部署时每个worker分得总预算的1/N）"""
+        self.budget = RequestBudget(per_minute)
+
+    def start(self):
+        """启动调度线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='hot-key-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止调度线程"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+
+    def get_stats(self):
+        """获取调度统计"""
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'tracked_keys': len(self._scores),
+            'top_n': self.top_n,
+            'lead_time': self.lead_time,
+            'jitter': self.jitter,
+            'budget_per_minute': self.budget.capacity,
+            'budget_available': self.budget.available(),
+            'refreshes_triggered': self.refreshes_triggered,
+            'skipped_budget': self.skipped_budget,
+            'hot_keys': [
+                {'namespace': namespace, 'key': key, 'score': round(score, 2)}
+                for (namespace, key), score in self.hot_keys()
+            ]
+        }
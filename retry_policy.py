@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+上游重试策略模块 - 按错误类型决定是否重试，重试间隔为去相关抖动退避，并受进程级重试预算限制
+- 错误分类：超时 / 连接错误 / 限流(429、503) / 其他5xx / 接口success:false / 非JSON响应 / 其他4xx
+- 退避：delay = min(上限, uniform(基准, 上次delay * 3))，多个请求同时失败时不会同步重试
+- 重试预算：每个首次请求积累RETRY_BUDGET_RATIO次重试额度，另按时间补充少量保底额度，
+  上限为RETRY_BUDGET_WINDOW个请求积累的额度；额度用完时不再重试，上游故障期间重试带来的额外请求量不超过约10%
+- 请求线程上已有可回退的旧缓存时（no_backoff()范围内）不退避重试，失败后尽快返回旧值，重试留给后台刷新
+- 按端点族（/api/<族>/...）覆盖最多尝试次数、可重试的错误类型与退避参数
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import socket
+import threading
+import time
+import urllib.error
+from contextlib import contextmanager
+
+from config import (RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_ON,
+                    RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN_PER_SECOND, RETRY_BUDGET_WINDOW,
+                    RETRY_ENDPOINT_OVERRIDES)
+from upstream_governor import endpoint_family
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+# 错误类型
+TIMEOUT = 'timeout'
+CONNECTION = 'connection'
+THROTTLED = 'throttled'  # HTTP 429/503
+SERVER_ERROR = 'server_error'  # 其他5xx
+API_ERROR = 'api_error'  # 接口返回success:false
+BAD_RESPONSE = 'bad_response'  # 非JSON或JSON解析失败
+CLIENT_ERROR = 'client_error'  # 其他4xx，重试不会成功
+QUEUE_TIMEOUT = 'queue_timeout'  # 本地并发名额排队超时，不是上游错误
+
+ERROR_CLASSES = (TIMEOUT, CONNECTION, THROTTLED, SERVER_ERROR, API_ERROR, BAD_RESPONSE, CLIENT_ERROR, QUEUE_TIMEOUT)
+
+# 当前调用链是否允许退避重试，随线程/协程上下文传递（共享工作线程池与asyncio门面会带上提交方的上下文）
+_backoff_enabled = contextvars.ContextVar('retry_backoff_enabled', default=True)
+
+
+def backoff_enabled():
+    return _backoff_enabled.get()
+
+
+@contextmanager
+def no_backoff():
+    """范围内的上游请求失败后不退避重试（调用方有可回退的旧值，不值得让请求线程等待）"""
+    token = _backoff_enabled.set(False)
+    try:
+        yield
+    finally:
+        _backoff_enabled.reset(token)
+
+
+def classify_status(status):
+    """非200的HTTP状态码对应的错误类型"""
+    if status in (429, 503):
+        return THROTTLED
+    if status == 504:
+        return TIMEOUT
+    if status >= 500:
+        return SERVER_ERROR
+    if status >= 400:
+        return CLIENT_ERROR
+    return BAD_RESPONSE
+
+
+def classify_exception(error):
+    """请求异常对应的错误类型"""
+    if isinstance(error, urllib.error.HTTPError):
+        return classify_status(error.code)
+    if isinstance(error, urllib.error.URLError):
+        error = error.reason
+    if isinstance(error, (socket.timeout, TimeoutError, asyncio.TimeoutError)):
+        return TIMEOUT
+    if isinstance(error, (OSError, EOFError)):
+        return CONNECTION
+    return BAD_RESPONSE
+
+
+class RetryPolicy:
+    """单个端点族的重试参数"""
+
+    __slots__ = ('max_attempts', 'base_delay', 'max_delay', 'retry_on')
+
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY,
+                 max_delay=RETRY_MAX_DELAY, retry_on=RETRY_ON):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = frozenset(retry_on)
+
+    def replace(self, **overrides):
+        """返回覆盖部分参数后的新策略"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(overrides)
+        return RetryPolicy(**values)
+
+    def next_delay(self, previous):
+        """去相关抖动退避，previous为上次的退避间隔（首次为0）"""
+        upper = max(self.base_delay, previous * 3)
+        return min(self.max_delay, random.uniform(self.base_delay, upper))
+
+    def to_dict(self):
+        return {
+            'max_attempts': self.max_attempts,
+            'base_delay': self.base_delay,
+            'max_delay': self.max_delay,
+            'retry_on': sorted(self.retry_on)
+        }
+
+
+class RetryBudget:
+    """进程级重试预算 - 令牌桶，首次请求按比例存入，重试取出；额度上限为window个请求积累的额度"""
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, min_per_second=RETRY_BUDGET_MIN_PER_SECOND,
+                 window=RETRY_BUDGET_WINDOW):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max(1.0, ratio * window)
+        self._tokens = self.max_tokens
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+        # 统计
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    def _refill(self):
+        """按时间补充保底额度（调用方持有锁）"""
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+    def record_request(self):
+        """记录一次首次请求"""
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self):
+        """取出一次重试额度，额度不足返回False"""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1 - 1e-9:  # 按比例累加的浮点误差，如0.1累加10次略小于1
+                self.exhausted += 1
+                return False
+            self._tokens -= 1
+            self.retries += 1
+            return True
+
+    def get_stats(self):
+        with self._lock:
+            self._refill()
+            return {
+                'tokens': round(self._tokens, 2),
+                'max_tokens': self.max_tokens,
+                'ratio': self.ratio,
+                'min_per_second': self.min_per_second,
+                'requests': self.requests,
+                'retries': self.retries,
+                'exhausted': self.exhausted,
+                'retry_ratio': round(self.retries / self.requests, 4) if self.requests else 0
+            }
+
+
+# 进程级共享预算 - 同步与asyncio客户端共用
+_shared_budget = None
+_shared_budget_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """fork出的子进程（如gunicorn worker）使用独立的预算"""
+    global _shared_budget, _shared_budget_lock
+    _shared_budget = None
+    _shared_budget_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_shared_retry_budget():
+    """获取进程级共享重试预算"""
+    global _shared_budget
+    with _shared_budget_lock:
+        if _shared_budget is None:
+            _shared_budget = RetryBudget()
+        return _shared_budget
+
+
+class RetryPolicyEngine:
+    """按端点族选择重试策略，重试前检查重试预算"""
+
+    def __init__(self, default=None, overrides=None, budget=None):
+        self.default = default or RetryPolicy()
+        overrides = RETRY_ENDPOINT_OVERRIDES if overrides is None else overrides
+        self.policies = {family: self.default.replace(**values) for family, values in overrides.items()}
+        self.budget = budget or get_shared_retry_budget()
+        self._lock = threading.Lock()
+
+        # 统计
+        self.retries = {name: 0 for name in ERROR_CLASSES}
+        self.gave_up = {name: 0 for name in ERROR_CLASSES}
+        self.deferred = 0  # 因有可回退的旧值而放弃的重试
+
+    def policy_for(self, url, max_attempts=None):
+        """url所属端点族的策略，max_attempts为调用方显式指定的尝试次数"""
+        policy = self.policies.get(endpoint_family(url), self.default)
+        return policy if max_attempts is None else policy.replace(max_attempts=max_attempts)
+
+    def begin(self):
+        """一次获取开始（首次请求计入预算）"""
+        self.budget.record_request()
+
+    def should_retry(self, policy, attempt, error_class):
+        """第attempt次尝试以error_class失败后是否重试，no_backoff()范围内不重试"""
+        retry = error_class in policy.retry_on and attempt < policy.max_attempts
+        deferred = retry and not backoff_enabled()
+        retry = retry and not deferred and self.budget.try_spend()
+        with self._lock:
+            (self.retries if retry else self.gave_up)[error_class] += 1
+            self.deferred += deferred
+        return retry
+
+    def get_stats(self):
+        with self._lock:
+            retries = {name: count for name, count in self.retries.items() if count}
+            gave_up = {name: count for name, count in self.gave_up.items() if count}
+            deferred = self.deferred
+        return {
+            'default': self.default.to_dict(),
+            'overrides': {family: policy.to_dict() for family, policy in sorted(self.policies.items())},
+            'retries': retries,
+            'gave_up': gave_up,
+            'deferred': deferred,
+            'budget': self.budget.get_stats()
+        }
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+时序降采样模块 - 由本地最细粒度时序派生更粗周期
+- 按周期对齐分桶（UTC纪元对齐），用reduceat等向量化操作聚合，不逐点循环
+- 聚合方式：sum(区间累加量，如主动买卖额) / last(状态量，如持仓量、费率) / first / max / min / ohlc
+- 缺失值(NaN)不参与聚合，整个桶都缺失时结果为NaN
+"""
+
+import numpy as np
+
+
+# 各类本地时序数值列的默认聚合方式（键与本地存储的时序key首项一致），按列指定时未列出的列取last
+SERIES_AGGREGATIONS = {
+    # 每根K线的主动买入/卖出额，粗周期为累加；同一载荷中的prices为时点值
+    'longshort': {'longRatios': 'sum', 'shortRatios': 'sum'},
+    'openinterest': 'last',  # 价格与持仓量为时点值，取桶内最后一个
+    'fundingrate': 'last',
+    'volume': 'last'         # 24H成交额本身是滚动值
+}
+
+
+def bucket_starts(tss, step_ms):
+    """返回 (各桶起始时间戳, 各桶在原序列中的起始下标)，tss须升序"""
+    tss = np.asarray(tss, dtype=np.int64)
+    if len(tss) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.intp)
+    buckets = tss // step_ms * step_ms
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    return buckets[starts], starts
+
+
+def _last_valid(values, valid, starts, ends):
+    positions = np.where(valid, np.arange(len(values)), -1)
+    candidates = np.maximum.accumulate(positions)[ends - 1]
+    found = candidates >= starts
+    return np.where(found, values[np.where(found, candidates, 0)], np.nan)
+
+
+def _first_valid(values, valid, starts, ends):
+    n = len(values)
+    positions = np.where(valid, np.arange(n), n)
+    candidates = np.minimum.accumulate(positions[::-1])[::-1][starts]
+    found = candidates < ends
+    return np.where(found, values[np.where(found, candidates, 0)], np.nan)
+
+
+def aggregate(values, starts, how):
+    """按桶聚合单列，how为ohlc时返回{open, high, low, close}"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(starts) == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return {name: empty for name in ('open', 'high', 'low', 'close')} if how == 'ohlc' else empty
+
+    ends = np.append(starts[1:], len(values))
+    valid = ~np.isnan(values)
+
+    if how == 'sum':
+        totals = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        return np.where(counts > 0, totals, np.nan)
+    if how == 'max':
+        return np.fmax.reduceat(values, starts)
+    if how == 'min':
+        return np.fmin.reduceat(values, starts)
+    if how == 'last':
+        return _last_valid(values, valid, starts, ends)
+    if how == 'first':
+        return _first_valid(values, valid, starts, ends)
+    if how == 'ohlc':
+        return {
+            'open': _first_valid(values, valid, starts, ends),
+            'high': np.fmax.reduceat(values, starts),
+            'low': np.fmin.reduceat(values, starts),
+            'close': _last_valid(values, valid, starts, ends)
+        }
+    raise ValueError(f"未知的聚合方式: {how}")
+
+
+def rollup(tss, columns, step_ms, how='last'):
+    """把时序聚合到step_ms周期，返回 (桶时间戳, {列名: 数组})
+
+    how可以是统一的聚合方式，也可以是{列名: 聚合方式}（未列出的列取last）；
+    ohlc列展开为 列名.open / 列名.high / 列名.low / 列名.close
+    """
+    bucket_tss, starts = bucket_starts(tss, step_ms)
+    result = {}
+    for name, values in columns.items():
+        method = how.get(name, 'last') if isinstance(how, dict) else how
+        aggregated = aggregate(values, starts, method)
+        if isinstance(aggregated, dict):
+            for part, part_values in aggregated.items():
+                result[f"{name}.{part}"] = part_values
+        else:
+            result[name] = aggregated
+    return bucket_tss, result
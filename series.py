@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+时序数据处理模块 - 基于NumPy列式数组的向量化转换
+coinank接口返回的tss/prices/dataValues等均为按列存放的数组，
+这里直接转为float64/int64数组计算，None统一转为NaN并通过掩码过滤
+"""
+
+import numpy as np
+
+
+def to_float_array(values, length=None):
+    """列表转float64数组，None及无法解析的值转为NaN"""
+    if values is None:
+        values = []
+    if length is not None:
+        values = values[:length]
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # 混入了字符串等异常值时逐个转换
+        result = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                result[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return result
+
+
+def stack_columns(data_values, length):
+    """将{交易所: [值...]}堆叠为 交易所数 × length 的矩阵，长度不足处补NaN"""
+    names = list(data_values.keys())
+    matrix = np.full((len(names), length), np.nan)
+    for row, name in enumerate(names):
+        column = to_float_array(data_values[name], length)
+        matrix[row, :len(column)] = column
+    return names, matrix
+
+
+def _valid_timestamps(timestamps):
+    """时间戳掩码 - 非空且非0"""
+    return ~np.isnan(timestamps) & (timestamps != 0)
+
+
+def price_series(timestamps, prices):
+    """价格序列 - 过滤价格或时间戳为空/0的点，返回(时间戳int64数组, 价格数组)"""
+    length = min(len(timestamps or []), len(prices or []))
+    tss = to_float_array(timestamps, length)
+    values = to_float_array(prices, length)
+    mask = _valid_timestamps(tss) & ~np.isnan(values) & (values != 0)
+    return tss[mask].astype(np.int64), values[mask]
+
+
+def total_series(timestamps, data_values):
+    """各交易所逐时间点求和 - 仅保留总和大于0的点，返回(时间戳数组, 总和数组)"""
+    tss = to_float_array(timestamps)
+    if not len(tss) or not data_values:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    _, matrix = stack_columns(data_values, len(tss))
+    totals = np.nan_to_num(matrix, copy=False).sum(axis=0)  # 原地把NaN置0，避免nansum的额外拷贝
+    mask = totals > 0
+    return tss[mask].astype(np.int64), totals[mask]
+
+
+def net_flow_series(timestamps, long_values, short_values):
+    """多空净流入序列 - 任一侧为空的点直接丢弃，返回(时间戳, 多头, 空头, 净流入)"""
+    length = min(len(timestamps or []), len(long_values or []), len(short_values or []))
+    tss = to_float_array(timestamps, length)
+    longs = to_float_array(long_values, length)
+    shorts = to_float_array(short_values, length)
+    mask = ~np.isnan(tss) & ~np.isnan(longs) & ~np.isnan(shorts)
+    longs, shorts = longs[mask], shorts[mask]
+    return tss[mask].astype(np.int64), longs, shorts, longs - shorts
+
+
+def positive_series(timestamps, values):
+    """过滤空值和非正值的序列，返回(时间戳数组, 值数组)"""
+    length = min(len(timestamps or []), len(values or []))
+    tss = to_float_array(timestamps, length)
+    data = to_float_array(values, length)
+    mask = ~np.isnan(tss) & (data > 0)  # NaN比较结果为False
+    return tss[mask].astype(np.int64), data[mask]
+
+
+def to_columns(**columns):
+    """NumPy数组转为{字段: [值...]}的并列数组（Python原生类型）"""
+    return {name: column.tolist() for name, column in columns.items()}
+
+
+def records_from_columns(columns):
+    """并列数组转为前端使用的[{字段: 值}, ...]列表，与列共享同一批数值对象"""
+    names = list(columns.keys())
+    lists = list(columns.values())
+    # 常见的2列/4列用字面量构造字典，比dict(zip(...))快约3倍
+    if len(names) == 2:
+        k0, k1 = names
+        return [{k0: a, k1: b} for a, b in zip(*lists)]
+    if len(names) == 4:
+        k0, k1, k2, k3 = names
+        return [{k0: a, k1: b, k2: c, k3: d} for a, b, c, d in zip(*lists)]
+    return [dict(zip(names, row)) for row in zip(*lists)]
+
+
+def to_records(**columns):
+    """列式数组转为前端使用的[{字段: 值}, ...]列表（Python原生类型）"""
+    return records_from_columns(to_columns(**columns))
+
+
+def delta_encode(values):
+    """差分编码整数列：首项为原值，其余为与前一项的差（解码即累加）"""
+    if not values:
+        return []
+    array = np.asarray(values, dtype=np.int64)
+    deltas = np.empty_like(array)
+    deltas[0] = array[0]
+    np.subtract(array[1:], array[:-1], out=deltas[1:])
+    return deltas.tolist()
+
+
+def lttb_indices(x, ys, threshold):
+    """最大三角形三桶(LTTB)降采样，返回保留点的下标数组（升序，含首尾点）
+
+    ys可以是一维数组或 列数 × 点数 的矩阵；多列时各列先按取值范围归一化，
+    每个桶保留任一列三角形面积最大的点，保证所有列按同一组下标取样、行仍然对齐。
+    NaN按该列最小值参与计算；threshold小于3或不少于点数时不降采样
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if threshold < 3 or threshold >= n:
+        return np.arange(n)
+
+    ys = np.atleast_2d(np.asarray(ys, dtype=np.float64))
+    with np.errstate(invalid='ignore'):
+        lows = np.nanmin(np.where(np.isnan(ys), np.inf, ys), axis=1, keepdims=True)
+        highs = np.nanmax(np.where(np.isnan(ys), -np.inf, ys), axis=1, keepdims=True)
+    spans = highs - lows
+    spans[~np.isfinite(spans) | (spans == 0)] = 1.0
+    lows[~np.isfinite(lows)] = 0.0
+    ys = np.nan_to_num((ys - lows) / spans, nan=0.0)
+    x = x - x[0]
+
+    # 首尾点之外分为threshold-2个桶，各桶均值作为前一个桶的第三个顶点
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    counts = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts, x[-1])
+    avg_y = np.column_stack((np.add.reduceat(ys[:, 1:n - 1], edges[:-1] - 1, axis=1) / counts, ys[:, -1]))
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], ys[:, a:a + 1]
+        cx, cy = avg_x[i + 1], avg_y[:, i + 1:i + 2]
+        areas = np.abs((ax - cx) * (ys[:, lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        a = lo + int(np.argmax(areas.max(axis=0)))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_chart(data, max_points):
+    """对上游图表数据（tss并列数组或chartData行数组）做LTTB降采样，返回新的data字典
+
+    所有数值列（含{交易所: 数组}嵌套）共同决定保留的点；结构不支持或点数不超过max_points时原样返回
+    """
+    if not isinstance(data, dict):
+        return data
+
+    if isinstance(data.get('tss'), list):
+        tss = data['tss']
+        if len(tss) <= max_points:
+            return data
+        columns = []
+        for value in data.values():
+            if value is tss:
+                continue
+            if isinstance(value, list) and len(value) == len(tss):
+                columns.append(value)
+            elif isinstance(value, dict):
+                columns.extend(v for v in value.values() if isinstance(v, list) and len(v) == len(tss))
+        ys = np.vstack([to_float_array(column) for column in columns]) if columns else np.zeros((1, len(tss)))
+        keep = lttb_indices(to_float_array(tss), ys, max_points).tolist()
+
+        def pick(values):
+            return [values[i] for i in keep]
+
+        result = {}
+        for key, value in data.items():
+            if isinstance(value, list) and len(value) == len(tss):
+                result[key] = pick(value)
+            elif isinstance(value, dict):
+                result[key] = {name: pick(v) if isinstance(v, list) and len(v) == len(tss) else v
+                               for name, v in value.items()}
+            else:
+                result[key] = value
+        return result
+
+    rows = data.get('chartData')
+    if isinstance(rows, list) and len(rows) > max_points and all(isinstance(row, list) and row for row in rows):
+        width = max(len(row) for row in rows)
+        matrix = np.full((len(rows), width), np.nan)
+        for i, row in enumerate(rows):
+            matrix[i, :len(row)] = to_float_array(row)
+        keep = lttb_indices(matrix[:, 0], matrix[:, 1:].T if width > 1 else np.zeros((1, len(rows))), max_points)
+        return dict(data, chartData=[rows[i] for i in keep.tolist()])
+
+    return data
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+时序增量合并模块 - 按 (接口, 代币, 交易所, 周期) 保存最近一次完整窗口
+- 刷新时只请求最后几根K线（如longshort的limit），按时间戳合并并去重，再裁剪回原窗口长度
+- 支持两种响应结构：tss并列数组（含{交易所: 数组}嵌套）与chartData行数组（首列为时间戳）
+- 无法安全合并（结构变化、增量与已有数据不衔接）时返回None，由调用方回退为全量请求
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from config import (SERIES_STORE_MAX_SERIES, SERIES_TAIL_OVERLAP,
+                    SERIES_FULL_REFRESH_EVERY, SERIES_TAIL_PARAMS)
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+INTERVAL_UNITS = {'m': 60000, 'h': 3600000, 'd': 86400000, 'w': 604800000}
+
+
+def interval_ms(interval):
+    """K线周期转毫秒，如 '5m' -> 300000，无法识别返回None"""
+    try:
+        return int(interval[:-1]) * INTERVAL_UNITS[interval[-1].lower()]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def _timestamps(data):
+    """返回数据的时间戳序列，不支持的结构返回None"""
+    if isinstance(data.get('tss'), list):
+        return data['tss']
+    rows = data.get('chartData')
+    if isinstance(rows, list) and all(isinstance(row, list) and row for row in rows[:1]):
+        return [row[0] for row in rows]
+    return None
+
+
+def _splice(old, new, cut, old_len, new_len, window):
+    """old保留cut之前的点，拼接new，裁剪为窗口长度；缺失的一侧以None补齐"""
+    old = old if isinstance(old, list) and len(old) == old_len else [None] * old_len
+    new = new if isinstance(new, list) and len(new) == new_len else [None] * new_len
+    merged = old[:cut] + new
+    return merged[-window:] if window else merged
+
+
+def merge_series(old, new, window=None):
+    """把增量数据new按时间戳合并进old，返回新的data字典；无法合并返回None
+
+    old中时间戳不早于new首个时间戳的点全部由new替换（new覆盖到最新一根K线），
+    因此重复时间戳自然去重，最后一根未收盘K线也会被更新
+    """
+    old_ts, new_ts = _timestamps(old), _timestamps(new)
+    if old_ts is None or new_ts is None:
+        return None
+    if not new_ts:
+        return old
+    # 增量必须与已有数据衔接，否则中间可能缺数据
+    if old_ts and new_ts[0] > old_ts[-1]:
+        return None
+
+    cut = bisect_left(old_ts, new_ts[0])
+
+    if 'tss' in new:
+        merged = dict(new)
+        for key, value in new.items():
+            if key == 'tss' or (isinstance(value, list) and len(value) == len(new_ts)):
+                merged[key] = _splice(old.get(key), value, cut, len(old_ts), len(new_ts), window)
+            elif isinstance(value, dict) and isinstance(old.get(key), dict):
+                nested = old[key]
+                names = list(nested) + [name for name in value if name not in nested]
+                merged[key] = {name: _splice(nested.get(name), value.get(name), cut,
+                                             len(old_ts), len(new_ts), window)
+                               for name in names}
+        return merged
+
+    # chartData行结构：列位置由exchanges决定，列变化时不合并
+    if old.get('exchanges') != new.get('exchanges'):
+        return None
+    rows = old['chartData'][:cut] + new['chartData']
+    return dict(new, chartData=rows[-window:] if window else rows)
+
+
+class SeriesState:
+    """单条时序的最近窗口"""
+
+    __slots__ = ('response', 'window', 'merges_since_full', 'updated')
+
+    def __init__(self, response, window):
+        self.response = response
+        self.window = window
+        self.merges_since_full = 0
+        self.updated = time.time()
+
+
+class SeriesStore:
+    """时序增量合并存储 - 线程安全，按LRU限制条数"""
+
+    def __init__(self, max_series=SERIES_STORE_MAX_SERIES, overlap=SERIES_TAIL_OVERLAP,
+                 full_refresh_every=SERIES_FULL_REFRESH_EVERY, tail_params=None):
+        self.max_series = max_series
+        self.overlap = overlap
+        self.full_refresh_every = full_refresh_every
+        self.tail_params = SERIES_TAIL_PARAMS if tail_params is None else tail_params
+
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 统计
+        self.full_fetches = 0
+        self.tail_fetches = 0
+        self.merge_failures = 0
+        self.points_fetched = 0
+        self.points_saved = 0
+
+    def plan_tail(self, key, interval):
+        """返回增量请求需要覆盖的参数，不适合增量时返回None（应全量请求）
+
+        key[0]为接口名，对应SERIES_TAIL_PARAMS中的增量参数配置
+        """
+        spec = self.tail_params.get(key[0])
+        step = interval_ms(interval)
+        if spec is None or step is None:
+            return None
+
+        with self._lock:
+            state = self._series.get(key)
+            if state is None or state.merges_since_full >= self.full_refresh_every:
+                return None
+            timestamps = _timestamps(state.response.get('data') or {})
+            if not timestamps:
+                return None
+            last_ts = timestamps[-1]
+            window = state.window or len(timestamps)
+
+        style, param = spec
+        if style == 'since':
+            # 从最后一根K线（可能未收盘）开始
+            return {param: last_ts}
+
+        # 按点数：覆盖上次之后新增的K线，另加重叠点更新未收盘K线
+        missing = max(0, int((time.time() * 1000 - last_ts) // step))
+        points = missing + self.overlap
+        if points * 2 > window:
+            # 增量接近整个窗口时直接全量
+            return None
+        return {param: points}
+
+    def latest(self, key):
+        """已合并的最新完整响应，没有返回None"""
+        with self._lock:
+            state = self._series.get(key)
+            return state.response if state is not None else None
+
+    def needs_seed(self, key):
+        """支持增量的接口尚无基准窗口（如进程刚启动）"""
+        with self._lock:
+            return self.tail_params.get(key[0]) is not None and key not in self._series
+
+    def seed(self, key, response, window=None):
+        """用本地保存的数据作为基准窗口（不计入上游请求统计）"""
+        if not response or not isinstance(response.get('data'), dict):
+            return
+        timestamps = _timestamps(response['data'])
+        if not timestamps:
+            return
+        with self._lock:
+            if key not in self._series:
+                self._series[key] = SeriesState(response, window or len(timestamps))
+                while len(self._series) > self.max_series:
+                    self._series.popitem(last=False)
+
+    def merge(self, key, response):
+        """合并增量响应，返回合并后的完整响应；无法合并返回None"""
+        if not response or not response.get('success') or not isinstance(response.get('data'), dict):
+            return None
+
+        with self._lock:
+            state = self._series.get(key)
+            if state is None:
+                return None
+            merged_data = merge_series(state.response['data'], response['data'], state.window)
+            if merged_data is None:
+                self.merge_failures += 1
+                return None
+
+            fetched = len(_timestamps(response['data']) or ())
+            merged = dict(response, data=merged_data)
+            state.response = merged
+            state.merges_since_full += 1
+            state.updated = time.time()
+            self._series.move_to_end(key)
+
+            self.tail_fetches += 1
+            self.points_fetched += fetched
+            self.points_saved += max(0, len(_timestamps(merged_data) or ()) - fetched)
+        return merged
+
+    def store(self, key, response, window=None):
+        """保存全量响应作为后续增量合并的基准，原样返回response"""
+        if not response or not response.get('success') or not isinstance(response.get('data'), dict):
+            return response
+        timestamps = _timestamps(response['data'])
+        if timestamps is None:
+            return response
+
+        with self._lock:
+            self._series[key] = SeriesState(response, window or len(timestamps))
+            self._series.move_to_end(key)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+            self.full_fetches += 1
+            self.points_fetched += len(timestamps)
+        return response
+
+    def get_stats(self):
+        """获取增量合并统计"""
+        with self._lock:
+            total = self.points_fetched + self.points_saved
+            return {
+                'series': len(self._series),
+                'full_fetches': self.full_fetches,
+                'tail_fetches': self.tail_fetches,
+                'merge_failures': self.merge_failures,
+                'points_fetched': self.points_fetched,
+                'points_saved': self.points_saved,
+                'saved_ratio': round(self.points_saved / total, 4) if total else 0,
+                'tail_endpoints': [name for name, spec in self.tail_params.items() if spec]
+            }
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+跨进程共享缓存模块 - Redis协议(RESP)后端
+- 多worker部署时作为TTLCache的第二级：本进程未命中或需要刷新时先读共享缓存，
+  其他worker已经加载过的数据直接采用，不再请求上游
+- 刷新锁：SET NX PX，同一key同一时间只有一个worker请求上游，其余worker等待其写入结果
+- 共享缓存不可用时自动降级为各进程独立缓存，每隔一段时间重试连接
+- 未部署Redis时可运行本模块自带的替身服务（gunicorn主进程自动启动，或手动运行）:
+    python shared_cache.py --unix data/cache.sock
+    python shared_cache.py --port 6399
+"""
+
+import argparse
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlsplit, unquote
+
+import json_codec
+from config import (SHARED_CACHE_PREFIX, SHARED_CACHE_TIMEOUT, SHARED_CACHE_POOL_SIZE,
+                    SHARED_CACHE_LOCK_TTL, SHARED_CACHE_LOCK_WAIT, SHARED_CACHE_RETRY,
+                    SHARED_CACHE_STANDIN_MAX_BYTES)
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class RespError(Exception):
+    """服务端返回的错误回复"""
+
+
+def encode_command(*args):
+    """编码为RESP数组"""
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode('utf-8')
+        elif isinstance(arg, int):
+            arg = str(arg).encode('ascii')
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(reader):
+    """从缓冲读取器读取一条RESP回复，错误回复返回RespError实例（由调用方决定是否抛出）"""
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError("共享缓存连接已关闭")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload.decode('utf-8')
+    if kind == b'-':
+        return RespError(payload.decode('utf-8', 'replace'))
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("共享缓存连接已关闭")
+        return data[:-2]
+    if kind == b'*':
+        count = int(payload)
+        if count < 0:
+            return None
+        return [read_reply(reader) for _ in range(count)]
+    raise ConnectionError(f"无法解析的RESP回复: {line[:20]!r}")
+
+
+class RespConnection:
+    """单个RESP连接"""
+
+    def __init__(self, address, timeout):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        self.reader = self.sock.makefile('rb')
+
+    def execute(self, *args):
+        self.sock.sendall(encode_command(*args))
+        reply = read_reply(self.reader)
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RespClient:
+    """线程安全的RESP客户端 - 空闲连接池，出错的连接直接丢弃
+
+    url: redis://[:密码@]主机:端口[/库号] 或 unix:///套接字路径
+    """
+
+    def __init__(self, url, timeout=SHARED_CACHE_TIMEOUT, pool_size=SHARED_CACHE_POOL_SIZE):
+        parts = urlsplit(url)
+        if parts.scheme == 'unix':
+            self.address = parts.path
+        elif parts.scheme in ('redis', 'tcp'):
+            self.address = (parts.hostname or '127.0.0.1', parts.port or 6379)
+        else:
+            raise ValueError(f"不支持的共享缓存地址: {url}")
+        self.password = unquote(parts.password) if parts.password else None
+        db = parts.path.strip('/') if parts.scheme != 'unix' else ''
+        self.db = int(db) if db else 0
+        self.timeout = timeout
+        self.pool_size = pool_size
+
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = RespConnection(self.address, self.timeout)
+        try:
+            if self.password:
+                conn.execute('AUTH', self.password)
+            if self.db:
+                conn.execute('SELECT', self.db)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def execute(self, *args):
+        """执行一条命令，返回回复；连接错误抛出OSError/ConnectionError，错误回复抛出RespError"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            reply = conn.execute(*args)
+        except RespError:
+            self._release(conn)
+            raise
+        except BaseException:
+            conn.close()
+            raise
+        self._release(conn)
+        return reply
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class SharedEntry:
+    """共享缓存中读到的一个值"""
+
+    __slots__ = ('value', 'stored_at')
+
+    def __init__(self, value, stored_at):
+        self.value = value
+        self.stored_at = stored_at
+
+    def age(self, now=None):
+        return (now or time.time()) - self.stored_at
+
+
+class SharedCache:
+    """TTLCache的共享后端 - 值以JSON保存，附带写入时间，过期交给服务端PX处理"""
+
+    def __init__(self, client, prefix=SHARED_CACHE_PREFIX, lock_ttl=SHARED_CACHE_LOCK_TTL,
+                 lock_wait=SHARED_CACHE_LOCK_WAIT, retry_interval=SHARED_CACHE_RETRY):
+        self.client = client
+        self.prefix = prefix
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.retry_interval = retry_interval
+
+        self._down_until = 0.0
+        self._stats_lock = threading.Lock()
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.locks_acquired = 0
+        self.lock_waits = 0
+        self.lock_wait_hits = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        return cls(RespClient(url), **kwargs)
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    @property
+    def available(self):
+        return time.time() >= self._down_until
+
+    def _execute(self, *args):
+        """执行命令，共享缓存不可用时返回None并暂停使用一段时间"""
+        if not self.available:
+            return None
+        try:
+            return self.client.execute(*args)
+        except (OSError, ConnectionError, RespError) as e:
+            self._count('errors')
+            self._down_until = time.time() + self.retry_interval
+            logger.warning("⚠️ 共享缓存不可用，%s秒内使用进程内缓存: %s", self.retry_interval, e)
+            return None
+
+    def _key(self, namespace, key):
+        return f"{self.prefix}{namespace}:{key}"
+
+    def get(self, namespace, key):
+        """读取共享值，未命中或不可用返回None"""
+        raw = self._execute('GET', self._key(namespace, key))
+        if raw is None:
+            self._count('misses')
+            return None
+        try:
+            envelope = json_codec.loads(raw)
+            entry = SharedEntry(envelope['value'], envelope['stored_at'])
+        except (ValueError, KeyError, TypeError):
+            self._count('misses')
+            return None
+        self._count('hits')
+        return entry
+
+    def set(self, namespace, key, value, stored_at, retain):
+        """写入共享值，retain为服务端保留时长（秒，应覆盖TTL与降级期限）"""
+        try:
+            payload = json_codec.dumps({'stored_at': stored_at, 'value': value})
+        except (TypeError, ValueError) as e:
+            logger.debug("共享缓存跳过无法序列化的值 %s/%s: %s", namespace, key, e)
+            return
+        if self._execute('SET', self._key(namespace, key), payload, 'PX', max(1, int(retain * 1000))) is not None:
+            self._count('writes')
+
+    def acquire_lock(self, namespace, key):
+        """获取刷新锁，返回锁令牌；已被其他进程持有返回None；共享缓存不可用时返回空令牌（照常加载）"""
+        token = uuid.uuid4().hex
+        reply = self._execute('SET', self._key('lock:' + namespace, key), token,
+                              'NX', 'PX', int(self.lock_ttl * 1000))
+        if reply is None:
+            return '' if not self.available else None
+        self._count('locks_acquired')
+        return token
+
+    def release_lock(self, namespace, key, token):
+        """释放自己持有的刷新锁（先比较令牌再删除，极小概率误删时由锁的PX兜底）"""
+        if not token:
+            return
+        lock_key = self._key('lock:' + namespace, key)
+        if self._execute('GET', lock_key) == token.encode('ascii'):
+            self._execute('DEL', lock_key)
+
+    def wait_for(self, namespace, key, newer_than):
+        """等待持锁的进程写入比newer_than更新的值，超时返回None"""
+        self._count('lock_waits')
+        deadline = time.time() + self.lock_wait
+        delay = 0.02
+        while time.time() < deadline and self.available:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+            entry = self.get(namespace, key)
+            if entry is not None and entry.stored_at > newer_than:
+                self._count('lock_wait_hits')
+                return entry
+            if self._execute('EXISTS', self._key('lock:' + namespace, key)) == 0:
+                # 持锁进程已结束但没有写入（上游失败）
+                break
+        return None
+
+    def close(self):
+        self.client.close()
+
+    def get_stats(self):
+        """获取共享缓存统计"""
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'available': self.available,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+                'writes': self.writes,
+                'locks_acquired': self.locks_acquired,
+                'lock_waits': self.lock_waits,
+                'lock_wait_hits': self.lock_wait_hits,
+                'errors': self.errors
+            }
+
+
+class StandInStore:
+    """替身服务的数据 - 带过期时间的LRU字典，按字节上限淘汰"""
+
+    def __init__(self, max_bytes=SHARED_CACHE_STANDIN_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._data = OrderedDict()  # key -> (value, 过期时间或None)
+        self._lock = threading.Lock()
+
+    def _get_live(self, key, now):
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= now:
+            self._delete(key)
+            return None
+        return item
+
+    def _delete(self, key):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.total_bytes -= len(key) + len(item[0])
+        return item is not None
+
+    def get(self, key):
+        with self._lock:
+            item = self._get_live(key, time.time())
+            if item is None:
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key, value, expires_at=None, nx=False):
+        with self._lock:
+            if nx and self._get_live(key, time.time()) is not None:
+                return False
+            self._delete(key)
+            self._data[key] = (value, expires_at)
+            self.total_bytes += len(key) + len(value)
+            while self.total_bytes > self.max_bytes and len(self._data) > 1:
+                oldest = next(iter(self._data))
+                self._delete(oldest)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._delete(key) for key in keys)
+
+    def exists(self, *keys):
+        with self._lock:
+            now = time.time()
+            return sum(self._get_live(key, now) is not None for key in keys)
+
+    def size(self):
+        with self._lock:
+            return len(self._data)
+
+    def flush(self):
+        with self._lock:
+            self._data.clear()
+            self.total_bytes = 0
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    """替身服务连接处理 - 支持缓存后端用到的命令子集"""
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError, ValueError):
+                return
+            if not isinstance(command, list) or not command:
+                return
+            try:
+                reply = self.dispatch(store, [bytes(arg) for arg in command])
+            except (ValueError, IndexError) as e:
+                reply = RespError(f"ERR {e}")
+            try:
+                self.wfile.write(self.encode(reply))
+            except OSError:
+                return
+
+    @staticmethod
+    def dispatch(store, args):
+        name = args[0].upper()
+        if name == b'PING':
+            return 'PONG'
+        if name in (b'AUTH', b'SELECT'):
+            return 'OK'
+        if name == b'GET':
+            return store.get(args[1])
+        if name == b'SET':
+            expires_at, nx, options = None, False, [arg.upper() for arg in args[3:]]
+            i = 0
+            while i < len(options):
+                option = options[i]
+                if option == b'NX':
+                    nx = True
+                elif option in (b'EX', b'PX'):
+                    amount = int(args[3 + i + 1])
+                    expires_at = time.time() + (amount if option == b'EX' else amount / 1000)
+                    i += 1
+                else:
+                    raise ValueError(f"不支持的SET参数 {option!r}")
+                i += 1
+            return 'OK' if store.set(args[1], args[2], expires_at, nx) else None
+        if name == b'DEL':
+            return store.delete(*args[1:])
+        if name == b'EXISTS':
+            return store.exists(*args[1:])
+        if name == b'DBSIZE':
+            return store.size()
+        if name == b'FLUSHDB':
+            store.flush()
+            return 'OK'
+        return RespError(f"ERR unknown command '{args[0].decode('utf-8', 'replace')}'")
+
+    @staticmethod
+    def encode(reply):
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, RespError):
+            return b'-' + str(reply).encode('utf-8') + b'\r\n'
+        if isinstance(reply, str):
+            return b'+' + reply.encode('utf-8') + b'\r\n'
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def create_standin_server(unix_path=None, host='127.0.0.1', port=0, max_bytes=SHARED_CACHE_STANDIN_MAX_BYTES):
+    """创建替身服务（未启动），unix_path优先"""
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        directory = os.path.dirname(unix_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        server = _ThreadingUnixServer(unix_path, StandInHandler)
+    else:
+        server = _ThreadingTCPServer((host, port), StandInHandler)
+    server.store = StandInStore(max_bytes)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='共享缓存替身服务（Redis协议子集）')
+    parser.add_argument('--unix', help='Unix套接字路径')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6399)
+    args = parser.parse_args()
+
+    server = create_standin_server(args.unix, args.host, args.port)
+    # gunicorn主进程退出时以SIGTERM结束替身服务，转为正常退出以清理套接字文件
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.info("🗄️ 共享缓存替身服务已启动: %s", args.unix or f"{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+请求合并模块 (single-flight)
+相同key的并发调用只执行一次，其余调用等待同一个Future的结果
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+# 统计信息最多保留的key数量（代币符号由用户输入，需防止无限增长）
+MAX_TRACKED_KEYS = 1000
+
+
+class SingleFlight:
+    """单飞请求合并器"""
+
+    def __init__(self, max_tracked_keys=MAX_TRACKED_KEYS):
+        self.max_tracked_keys = max_tracked_keys
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> Future
+        self._stats = OrderedDict()  # key -> {'calls', 'executions', 'saved'}
+        self.total_calls = 0
+        self.total_saved = 0
+
+    def _key_stats(self, key):
+        """获取(或创建)key的统计项，超出上限时淘汰最久未用的key"""
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = {'calls': 0, 'executions': 0, 'saved': 0}
+            self._stats[key] = stats
+            if len(self._stats) > self.max_tracked_keys:
+                self._stats.popitem(last=False)
+        else:
+            self._stats.move_to_end(key)
+        return stats
+
+    def do(self, key, fn):
+        """执行fn，若相同key已有调用在进行中则等待其结果"""
+        with self._lock:
+            stats = self._key_stats(key)
+            stats['calls'] += 1
+            self.total_calls += 1
+
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                stats['executions'] += 1
+            else:
+                stats['saved'] += 1
+                self.total_saved += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def get_stats(self, top=20):
+        """获取合并统计 - 按节省调用数排序的前N个key"""
+        with self._lock:
+            items = [(key, dict(stats)) for key, stats in self._stats.items()]
+            in_flight = len(self._in_flight)
+
+        items.sort(key=lambda item: item[1]['saved'], reverse=True)
+        return {
+            'total_calls': self.total_calls,
+            'total_saved': self.total_saved,
+            'saved_rate': round(self.total_saved / self.total_calls, 4) if self.total_calls else 0,
+            'in_flight': in_flight,
+            'tracked_keys': len(items),
+            'top_keys': [dict(key=key, **stats) for key, stats in items[:top]]
+        }
@@ -0,0 +1,28 @@
+"""async_api: 同步门面的超时处理"""
+
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from async_api import SyncCoinankAPI
+
+
+def test_call_timeout_cancels_coroutine():
+    api = SyncCoinankAPI(call_timeout=0.1)
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    try:
+        with pytest.raises(concurrent.futures.TimeoutError):
+            api._call(slow())
+        assert cancelled.wait(1)
+    finally:
+        api.close()
@@ -0,0 +1,132 @@
+"""cache: TTLCache的条目数/字节数上限、stale-while-revalidate与大小估算"""
+
+import json
+import threading
+import time
+
+from cache import TTLCache, estimate_size
+from retry_policy import backoff_enabled
+
+
+def make_cache(**kwargs):
+    kwargs.setdefault('namespace_ttls', {})
+    return TTLCache(**kwargs)
+
+
+def test_entry_limit_evicts_least_recently_used():
+    cache = make_cache(max_entries=3, max_bytes=0)
+    for key in 'abc':
+        cache.set('ns', key, key)
+    cache.get('ns', 'a')  # a变为最近使用
+    cache.set('ns', 'd', 'd')
+
+    assert len(cache) == 3
+    assert cache.get('ns', 'b') is None
+    assert [cache.get('ns', key) for key in 'acd'] == ['a', 'c', 'd']
+    assert cache.get_stats()['evictions'] == 1
+    cache.shutdown()
+
+
+def test_byte_limit_evicts_until_under_budget():
+    cache = make_cache(max_entries=100, max_bytes=250)
+    for key in range(5):
+        cache.set('ns', key, 'x' * 98)  # 每条约100字节
+
+    assert len(cache) == 2
+    assert cache.total_bytes <= 250
+    assert cache.get('ns', 0) is None
+    assert cache.get('ns', 4) == 'x' * 98
+    cache.shutdown()
+
+
+def test_replacing_entry_does_not_double_count_bytes():
+    cache = make_cache(max_bytes=10000)
+    cache.set('ns', 'k', 'x' * 100)
+    cache.set('ns', 'k', 'x' * 10)
+    assert cache.total_bytes == estimate_size('x' * 10)
+    cache.shutdown()
+
+
+def test_estimate_size_tracks_json_length():
+    value = {
+        'success': True,
+        'data': {
+            'tss': [1700000000000 + i * 300000 for i in range(500)],
+            'prices': [27000.5 + i * 0.25 for i in range(500)],
+            'dataValues': {name: [1234567.891 + i for i in range(500)] for name in ('Binance', 'Okex')}
+        }
+    }
+    actual = len(json.dumps(value, separators=(',', ':')))
+    assert 0.8 * actual <= estimate_size(value) <= 1.2 * actual
+
+
+def test_estimate_size_of_empty_and_scalar_values():
+    assert estimate_size([]) == 2
+    assert estimate_size({}) == 2
+    assert estimate_size('abc') == 5
+    assert estimate_size(None) > 0
+
+
+def swr_cache():
+    """TTL 10秒、宽限期5秒、上游失败时旧值最多保留60秒"""
+    return make_cache(namespace_ttls={'ns': 10}, stale_grace_ratio=0.5, stale_if_error=60)
+
+
+def test_fresh_entry_is_returned_without_loading():
+    cache = swr_cache()
+    cache.set('ns', 'k', 'old')
+    assert cache.get_or_load('ns', 'k', lambda: 'new') == 'old'
+    cache.shutdown()
+
+
+def test_stale_entry_in_grace_is_served_and_refreshed_in_background():
+    cache = swr_cache()
+    cache.set('ns', 'k', 'old', stored_at=time.time() - 12)
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return 'new'
+
+    assert cache.get_or_load('ns', 'k', loader) == 'old'
+    assert refreshed.wait(1)
+    deadline = time.time() + 1
+    while cache.get('ns', 'k') != 'new' and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get('ns', 'k') == 'new'
+    assert cache.get_stats()['stale_hits'] == 1
+    cache.shutdown()
+
+
+def test_expired_entry_loads_synchronously_and_falls_back_on_failure():
+    cache = swr_cache()
+    cache.set('ns', 'k', 'old', stored_at=time.time() - 30)
+    assert cache.get_or_load('ns', 'k', lambda: 'new') == 'new'
+
+    cache.set('ns', 'k', 'old', stored_at=time.time() - 30)
+    assert cache.get_or_load('ns', 'k', lambda: None) == 'old'
+    assert cache.get_stats()['stale_fallbacks'] == 1
+    cache.shutdown()
+
+
+def test_entry_past_stale_if_error_is_dropped():
+    cache = swr_cache()
+    cache.set('ns', 'k', 'old', stored_at=time.time() - 100)
+    assert cache.get_or_load('ns', 'k', lambda: None) is None
+    assert len(cache) == 0
+    cache.shutdown()
+
+
+def test_sync_load_skips_retry_backoff_only_when_fallback_exists():
+    cache = swr_cache()
+    seen = []
+
+    def loader():
+        seen.append(backoff_enabled())
+        return None
+
+    cache.get_or_load('ns', 'cold', loader)
+    cache.set('ns', 'k', 'old', stored_at=time.time() - 30)
+    assert cache.get_or_load('ns', 'k', loader) == 'old'
+    assert seen == [True, False]
+    cache.shutdown()
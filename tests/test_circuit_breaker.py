@@ -0,0 +1,137 @@
+"""circuit_breaker: 熔断状态转换与最近成功响应"""
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, CLOSED, OPEN, HALF_OPEN
+from retry_policy import TIMEOUT, THROTTLED, API_ERROR, BAD_RESPONSE, CLIENT_ERROR, QUEUE_TIMEOUT
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('circuit_breaker.time.monotonic', lambda: now[0])
+    return now
+
+
+def make_breaker(**kwargs):
+    kwargs.setdefault('failure_threshold', 3)
+    kwargs.setdefault('open_seconds', 30)
+    kwargs.setdefault('half_open_probes', 1)
+    kwargs.setdefault('failure_classes', (TIMEOUT, THROTTLED))
+    return CircuitBreaker('/api/test', **kwargs)
+
+
+def fail(breaker, times, error_class=TIMEOUT):
+    for _ in range(times):
+        breaker.record(error_class, breaker.allow())
+
+
+def open_then_half_open(breaker, clock):
+    fail(breaker, breaker.failure_threshold)
+    clock[0] += breaker.open_seconds
+    probe = breaker.allow()
+    assert breaker.state == HALF_OPEN
+    return probe
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = make_breaker()
+    fail(breaker, 2)
+    breaker.record(None, breaker.allow())  # 成功清零
+    fail(breaker, 2)
+    assert breaker.state == CLOSED
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+    assert breaker.allow() is None
+    assert breaker.get_stats()['rejected'] == 1
+
+
+def test_half_open_admits_limited_probes(clock):
+    breaker = make_breaker(half_open_probes=2)
+    assert open_then_half_open(breaker, clock)
+    assert breaker.allow()
+    assert breaker.allow() is None
+
+
+def test_probe_success_closes(clock):
+    breaker = make_breaker()
+    breaker.record(None, open_then_half_open(breaker, clock))
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+def test_probe_api_error_closes(clock):
+    # success:false说明端点可达
+    breaker = make_breaker()
+    breaker.record(API_ERROR, open_then_half_open(breaker, clock))
+    assert breaker.state == CLOSED
+
+
+def test_probe_failure_reopens(clock):
+    breaker = make_breaker()
+    breaker.record(THROTTLED, open_then_half_open(breaker, clock))
+    assert breaker.state == OPEN
+    assert breaker.get_stats()['times_opened'] == 2
+
+
+@pytest.mark.parametrize('error_class', [BAD_RESPONSE, CLIENT_ERROR, QUEUE_TIMEOUT])
+def test_inconclusive_probe_only_releases_slot(clock, error_class):
+    breaker = make_breaker()
+    breaker.record(error_class, open_then_half_open(breaker, clock))
+    assert breaker.state == HALF_OPEN
+    # 名额已归还，可以再探测一次
+    breaker.record(None, breaker.allow())
+    assert breaker.state == CLOSED
+
+
+def test_bad_response_does_not_reset_failures(clock):
+    breaker = make_breaker()
+    fail(breaker, 2)
+    breaker.record(BAD_RESPONSE, breaker.allow())
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+
+
+def test_late_record_from_closed_state_is_ignored(clock):
+    breaker = make_breaker()
+    late = breaker.allow()  # 熔断前放行、熔断后才返回的请求
+    probe = open_then_half_open(breaker, clock)
+
+    breaker.record(None, late)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None  # 探测名额仍被占用
+
+    breaker.record(TIMEOUT, late)
+    assert breaker.state == HALF_OPEN
+    breaker.record(None, probe)
+    assert breaker.state == CLOSED
+
+
+def test_late_failures_after_open_do_not_extend_it(clock):
+    breaker = make_breaker()
+    tickets = [breaker.allow() for _ in range(5)]
+    for ticket in tickets:
+        breaker.record(TIMEOUT, ticket)
+    assert breaker.get_stats()['times_opened'] == 1
+    clock[0] += breaker.open_seconds
+    assert breaker.allow()
+
+
+def test_registry_fallback_and_disabled(clock):
+    registry = CircuitBreakerRegistry(enabled=True, overrides={'/api/x': {'failure_threshold': 1}},
+                                      max_fallbacks=2)
+    url = 'https://api.coinank.com/api/x?baseCoin=BTC'
+    registry.record(url, TIMEOUT, registry.allow(url))
+    assert registry.is_open(url)
+    assert registry.allow(url) is None
+    assert registry.get_stats()['open'] == ['/api/x']
+
+    for key in 'abc':
+        registry.remember(key, {'key': key})
+    assert registry.fallback('a') is None  # LRU只保留最近2条
+    assert registry.fallback('c') == {'key': 'c'}
+
+    disabled = CircuitBreakerRegistry(enabled=False)
+    assert disabled.allow(url)
+    disabled.record(url, TIMEOUT, True)
+    assert not disabled.is_open(url)
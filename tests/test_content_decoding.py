@@ -0,0 +1,111 @@
+"""content_decoding: 多重编码顺序、raw deflate回退、gzip嗅探与解压大小上限"""
+
+import gzip
+import io
+import zlib
+
+import pytest
+
+from content_decoding import StreamDecoder, ContentDecodingError, ResponseTooLarge, read_decoded
+
+RAW = b'{"success":true,"data":[' + b','.join(str(i).encode() for i in range(2000)) + b']}'
+
+
+def decode(body, encoding, max_bytes=1 << 20, chunk_size=100):
+    decoder = StreamDecoder(encoding, max_bytes)
+    for start in range(0, len(body), chunk_size):
+        decoder.feed(body[start:start + chunk_size])
+    return bytes(decoder.finish())
+
+
+def raw_deflate(data):
+    obj = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return obj.compress(data) + obj.flush()
+
+
+def test_multiple_codings_are_undone_in_reverse_order():
+    # "deflate, gzip" 表示先deflate后gzip，解码时先gunzip再inflate
+    body = gzip.compress(zlib.compress(RAW))
+    assert decode(body, 'deflate, gzip') == RAW
+    with pytest.raises(ContentDecodingError):
+        decode(body, 'gzip, deflate')
+
+
+def test_identity_and_case_are_ignored():
+    assert decode(gzip.compress(RAW), 'identity, GZIP') == RAW
+
+
+def test_deflate_falls_back_to_raw_stream():
+    assert decode(zlib.compress(RAW), 'deflate') == RAW
+    assert decode(raw_deflate(RAW), 'deflate') == RAW
+
+
+def test_gzip_is_sniffed_when_no_encoding_declared():
+    assert decode(gzip.compress(RAW), None) == RAW
+    assert decode(RAW, '') == RAW
+
+
+def test_unsupported_encoding_is_rejected():
+    with pytest.raises(ContentDecodingError, match='compress'):
+        StreamDecoder('gzip, compress', 1000)
+
+
+def test_size_limit_applies_to_plain_and_encoded_bodies():
+    assert decode(RAW, None, max_bytes=len(RAW)) == RAW
+    with pytest.raises(ResponseTooLarge):
+        decode(RAW, None, max_bytes=len(RAW) - 1)
+    with pytest.raises(ResponseTooLarge):
+        decode(gzip.compress(RAW), 'gzip', max_bytes=len(RAW) - 1)
+
+
+def test_gzip_bomb_is_stopped_at_limit():
+    bomb = gzip.compress(b'\0' * (10 << 20))
+    decoder = StreamDecoder('gzip', 10000)
+    with pytest.raises(ResponseTooLarge):
+        decoder.feed(bomb)
+    assert len(decoder.buffer) <= 10000
+
+
+def test_intermediate_layer_over_limit_is_not_truncated_silently():
+    # 内层解出的数据超过额度时必须报错，而不是丢弃被截断的部分
+    body = gzip.compress(gzip.compress(b'\0' * (1 << 20)))
+    with pytest.raises(ResponseTooLarge):
+        decode(body, 'gzip, gzip', max_bytes=10000, chunk_size=1 << 20)
+
+
+def test_brotli_output_is_bounded():
+    brotli = pytest.importorskip('brotli')
+    assert decode(brotli.compress(RAW), 'br') == RAW
+    decoder = StreamDecoder('br', 10000)
+    with pytest.raises(ResponseTooLarge):
+        decoder.feed(brotli.compress(b'\0' * (50 << 20), quality=1))
+    assert len(decoder.buffer) <= 10000
+
+
+def test_zstd_declared_size_and_streamed_bomb_are_rejected():
+    zstandard = pytest.importorskip('zstandard')
+    assert decode(zstandard.ZstdCompressor().compress(RAW), 'zstd') == RAW
+
+    with pytest.raises(ResponseTooLarge, match='声明'):
+        decode(zstandard.ZstdCompressor().compress(b'\0' * (10 << 20)), 'zstd', max_bytes=10000)
+
+    # 流式压缩的帧头不带原始大小，靠分段解压限制单次膨胀
+    streamed = zstandard.ZstdCompressor().compressobj()
+    body = streamed.compress(b'\0' * (50 << 20)) + streamed.flush()
+    assert zstandard.frame_content_size(body) == -1
+    with pytest.raises(ResponseTooLarge):
+        decode(body, 'zstd', max_bytes=10000, chunk_size=len(body))
+
+
+class FakeResponse:
+    def __init__(self, body, encoding):
+        self.headers = {'Content-Encoding': encoding} if encoding else {}
+        self._body = io.BytesIO(body)
+
+    def read(self, size):
+        return self._body.read(size)
+
+
+def test_read_decoded_reads_in_chunks():
+    assert bytes(read_decoded(FakeResponse(gzip.compress(RAW), 'gzip'), chunk_size=64)) == RAW
+    assert bytes(read_decoded(FakeResponse(RAW, None), chunk_size=64)) == RAW
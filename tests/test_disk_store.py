@@ -0,0 +1,89 @@
+"""disk_store: 列式文件读写、保留策略重写与打开时序的LRU"""
+
+import os
+
+import numpy as np
+
+from disk_store import ColumnarSeries, DiskSeriesStore, response_to_columns, columns_to_response
+
+
+DAY = 86400 * 1000
+
+
+def write_range(series, start, stop, step=1):
+    tss = list(range(start, stop, step))
+    series.write(tss, {'value': [float(ts) for ts in tss]}, {})
+
+
+def test_write_replaces_overlap_and_reads_by_range(tmp_path):
+    series = ColumnarSeries(str(tmp_path / 's'), max_rows=0, retention_days=0)
+    write_range(series, 0, 10)
+    series.write([8, 9, 10], {'value': [80.0, 90.0, 100.0]}, {'unit': 'USD'})
+
+    tss, columns, attrs = series.read()
+    assert tss.tolist() == list(range(11))
+    assert columns['value'][-3:].tolist() == [80.0, 90.0, 100.0]
+    assert attrs == {'unit': 'USD'}
+
+    tss, columns, _ = series.read(start=3, end=5)
+    assert tss.tolist() == [3, 4, 5]
+    assert series.read(limit=2)[0].tolist() == [9, 10]
+
+
+def test_new_column_is_padded_with_nan(tmp_path):
+    series = ColumnarSeries(str(tmp_path / 's'), max_rows=0, retention_days=0)
+    write_range(series, 0, 3)
+    series.write([3], {'value': [3.0], 'extra': [1.0]}, {})
+    values = series.read()[1]['extra']
+    assert np.isnan(values[:3]).all() and values[3] == 1.0
+
+
+def test_row_retention_compacts_into_new_generation(tmp_path):
+    path = str(tmp_path / 's')
+    series = ColumnarSeries(path, max_rows=100, retention_days=0, compact_slack=0.1)
+    for start in range(0, 200, 10):
+        write_range(series, start, start + 10)
+
+    tss, columns, _ = series.read()
+    assert len(tss) <= 110
+    assert tss[-1] == 199 and columns['value'][-1] == 199.0
+    assert series.generation > 0
+    # 旧一代文件已删除
+    assert sorted(os.listdir(path)) == sorted(['meta.json', 'write.lock',
+                                               f'tss.{series.generation}.i8', f'c0.{series.generation}.f8'])
+    # 其他进程（新实例）按meta读取新一代文件
+    assert ColumnarSeries(path).read()[0].tolist() == tss.tolist()
+
+
+def test_age_retention_drops_old_rows(tmp_path):
+    series = ColumnarSeries(str(tmp_path / 's'), max_rows=0, retention_days=2, compact_slack=0.1)
+    series.write([0, DAY, 2 * DAY, 3 * DAY, 4 * DAY], {'value': [0.0, 1.0, 2.0, 3.0, 4.0]}, {})
+    assert series.read()[0].tolist() == [2 * DAY, 3 * DAY, 4 * DAY]
+
+
+def test_compaction_waits_for_slack(tmp_path):
+    series = ColumnarSeries(str(tmp_path / 's'), max_rows=100, retention_days=0, compact_slack=0.5)
+    write_range(series, 0, 120)
+    assert series.generation == 0 and series.count == 120
+
+
+def test_open_series_are_bounded(tmp_path):
+    store = DiskSeriesStore(str(tmp_path), max_open=2)
+    for name in 'abc':
+        store.save((name,), {'success': True, 'data': {'tss': [1, 2], 'v': [1.0, 2.0]}})
+    store.series(('b',))
+    store.series(('d',))
+
+    stats = store.get_stats()
+    assert stats['open_series'] == 2
+    assert stats['closed_series'] == 2
+    # 被关闭的时序重新打开后数据仍在
+    assert store.load(('a',))['data']['tss'] == [1, 2]
+
+
+def test_response_round_trip():
+    data = {'tss': [1, 2], 'prices': [1.5, None], 'dataValues': {'Binance': [3.0, 4.0]}, 'unit': 'USD'}
+    tss, columns, attrs = response_to_columns(data)
+    rebuilt = columns_to_response(np.asarray(tss), {name: np.asarray([np.nan if v is None else v for v in values])
+                                                    for name, values in columns.items()}, attrs)
+    assert rebuilt == {'success': True, 'data': data}
@@ -0,0 +1,101 @@
+"""retry_policy: 错误分类、退避与重试预算"""
+
+import asyncio
+import socket
+import urllib.error
+
+import pytest
+
+from retry_policy import (RetryBudget, RetryPolicy, RetryPolicyEngine, classify_status, classify_exception,
+                          backoff_enabled, no_backoff, TIMEOUT, CONNECTION, THROTTLED, SERVER_ERROR,
+                          API_ERROR, CLIENT_ERROR, BAD_RESPONSE)
+
+
+def test_budget_caps_retries_to_ratio():
+    budget = RetryBudget(ratio=0.1, min_per_second=0, window=100)
+    for _ in range(10):  # 初始额度为上限 0.1 × 100
+        assert budget.try_spend()
+    assert not budget.try_spend()
+
+    for _ in range(100):
+        budget.record_request()
+    retries = sum(budget.try_spend() for _ in range(50))
+    assert retries == 10
+    assert budget.get_stats()['exhausted'] == 41
+
+
+def test_budget_max_tokens_scale_with_ratio():
+    assert RetryBudget(ratio=0.2, min_per_second=0, window=100).max_tokens == 20
+    assert RetryBudget(ratio=0.001, min_per_second=0, window=100).max_tokens == 1
+
+
+def test_budget_refills_over_time(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('retry_policy.time.monotonic', lambda: clock[0])
+    budget = RetryBudget(ratio=0.1, min_per_second=0.5, window=100)
+    while budget.try_spend():
+        pass
+    clock[0] += 2  # 0.5/秒 × 2秒 = 1次
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    clock[0] += 1000  # 补充不超过上限
+    assert budget.get_stats()['tokens'] == budget.max_tokens
+
+
+def test_next_delay_is_bounded():
+    policy = RetryPolicy(base_delay=0.2, max_delay=3.0)
+    delay = 0
+    for _ in range(50):
+        delay = policy.next_delay(delay)
+        assert 0.2 <= delay <= 3.0
+
+
+def test_should_retry_respects_classes_attempts_and_budget():
+    engine = RetryPolicyEngine(default=RetryPolicy(max_attempts=3, retry_on=(TIMEOUT,)), overrides={},
+                               budget=RetryBudget(ratio=0.1, min_per_second=0, window=20))
+    policy = engine.policy_for('https://api.coinank.com/api/tickers')
+    assert engine.should_retry(policy, 1, TIMEOUT)
+    assert not engine.should_retry(policy, 1, CLIENT_ERROR)
+    assert not engine.should_retry(policy, 3, TIMEOUT)
+    assert engine.should_retry(policy, 2, TIMEOUT)
+    assert not engine.should_retry(policy, 1, TIMEOUT)  # 预算(2次)用完
+    stats = engine.get_stats()
+    assert stats['retries'] == {TIMEOUT: 2}
+    assert stats['gave_up'] == {TIMEOUT: 2, CLIENT_ERROR: 1}
+
+
+def test_no_backoff_defers_retries():
+    engine = RetryPolicyEngine(default=RetryPolicy(max_attempts=3, retry_on=(TIMEOUT,)), overrides={},
+                               budget=RetryBudget(ratio=0.1, min_per_second=0, window=100))
+    policy = engine.policy_for('https://api.coinank.com/api/tickers')
+    with no_backoff():
+        assert not backoff_enabled()
+        assert not engine.should_retry(policy, 1, TIMEOUT)
+    assert backoff_enabled()
+    assert engine.should_retry(policy, 1, TIMEOUT)
+    assert engine.get_stats()['deferred'] == 1
+    assert engine.budget.get_stats()['retries'] == 1  # 放弃的重试不消耗预算
+
+
+def test_endpoint_overrides():
+    engine = RetryPolicyEngine(default=RetryPolicy(max_attempts=2, retry_on=(TIMEOUT, API_ERROR)),
+                               overrides={'fundingRate': {'retry_on': (TIMEOUT,), 'max_attempts': 4}},
+                               budget=RetryBudget(min_per_second=0))
+    policy = engine.policy_for('https://api.coinank.com/api/fundingRate/hist')
+    assert policy.max_attempts == 4 and API_ERROR not in policy.retry_on
+    assert engine.policy_for('https://api.coinank.com/api/fundingRate/hist', max_attempts=1).max_attempts == 1
+
+
+@pytest.mark.parametrize('status, expected', [
+    (429, THROTTLED), (503, THROTTLED), (504, TIMEOUT), (500, SERVER_ERROR), (404, CLIENT_ERROR), (302, BAD_RESPONSE)
+])
+def test_classify_status(status, expected):
+    assert classify_status(status) == expected
+
+
+def test_classify_exception():
+    assert classify_exception(urllib.error.HTTPError('u', 502, '', {}, None)) == SERVER_ERROR
+    assert classify_exception(urllib.error.URLError(socket.timeout())) == TIMEOUT
+    assert classify_exception(asyncio.TimeoutError()) == TIMEOUT
+    assert classify_exception(ConnectionResetError()) == CONNECTION
+    assert classify_exception(ValueError()) == BAD_RESPONSE
@@ -0,0 +1,82 @@
+"""rollup: 按周期分桶聚合"""
+
+import numpy as np
+import pytest
+
+from rollup import SERIES_AGGREGATIONS, rollup, aggregate, bucket_starts
+
+
+STEP = 300000
+HOUR = 12 * STEP
+
+
+def hourly_input(hours=3, missing=()):
+    tss = np.arange(hours * 12, dtype=np.int64) * STEP
+    values = np.arange(hours * 12, dtype=np.float64)
+    values[list(missing)] = np.nan
+    return tss, values
+
+
+def test_bucket_starts_align_to_epoch():
+    buckets, starts = bucket_starts([HOUR - STEP, HOUR, HOUR + STEP, 3 * HOUR], HOUR)
+    assert buckets.tolist() == [0, HOUR, 3 * HOUR]
+    assert starts.tolist() == [0, 1, 3]
+
+
+def test_sum_accumulates_each_bucket():
+    tss, values = hourly_input()
+    buckets, columns = rollup(tss, {'buy': values}, HOUR, 'sum')
+    assert buckets.tolist() == [0, HOUR, 2 * HOUR]
+    assert columns['buy'].tolist() == [sum(range(0, 12)), sum(range(12, 24)), sum(range(24, 36))]
+
+
+def test_last_and_first_skip_missing_values():
+    tss, values = hourly_input(missing=(11, 12))
+    _, columns = rollup(tss, {'oi': values}, HOUR, 'last')
+    assert columns['oi'].tolist() == [10.0, 23.0, 35.0]
+    _, columns = rollup(tss, {'oi': values}, HOUR, 'first')
+    assert columns['oi'].tolist() == [0.0, 13.0, 24.0]
+
+
+def test_fully_missing_bucket_is_nan():
+    tss, values = hourly_input(missing=range(12, 24))
+    _, columns = rollup(tss, {'a': values, 'b': values}, HOUR, {'a': 'sum', 'b': 'last'})
+    assert np.isnan(columns['a'][1]) and np.isnan(columns['b'][1])
+    assert columns['a'][0] == sum(range(12))
+
+
+def test_ohlc_expands_columns():
+    tss, values = hourly_input(hours=1)
+    values[5] = 100.0
+    values[6] = -1.0
+    _, columns = rollup(tss, {'price': values}, HOUR, 'ohlc')
+    assert {name: column.tolist() for name, column in columns.items()} == {
+        'price.open': [0.0], 'price.high': [100.0], 'price.low': [-1.0], 'price.close': [11.0]
+    }
+
+
+def test_per_column_methods_default_to_last():
+    tss, values = hourly_input(hours=1)
+    _, columns = rollup(tss, {'buy': values, 'oi': values}, HOUR, {'buy': 'sum'})
+    assert columns['buy'].tolist() == [66.0]
+    assert columns['oi'].tolist() == [11.0]
+
+
+def test_empty_input():
+    buckets, columns = rollup([], {'v': []}, HOUR, 'sum')
+    assert len(buckets) == 0 and len(columns['v']) == 0
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        aggregate([1.0], np.array([0]), 'median')
+
+
+def test_longshort_sums_flows_but_keeps_last_price():
+    tss, values = hourly_input(hours=1)
+    prices = np.full(12, 60000.0)
+    prices[-1] = 60100.0
+    _, columns = rollup(tss, {'longRatios': values, 'shortRatios': values, 'prices': prices}, HOUR,
+                        SERIES_AGGREGATIONS['longshort'])
+    assert columns['longRatios'].tolist() == columns['shortRatios'].tolist() == [66.0]
+    assert columns['prices'].tolist() == [60100.0]
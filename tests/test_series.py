@@ -0,0 +1,67 @@
+"""series: LTTB降采样"""
+
+import numpy as np
+
+from series import lttb_indices, downsample_chart
+
+
+def test_keeps_threshold_points_including_endpoints():
+    x = np.arange(1000)
+    keep = lttb_indices(x, np.sin(x / 20.0), 50)
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    assert (np.diff(keep) > 0).all()
+
+
+def test_small_threshold_or_short_series_is_unchanged():
+    x = np.arange(10)
+    assert lttb_indices(x, x, 2).tolist() == list(range(10))
+    assert lttb_indices(x, x, 10).tolist() == list(range(10))
+    assert lttb_indices(x, x, 50).tolist() == list(range(10))
+
+
+def test_spike_is_preserved():
+    x = np.arange(500)
+    y = np.zeros(500)
+    y[123] = 100.0
+    assert 123 in lttb_indices(x, y, 20).tolist()
+
+
+def test_spike_in_any_column_is_preserved():
+    x = np.arange(500)
+    ys = np.zeros((2, 500))
+    ys[0, 100] = 1.0
+    ys[1, 400] = 1e9  # 量级不同的列按取值范围归一化
+    keep = lttb_indices(x, ys, 20).tolist()
+    assert 100 in keep and 400 in keep
+
+
+def test_nan_values_are_tolerated():
+    x = np.arange(300)
+    y = np.cos(x / 10.0)
+    y[::7] = np.nan
+    keep = lttb_indices(x, y, 30)
+    assert len(keep) == 30 and (np.diff(keep) > 0).all()
+
+
+def test_downsample_chart_keeps_columns_aligned():
+    tss = list(range(0, 1000 * 300000, 300000))
+    data = {
+        'tss': tss,
+        'prices': [float(i) for i in range(1000)],
+        'dataValues': {'Binance': [float(-i) for i in range(1000)]},
+        'unit': 'USD'
+    }
+    result = downsample_chart(data, 100)
+    assert len(result['tss']) == 100
+    assert result['unit'] == 'USD'
+    for ts, price, value in zip(result['tss'], result['prices'], result['dataValues']['Binance']):
+        assert price == ts // 300000 and value == -price
+
+
+def test_downsample_chart_rows():
+    rows = [[i, float(i % 17), float(i % 5)] for i in range(600)]
+    result = downsample_chart({'chartData': rows, 'exchanges': ['a', 'b']}, 60)
+    assert len(result['chartData']) == 60
+    assert result['chartData'][0] == rows[0] and result['chartData'][-1] == rows[-1]
+    assert downsample_chart({'chartData': rows[:10]}, 60)['chartData'] == rows[:10]
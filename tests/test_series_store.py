@@ -0,0 +1,117 @@
+"""series_store: 增量合并与无法合并时的回退"""
+
+import time
+
+from series_store import SeriesStore, merge_series, interval_ms
+
+
+STEP = 300000
+KEY = ('longshort', 'BTC', '', '5m')
+
+
+def tss_response(start, count, offset=0.0):
+    tss = [start + i * STEP for i in range(count)]
+    return {'success': True, 'data': {
+        'tss': tss,
+        'longRatios': [i + offset for i in range(count)],
+        'dataValues': {'Binance': [i * 10 + offset for i in range(count)]}
+    }}
+
+
+def rows_response(start, count, exchanges=('Binance', 'Okex')):
+    return {'success': True, 'data': {
+        'exchanges': list(exchanges),
+        'chartData': [[start + i * STEP, float(i), float(-i)] for i in range(count)]
+    }}
+
+
+def make_store(**kwargs):
+    kwargs.setdefault('tail_params', {'longshort': ('limit', 'limit'), 'fundingrate': None})
+    return SeriesStore(**kwargs)
+
+
+def test_merge_replaces_overlap_and_keeps_window():
+    store = make_store()
+    store.store(KEY, tss_response(0, 10))
+    merged = store.merge(KEY, tss_response(8 * STEP, 4, offset=100.0))
+
+    data = merged['data']
+    assert len(data['tss']) == 10  # 裁剪回原窗口
+    assert data['tss'] == [i * STEP for i in range(2, 12)]
+    assert data['longRatios'][-4:] == [100.0, 101.0, 102.0, 103.0]
+    assert data['longRatios'][0] == 2
+    assert data['dataValues']['Binance'][-1] == 130.0
+    assert store.get_stats()['tail_fetches'] == 1
+
+
+def test_merge_chart_rows():
+    store = make_store()
+    store.store(KEY, rows_response(0, 5))
+    merged = store.merge(KEY, rows_response(4 * STEP, 2))
+    assert [row[0] for row in merged['data']['chartData']] == [i * STEP for i in range(1, 6)]
+
+
+def test_merge_without_base_returns_none():
+    assert make_store().merge(KEY, tss_response(0, 3)) is None
+
+
+def test_merge_with_gap_falls_back():
+    store = make_store()
+    store.store(KEY, tss_response(0, 5))
+    # 增量首个时间戳晚于已有最后一点，中间可能缺数据
+    assert store.merge(KEY, tss_response(10 * STEP, 2)) is None
+    assert store.get_stats()['merge_failures'] == 1
+
+
+def test_merge_with_changed_columns_falls_back():
+    store = make_store()
+    store.store(KEY, rows_response(0, 5))
+    assert store.merge(KEY, rows_response(4 * STEP, 2, exchanges=('Binance', 'Bybit'))) is None
+
+
+def test_merge_with_changed_structure_falls_back():
+    store = make_store()
+    store.store(KEY, tss_response(0, 5))
+    assert store.merge(KEY, rows_response(4 * STEP, 2)) is None
+    assert store.merge(KEY, {'success': True, 'data': {'list': []}}) is None
+
+
+def test_failed_response_is_not_merged():
+    store = make_store()
+    store.store(KEY, tss_response(0, 5))
+    assert store.merge(KEY, {'success': False, 'msg': 'error'}) is None
+    assert store.latest(KEY)['data']['tss'][-1] == 4 * STEP
+
+
+def test_empty_tail_keeps_existing_data():
+    old = tss_response(0, 3)['data']
+    assert merge_series(old, {'tss': []}) is old
+
+
+def test_plan_tail_falls_back_to_full_fetch():
+    store = make_store(full_refresh_every=2, overlap=2)
+    # 未配置增量参数的接口或无基准窗口时全量请求
+    assert store.plan_tail(('fundingrate', 'BTC', '5m'), '5m') is None
+    assert store.plan_tail(KEY, '5m') is None
+
+    now = int(time.time() * 1000) // STEP * STEP
+    store.store(KEY, tss_response(now - 99 * STEP, 100))
+    assert store.plan_tail(KEY, '5m') == {'limit': 2}
+
+    for _ in range(2):
+        store.merge(KEY, tss_response(now, 1))
+    # 连续增量达到次数后做一次全量校正
+    assert store.plan_tail(KEY, '5m') is None
+
+
+def test_plan_tail_prefers_full_fetch_when_tail_covers_most_of_window():
+    store = make_store(overlap=2)
+    now = int(time.time() * 1000) // STEP * STEP
+    store.store(KEY, tss_response(now - 200 * STEP, 10))
+    assert store.plan_tail(KEY, '5m') is None
+
+
+def test_interval_ms():
+    assert interval_ms('5m') == STEP
+    assert interval_ms('12h') == 12 * 3600000
+    assert interval_ms('bad') is None
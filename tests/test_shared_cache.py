@@ -0,0 +1,140 @@
+"""shared_cache: RESP客户端、刷新锁与TTLCache共享层（基于替身服务）"""
+
+import threading
+import time
+
+import pytest
+
+from cache import TTLCache
+from shared_cache import RespClient, RespError, SharedCache, create_standin_server
+
+
+@pytest.fixture
+def server():
+    server = create_standin_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def url(server):
+    host, port = server.server_address
+    return f'redis://{host}:{port}'
+
+
+def make_cache(shared):
+    cache = TTLCache(namespace_ttls={'ns': 60})
+    cache.shared = shared
+    return cache
+
+
+def failing_loader():
+    raise AssertionError('不应请求上游')
+
+
+def test_resp_client_round_trip(url):
+    client = RespClient(url)
+    assert client.execute('SET', 'k', 'v', 'PX', 10000) == 'OK'
+    assert client.execute('SET', 'k', 'w', 'NX') is None
+    assert client.execute('GET', 'k') == b'v'
+    assert client.execute('EXISTS', 'k', 'missing') == 1
+    assert client.execute('DEL', 'k') == 1
+    assert client.execute('GET', 'k') is None
+    with pytest.raises(RespError):
+        client.execute('HGET', 'k', 'f')
+    client.close()
+
+
+def test_lock_is_exclusive_and_only_released_by_owner(url):
+    a, b = SharedCache.from_url(url), SharedCache.from_url(url)
+    token = a.acquire_lock('ns', 'k')
+    assert token
+    assert b.acquire_lock('ns', 'k') is None
+    b.release_lock('ns', 'k', 'not-the-owner')
+    assert b.acquire_lock('ns', 'k') is None
+    a.release_lock('ns', 'k', token)
+    assert b.acquire_lock('ns', 'k')
+
+
+def test_wait_for_returns_newer_value_or_gives_up_when_lock_released(url):
+    a, b = SharedCache.from_url(url), SharedCache.from_url(url)
+    token = a.acquire_lock('ns', 'k')
+    started = time.time()
+    threading.Timer(0.1, lambda: a.set('ns', 'k', 'v', time.time(), 60)).start()
+    entry = b.wait_for('ns', 'k', started)
+    assert entry is not None and entry.value == 'v'
+
+    # 持锁进程结束但没有写入新值：不必等到lock_wait超时
+    threading.Timer(0.1, lambda: a.release_lock('ns', 'k', token)).start()
+    started = time.time()
+    assert b.wait_for('ns', 'k', time.time()) is None
+    assert time.time() - started < b.lock_wait
+
+
+def test_worker_adopts_fill_from_another_worker(url):
+    a = make_cache(SharedCache.from_url(url))
+    b = make_cache(SharedCache.from_url(url))
+    assert a.get_or_load('ns', 'k', lambda: {'v': 1}) == {'v': 1}
+    assert b.get_or_load('ns', 'k', failing_loader) == {'v': 1}
+    assert b.peek('ns', 'k').stored_at == a.peek('ns', 'k').stored_at
+    a.shutdown()
+    b.shutdown()
+
+
+def test_concurrent_loaders_reach_upstream_once(url):
+    caches = [make_cache(SharedCache.from_url(url)) for _ in range(2)]
+    calls = []
+    barrier = threading.Barrier(2)
+    results = [None, None]
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'v'
+
+    def run(i):
+        barrier.wait()
+        results[i] = caches[i].get_or_load('ns', 'k', loader)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert results == ['v', 'v']
+    assert len(calls) == 1
+    assert sum(cache.shared.get_stats()['lock_wait_hits'] for cache in caches) == 1
+    for cache in caches:
+        cache.shutdown()
+
+
+def test_batch_fill_claims_lock_and_publishes(url):
+    a = make_cache(SharedCache.from_url(url))
+    b = make_cache(SharedCache.from_url(url))
+    value, token = a.claim_fill('ns', 'k', failing_loader)
+    assert value is None and token
+    assert b.claim_fill('ns', 'k', failing_loader) == (None, None)
+
+    a.complete_fill('ns', 'k', 'v', None, token)
+    assert b.claim_fill('ns', 'k', failing_loader) == ('v', None)
+    assert b.get('ns', 'k') == 'v'
+    a.shutdown()
+    b.shutdown()
+
+
+def test_degrades_to_local_cache_when_server_is_down(server, url):
+    server.shutdown()
+    server.server_close()
+    shared = SharedCache.from_url(url, retry_interval=60)
+    cache = make_cache(shared)
+
+    assert cache.get_or_load('ns', 'k', lambda: 'v') == 'v'
+    assert cache.get_or_load('ns', 'k', failing_loader) == 'v'
+    assert cache.claim_fill('ns', 'other', failing_loader) == (None, '')
+    stats = shared.get_stats()
+    assert not stats['available']
+    assert stats['errors'] == 1  # 首次失败后暂停使用，不再逐次尝试连接
+    cache.shutdown()
@@ -0,0 +1,72 @@
+"""single_flight: 相同key的并发调用只执行一次"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return 'value'
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        leader = pool.submit(flight.do, 'k', slow)
+        started.wait(1)
+        followers = [pool.submit(flight.do, 'k', slow) for _ in range(4)]
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert results == ['value'] * 5
+    assert len(calls) == 1
+    stats = flight.get_stats()
+    assert stats['total_calls'] == 5
+    assert stats['total_saved'] == 4
+    assert stats['in_flight'] == 0
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.get_stats()['total_saved'] == 0
+
+
+def test_exception_propagates_to_waiters_and_key_is_released():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError('boom')
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, 'k', failing)
+        started.wait(1)
+        follower = pool.submit(flight.do, 'k', failing)
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            follower.result()
+
+    # 失败后key不再占用，下一次调用重新执行
+    assert flight.do('k', lambda: 'ok') == 'ok'
+
+
+def test_tracked_keys_are_bounded():
+    flight = SingleFlight(max_tracked_keys=3)
+    for i in range(10):
+        flight.do(i, lambda: None)
+    stats = flight.get_stats()
+    assert stats['tracked_keys'] == 3
+    assert [item['key'] for item in stats['top_keys']] == [7, 8, 9]
@@ -0,0 +1,102 @@
+"""upstream_governor: AIMD并发上限"""
+
+import threading
+import urllib.error
+
+import pytest
+
+from upstream_governor import (AIMDLimiter, UpstreamGovernor, SUCCESS, THROTTLED, TIMEOUT, NEUTRAL,
+                               classify_error, endpoint_family)
+
+
+def saturate(limiter, outcome):
+    """占满当前上限后逐个以outcome归还"""
+    held = int(limiter.limit)
+    for _ in range(held):
+        assert limiter.acquire(timeout=0)
+    for _ in range(held):
+        limiter.release(outcome)
+
+
+def test_additive_increase_only_when_saturated():
+    limiter = AIMDLimiter('t', initial=4, minimum=1, maximum=10, increase=1.0)
+    limiter.acquire(timeout=0)
+    limiter.release(SUCCESS)  # 未用满，不增加
+    assert limiter.limit == 4
+
+    saturate(limiter, SUCCESS)
+    assert limiter.limit == pytest.approx(4.25)  # 只有归还前已用满的那次增加 1/limit
+    for _ in range(20):
+        saturate(limiter, SUCCESS)
+    assert 4.25 < limiter.limit <= 10
+
+
+def test_limit_never_exceeds_maximum():
+    limiter = AIMDLimiter('t', initial=2, minimum=1, maximum=3, increase=5.0)
+    for _ in range(10):
+        saturate(limiter, SUCCESS)
+    assert limiter.limit == 3
+
+
+def test_multiplicative_decrease_once_per_cooldown():
+    limiter = AIMDLimiter('t', initial=16, minimum=2, maximum=32, decrease=0.5, cooldown=60)
+    for _ in range(5):
+        limiter.acquire(timeout=0)
+    for _ in range(5):
+        limiter.release(THROTTLED)
+    # 同一批失败只退让一次
+    assert limiter.limit == 8
+    assert limiter.backoffs == 1
+    assert limiter.failures[THROTTLED] == 5
+
+
+def test_decrease_respects_minimum():
+    limiter = AIMDLimiter('t', initial=3, minimum=2, maximum=8, decrease=0.1, cooldown=0)
+    limiter.acquire(timeout=0)
+    limiter.release(TIMEOUT)
+    assert limiter.limit == 2
+
+
+def test_neutral_outcome_does_not_adjust():
+    limiter = AIMDLimiter('t', initial=1, minimum=1, maximum=8)
+    saturate(limiter, NEUTRAL)
+    assert limiter.limit == 1 and limiter.backoffs == 0
+
+
+def test_acquire_waits_and_times_out():
+    limiter = AIMDLimiter('t', initial=1, minimum=1, maximum=1)
+    assert limiter.acquire(timeout=0)
+    assert not limiter.acquire(timeout=0.05)
+    assert limiter.rejected == 1
+
+    timer = threading.Timer(0.05, limiter.release, args=(SUCCESS,))
+    timer.start()
+    assert limiter.acquire(timeout=1)
+    timer.join()
+
+
+def test_slot_classifies_exceptions():
+    governor = UpstreamGovernor(family_limits={'longshort': (1, 1, 4)}, acquire_timeout=0.01)
+    url = 'https://api.coinank.com/api/longshort/buySell'
+    with pytest.raises(urllib.error.HTTPError):
+        with governor.slot(url):
+            raise urllib.error.HTTPError(url, 429, 'Too Many Requests', {}, None)
+    stats = governor.get_stats()['families']['longshort']
+    assert stats['failures'][THROTTLED] == 1
+    assert stats['in_flight'] == 0
+
+
+def test_slot_yields_none_when_queue_times_out():
+    governor = UpstreamGovernor(family_limits={'tickers': (1, 1, 1)}, acquire_timeout=0.01)
+    url = 'https://api.coinank.com/api/tickers'
+    with governor.slot(url) as first:
+        with governor.slot(url) as second:
+            assert first is not None and second is None
+
+
+def test_classify_error_and_family():
+    assert classify_error(urllib.error.HTTPError('u', 503, '', {}, None)) == THROTTLED
+    assert classify_error(urllib.error.HTTPError('u', 404, '', {}, None)) == NEUTRAL
+    assert classify_error(urllib.error.URLError(TimeoutError())) == TIMEOUT
+    assert endpoint_family('https://api.coinank.com/api/fundingRate/chartsV2?x=1') == 'fundingRate'
+    assert endpoint_family('/other') == 'other'
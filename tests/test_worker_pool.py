@@ -0,0 +1,61 @@
+"""worker_pool: 优先级调度、超时后取消排队任务与上下文传递"""
+
+import threading
+
+from retry_policy import backoff_enabled, no_backoff
+from worker_pool import PriorityWorkerPool, PRIORITY_HIGH, PRIORITY_LOW
+
+
+def blocked_pool():
+    """单线程池，返回 (pool, 放行事件)；唯一的线程被占用，后续任务全部排队"""
+    pool = PriorityWorkerPool(max_workers=1, name='test-worker')
+    release = threading.Event()
+    running = threading.Event()
+
+    def block():
+        running.set()
+        release.wait(5)
+
+    pool.submit(block)
+    running.wait(1)
+    return pool, release
+
+
+def test_higher_priority_runs_first():
+    pool, release = blocked_pool()
+    order = []
+    low = pool.submit(order.append, 'low', priority=PRIORITY_LOW)
+    high = pool.submit(order.append, 'high', priority=PRIORITY_HIGH)
+    release.set()
+    low.result(1)
+    high.result(1)
+    pool.shutdown()
+    assert order == ['high', 'low']
+
+
+def test_cancel_dequeues_pending_tasks():
+    pool, release = blocked_pool()
+    ran = []
+    futures = [pool.submit(ran.append, i) for i in range(5)]
+    assert pool.get_stats()['queue_depth'] == 5
+
+    assert pool.cancel(futures[:3]) == 3
+    assert pool.get_stats()['queue_depth'] == 2
+    assert all(future.cancelled() for future in futures[:3])
+
+    release.set()
+    for future in futures[3:]:
+        future.result(1)
+    pool.shutdown()
+    assert ran == [3, 4]
+    assert pool.get_stats()['cancelled'] == 3
+
+
+def test_tasks_run_in_submitter_context():
+    pool = PriorityWorkerPool(max_workers=1, name='test-worker')
+    with no_backoff():
+        inside = pool.submit(backoff_enabled)
+    outside = pool.submit(backoff_enabled)
+    assert inside.result(1) is False
+    assert outside.result(1) is True
+    pool.shutdown()
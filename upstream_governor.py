@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+上游并发调节模块 - 按端点族的AIMD自适应并发上限
+- 每个端点族（/api/之后的第一段路径，如 fundingRate、longshort）各自维护并发上限与在途请求数
+- 加性增：并发用满且请求成功时，每约limit个成功请求上限加GOVERNOR_INCREASE
+- 乘性减：429/503、超时或接口返回success:false时上限乘以GOVERNOR_DECREASE，
+  冷却期内的同一批失败只退让一次
+- 上限已满时请求排队等待，超过GOVERNOR_ACQUIRE_TIMEOUT仍未轮到则放弃本次请求
+"""
+
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+from contextlib import contextmanager
+
+from config import (GOVERNOR_ENABLED, GOVERNOR_INITIAL_LIMIT, GOVERNOR_MIN_LIMIT, GOVERNOR_MAX_LIMIT,
+                    GOVERNOR_INCREASE, GOVERNOR_DECREASE, GOVERNOR_COOLDOWN,
+                    GOVERNOR_ACQUIRE_TIMEOUT, GOVERNOR_FAMILY_LIMITS)
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+# 请求结果
+SUCCESS = 'success'
+THROTTLED = 'throttled'  # HTTP 429/503
+TIMEOUT = 'timeout'
+API_ERROR = 'api_error'  # 接口返回success:false
+NEUTRAL = 'neutral'  # 与上游负载无关的失败（如404、非JSON响应），不调整上限
+
+BACKOFF_OUTCOMES = (THROTTLED, TIMEOUT, API_ERROR)
+THROTTLE_STATUS = (429, 503)
+
+
+def classify_error(error):
+    """上游请求异常对应的结果类型"""
+    if isinstance(error, urllib.error.HTTPError):
+        if error.code in THROTTLE_STATUS:
+            return THROTTLED
+        return TIMEOUT if error.code == 504 else NEUTRAL
+    if isinstance(error, urllib.error.URLError):
+        error = error.reason
+    if isinstance(error, (socket.timeout, TimeoutError)):
+        return TIMEOUT
+    return NEUTRAL
+
+
+def endpoint_family(url):
+    """端点族名，如 https://api.coinank.com/api/fundingRate/chartsV2 -> fundingRate"""
+    path = urllib.parse.urlsplit(url).path if '://' in url else url.split('?', 1)[0]
+    parts = [part for part in path.split('/') if part]
+    if len(parts) >= 2 and parts[0] == 'api':
+        return parts[1]
+    return parts[0] if parts else 'default'
+
+
+class AIMDLimiter:
+    """单个端点族的自适应并发上限"""
+
+    def __init__(self, name, initial=GOVERNOR_INITIAL_LIMIT, minimum=GOVERNOR_MIN_LIMIT,
+                 maximum=GOVERNOR_MAX_LIMIT, increase=GOVERNOR_INCREASE, decrease=GOVERNOR_DECREASE,
+                 cooldown=GOVERNOR_COOLDOWN):
+        self.name = name
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+
+        self.in_flight = 0
+        self.waiting = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+        # 统计
+        self.peak_limit = self.limit
+        self.successes = 0
+        self.backoffs = 0
+        self.rejected = 0
+        self.failures = {outcome: 0 for outcome in BACKOFF_OUTCOMES}
+        self.last_backoff_reason = None
+
+    def acquire(self, timeout=GOVERNOR_ACQUIRE_TIMEOUT):
+        """占用一个并发名额，超时返回False"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self.waiting += 1
+            try:
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        return False
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, outcome):
+        """归还名额并按结果调整上限"""
+        with self._cond:
+            # 归还前在途数已达上限，说明当前上限确实限制了吞吐
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+
+            if outcome == SUCCESS:
+                self.successes += 1
+                if saturated and self.limit < self.maximum:
+                    self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+                    self.peak_limit = max(self.peak_limit, self.limit)
+            elif outcome in BACKOFF_OUTCOMES:
+                self.failures[outcome] += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    old_limit = self.limit
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+                    self.backoffs += 1
+                    self.last_backoff_reason = outcome
+                    logger.warning("⚠️ 上游%s端点%s，并发上限 %.1f -> %.1f", self.name, outcome, old_limit, self.limit)
+            self._cond.notify_all()
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                'limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'peak_limit': round(self.peak_limit, 2),
+                'successes': self.successes,
+                'backoffs': self.backoffs,
+                'rejected': self.rejected,
+                'failures': dict(self.failures),
+                'last_backoff_reason': self.last_backoff_reason
+            }
+
+
+class Permit:
+    """一次上游请求的名额，调用方在请求结束前用mark记录结果"""
+
+    __slots__ = ('family', 'outcome')
+
+    def __init__(self, family):
+        self.family = family
+        self.outcome = NEUTRAL
+
+    def mark(self, outcome):
+        self.outcome = outcome
+
+
+class UpstreamGovernor:
+    """按端点族管理AIMDLimiter"""
+
+    def __init__(self, enabled=GOVERNOR_ENABLED, family_limits=None, acquire_timeout=GOVERNOR_ACQUIRE_TIMEOUT):
+        self.enabled = enabled
+        self.family_limits = GOVERNOR_FAMILY_LIMITS if family_limits is None else family_limits
+        self.acquire_timeout = acquire_timeout
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, family):
+        with self._lock:
+            limiter = self._limiters.get(family)
+            if limiter is None:
+                initial, minimum, maximum = self.family_limits.get(
+                    family, (GOVERNOR_INITIAL_LIMIT, GOVERNOR_MIN_LIMIT, GOVERNOR_MAX_LIMIT))
+                limiter = AIMDLimiter(family, initial, minimum, maximum)
+                self._limiters[family] = limiter
+            return limiter
+
+    @contextmanager
+    def slot(self, url):
+        """占用url所属端点族的一个名额；排队超时返回None（调用方应放弃本次请求）
+
+        用法: with governor.slot(url) as permit: ... permit.mark(SUCCESS)
+        块内抛出的异常按classify_error自动归类
+        """
+        family = endpoint_family(url)
+        permit = Permit(family)
+        if not self.enabled:
+            yield permit
+            return
+        limiter = self.limiter(family)
+        if not limiter.acquire(self.acquire_timeout):
+            logger.warning("⚠️ 上游%s端点并发已满，排队 %s 秒未获得名额", family, self.acquire_timeout)
+            yield None
+            return
+        try:
+            yield permit
+        except Exception as e:
+            if permit.outcome == NEUTRAL:
+                permit.mark(classify_error(e))
+            raise
+        finally:
+            limiter.release(permit.outcome)
+
+    def get_stats(self):
+        """各端点族当前并发上限与统计"""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {
+            'enabled': self.enabled,
+            'families': {name: limiter.get_stats() for name, limiter in sorted(limiters.items())}
+        }
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+共享工作线程池模块 - 进程级、带优先级的有界线程池
+替代每次请求内创建/销毁ThreadPoolExecutor，统一限制上游并发
+"""
+
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from config import WORKER_POOL_SIZE
+
+
+# 优先级类别 - 数值越小越先执行
+PRIORITY_HIGH = 0    # 代币切换时的基础数据
+PRIORITY_NORMAL = 1  # 完整数据的常规请求
+PRIORITY_LOW = 2     # 资金费率历史等后台数据
+
+PRIORITY_NAMES = {
+    PRIORITY_HIGH: 'high',
+    PRIORITY_NORMAL: 'normal',
+    PRIORITY_LOW: 'low'
+}
+
+# 等待时间统计保留的最近样本数
+WAIT_SAMPLE_SIZE = 500
+
+
+class PoolShutdownError(RuntimeError):
+    """线程池已关闭时提交任务"""
+
+
+class PriorityWorkerPool:
+    """带优先级的共享线程池 - 提供与Executor.submit相同的Future接口"""
+
+    def __init__(self, max_workers=WORKER_POOL_SIZE, name='coinank-worker'):
+        self.max_workers = max_workers
+        self.name = name
+
+        self._queue = []  # 堆: (priority, seq, submit_time, future, context, fn, args, kwargs)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._idle_workers = 0
+        self._shutdown = False
+
+        # 统计指标
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.peak_queue_depth = 0
+        self._wait_samples = {p: deque(maxlen=WAIT_SAMPLE_SIZE) for p in PRIORITY_NAMES}
+        self._wait_max = {p: 0.0 for p in PRIORITY_NAMES}
+        self._submitted = {p: 0 for p in PRIORITY_NAMES}
+
+    def submit(self, fn, *args, priority=PRIORITY_NORMAL, **kwargs):
+        """提交任务，返回concurrent.futures.Future；任务在提交方的contextvars上下文中执行"""
+        future = Future()
+        context = contextvars.copy_context()
+        with self._cond:
+            if self._shutdown:
+                raise PoolShutdownError("工作线程池已关闭")
+
+            heapq.heappush(self._queue, (priority, next(self._seq), time.monotonic(),
+                                         future, context, fn, args, kwargs))
+            self._submitted[priority] = self._submitted.get(priority, 0) + 1
+            self.peak_queue_depth = max(self.peak_queue_depth, len(self._queue))
+
+            # 排队任务多于空闲线程且未达上限时按需创建线程
+            if len(self._queue) > self._idle_workers and len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker,
+                                          name=f"{self.name}-{len(self._threads)}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+            self._cond.notify()
+        return future
+
+    def _worker(self):
+        """工作线程主循环 - 关闭后处理完剩余队列再退出"""
+        while True:
+            with self._cond:
+                while not self._queue and not self._shutdown:
+                    self._idle_workers += 1
+                    self._cond.wait()
+                    self._idle_workers -= 1
+
+                if not self._queue:
+                    return
+
+                priority, _, submit_time, future, context, fn, args, kwargs = heapq.heappop(self._queue)
+                wait_time = time.monotonic() - submit_time
+                self._wait_samples.setdefault(priority, deque(maxlen=WAIT_SAMPLE_SIZE)).append(wait_time)
+                self._wait_max[priority] = max(self._wait_max.get(priority, 0.0), wait_time)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            with self._cond:
+                self.running += 1
+            try:
+                result = context.run(fn, *args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+                with self._cond:
+                    self.failed += 1
+            else:
+                future.set_result(result)
+            finally:
+                with self._cond:
+                    self.running -= 1
+                    self.completed += 1
+
+    def cancel(self, futures):
+        """取消尚未开始的任务并移出队列（调用方已放弃等待），已在运行的任务不受影响，返回取消数"""
+        with self._cond:
+            cancelled = {id(future) for future in futures if future.cancel()}
+            if cancelled:
+                self._queue = [item for item in self._queue if id(item[3]) not in cancelled]
+                heapq.heapify(self._queue)
+                self.cancelled += len(cancelled)
+        return len(cancelled)
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """关闭线程池 - 默认排空已排队任务后退出"""
+        with self._cond:
+            self._shutdown = True
+            if cancel_pending:
+                while self._queue:
+                    future = heapq.heappop(self._queue)[3]
+                    future.cancel()
+            self._cond.notify_all()
+            threads = list(self._threads)
+
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def get_stats(self):
+        """获取队列深度与等待时间指标"""
+        with self._cond:
+            depth_by_priority = {name: 0 for name in PRIORITY_NAMES.values()}
+            for item in self._queue:
+                name = PRIORITY_NAMES.get(item[0], str(item[0]))
+                depth_by_priority[name] = depth_by_priority.get(name, 0) + 1
+
+            wait_stats = {}
+            for priority, samples in self._wait_samples.items():
+                ordered = sorted(samples)
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                wait_stats[name] = {
+                    'submitted': self._submitted.get(priority, 0),
+                    'avg_ms': round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0,
+                    'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2) if ordered else 0,
+                    'max_ms': round(self._wait_max.get(priority, 0.0) * 1000, 2)
+                }
+
+            return {
+                'max_workers': self.max_workers,
+                'threads': len(self._threads),
+                'idle_workers': self._idle_workers,
+                'running': self.running,
+                'queue_depth': len(self._queue),
+                'queue_depth_by_priority': depth_by_priority,
+                'peak_queue_depth': self.peak_queue_depth,
+                'completed': self.completed,
+                'failed': self.failed,
+                'cancelled': self.cancelled,
+                'wait_time': wait_stats,
+                'shutdown': self._shutdown
+            }
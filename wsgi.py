@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+生产环境WSGI入口 - gunicorn多进程部署
+    gunicorn -c gunicorn.conf.py wsgi:app
+- 每个worker在fork之后各自初始化API客户端、连接池与后台线程（init_worker），不继承主进程的线程和socket
+- 数据缓存为 进程内缓存 + 共享缓存(Redis协议) 两级：一个worker加载的数据其他worker直接采用，
+  刷新锁保证同一key只有一个worker请求上游；本地时序存储在worker之间共享，写入由文件锁保护
+- 访问热度与进程内缓存按worker统计，热点预刷新在每个worker运行，每分钟预算按worker数均分，
+  总预算不随worker数成倍增加；多个worker对同一key的预刷新经共享缓存的刷新锁合并为一次上游请求
+- 推送线程每个worker各一个
+- 平滑重启：kill -HUP <master pid>，新worker就绪后旧worker处理完进行中的请求再退出
+"""
+
+import os
+
+import coinank_web_app as web
+from shared_cache import SharedCache
+from config import WSGI_USE_PROXY, WSGI_ASYNC_CLIENT, SHARED_CACHE_URL, SCHEDULER_BUDGET_PER_MINUTE
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+app = web.app
+_initialized_pid = None
+
+
+def init_worker(workers=1):
+    """初始化当前worker进程，同一进程只执行一次；workers为worker总数，用于均分预刷新预算"""
+    global _initialized_pid
+    if _initialized_pid == os.getpid():
+        return
+    _initialized_pid = os.getpid()
+
+    # 替身服务地址由gunicorn主进程启动时写入环境变量
+    shared_url = os.environ.get('COINANK_SHARED_CACHE_URL') or SHARED_CACHE_URL
+    if shared_url:
+        web.data_cache.shared = SharedCache.from_url(shared_url)
+        logger.info("🗄️ worker %s 使用共享缓存: %s", os.getpid(), web.data_cache.shared.client.address)
+
+    if not web.initialize_api_client(use_proxy=WSGI_USE_PROXY, use_async=WSGI_ASYNC_CLIENT):
+        logger.warning("⚠️ worker %s 初始化API客户端失败，继续提供服务", os.getpid())
+    if 'PEPE' not in web.supported_tokens:
+        web.supported_tokens.append('PEPE')
+
+    web.refresh_scheduler.set_budget(SCHEDULER_BUDGET_PER_MINUTE / max(1, workers))
+    web.start_background_tasks()
+    logger.info("✅ worker %s 已就绪", os.getpid())
+
+
+def shutdown_worker():
+    """worker退出时关闭后台任务"""
+    web.shutdown_api_client()